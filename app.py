@@ -1,21 +1,160 @@
 import argparse
+import asyncio
+import hashlib
 import re
+import sys
 from datetime import datetime
-from src.agents import YouTubeSummarizerAgent
-from src.utils.utils import save_summary_to_file, save_summary_to_notion, parse_time_to_milliseconds
+from src.core import collect_timings
+from src.extractors import extract_video_id
+from src.utils.utils import save_summary_to_file, save_summary_to_notion, save_transcript_to_file, parse_time_to_milliseconds
 
+OUTPUT_TITLES = {"tldr": "TL;DR", "key_points": "Key Points", "chapters": "Chapters", "tags": "Tags"}
 
 
+def render_outputs(summary, outputs):
+    """Combine the summary and the other requested outputs into one Markdown document"""
+    sections = [summary] if summary else []
+    sections.extend(
+        f"## {title}\n\n{outputs[name]}" for name, title in OUTPUT_TITLES.items() if name in outputs
+    )
+    return "\n\n".join(sections)
+
+
+async def stream_summary(agent, video_url, outputs, **time_range):
+    """Print the summary as it is generated and return the full document"""
+    document = ""
+    async for event in agent.astream(video_url, outputs=outputs, **time_range):
+        data = event["data"]
+        if event["event"] == "stage":
+            if data["stage"] == "transcript_fetched":
+                print(f"📜 Transcript fetched ({data['chars']} characters)", file=sys.stderr)
+            elif data["stage"] == "chunk_done":
+                print(f"🧩 Chunk {data['completed']}/{data['total']} done", file=sys.stderr)
+            elif data["stage"] == "chapter_done":
+                print(f"📖 Chapter {data['completed']}/{data['total']} done", file=sys.stderr)
+            elif data["stage"] == "output_done":
+                print(f"🏷️  {OUTPUT_TITLES[data['output']]} done", file=sys.stderr)
+            elif data["stage"] == "cache_lookup" and data["cache_hit"]:
+                print("⚡ Summary served from cache", file=sys.stderr)
+        elif event["event"] == "token":
+            print(data["text"], end="", flush=True)
+        elif event["event"] == "done":
+            summary = data["summary"]
+            if data["cache_hit"]:
+                print(summary, end="")
+            print()
+            # The other outputs aren't streamed; they follow the summary
+            extras = render_outputs("", data["outputs"])
+            if extras:
+                print(f"\n{extras}")
+            document = render_outputs(summary, data["outputs"])
+    return document
+
+
+def watch_summary(agent, video_url, poll_seconds):
+    """Keep a running summary of a live stream, printing it after every update"""
+    from src.agents import LiveSummarizer, WatchConfig
+
+    watcher = LiveSummarizer(agent, video_url, WatchConfig(poll_seconds=poll_seconds))
+
+    def on_update(state):
+        print(
+            f"\n🔴 Update {state.updates} (captions up to {state.watermark_ms / 1000:.0f}s, "
+            f"{state.live_status or 'not live'})\n"
+        )
+        print(state.summary)
+
+    print(f"👀 Watching {video_url}, checking for new captions every {poll_seconds:.0f}s (Ctrl+C to stop)")
+    try:
+        watcher.watch(on_update)
+    except KeyboardInterrupt:
+        print("\n⏹️  Stopped watching")
+    return watcher.state.summary
+
+
+def print_timings(timings):
+    """Print the per-stage breakdown collected during the run"""
+    breakdown = timings.to_dict()
+    print("\n⏱️  Stage timings (stages can nest and overlap):")
+    for stage, ms in sorted(breakdown["stages_ms"].items(), key=lambda item: -item[1]):
+        errors = breakdown["errors"].get(stage)
+        suffix = f"  ({errors} failed)" if errors else ""
+        print(f"   {stage:<18} {ms:>10.1f} ms{suffix}")
+    for kind, value in breakdown["sizes"].items():
+        print(f"   {kind:<18} {value:>10}")
+
+
+def run_batch(args):
+    """Summarize every video of a URL file, playlist or channel into a JSONL file"""
+    time_ranges = None
+    if args.time:
+        try:
+            time_ranges = parse_time_to_milliseconds(args.time)
+        except ValueError as e:
+            print(f"❌ Error parsing time range: {e}")
+            return
+
+    from src.agents import YouTubeSummarizerAgent
+    from src.jobs import BatchConfig, BatchRunner, expand_batch_source
+
+    agent = YouTubeSummarizerAgent()
+    try:
+        urls, invalid = expand_batch_source(args.batch, agent.extractor)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    # The same source maps to the same file, so rerunning a command resumes it
+    output = args.output or (
+        f"outputs/batch_{hashlib.sha1(args.batch.encode('utf-8')).hexdigest()[:10]}.jsonl"
+    )
+    save_targets = [t for t, on in (("local", args.save_local), ("notion", args.save_notion)) if on]
+    runner = BatchRunner(
+        agent,
+        output,
+        BatchConfig(
+            extraction_concurrency=args.extraction_concurrency,
+            llm_concurrency=args.llm_concurrency,
+            save_targets=save_targets,
+            time_ranges=time_ranges,
+        ),
+    )
+    print(f"📚 {len(urls)} videos, writing results to {output}")
+    if invalid:
+        print(f"⚠️ {len(invalid)} lines of {args.batch} are not videos and are recorded as failed")
+
+    def on_record(record):
+        mark = "✅" if record["status"] == "succeeded" else "❌"
+        detail = record.get("error") or f"{record['elapsed_seconds']:.1f}s"
+        print(f"{mark} {record['url']} ({detail})")
+
+    report = runner.run(urls, on_record=on_record, invalid=invalid)
+    agent.close()
+    print(
+        f"Done: {report.succeeded} succeeded, {report.failed} failed, "
+        f"{report.skipped} already done"
+    )
+
 
 def main():
     parser = argparse.ArgumentParser(description="YouTube Video Summarizer")
-    parser.add_argument(
-        "-l", "--link", required=True, help="YouTube video URL to summarize"
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument(
+        "-l", "--link", help="YouTube video URL to summarize"
+    )
+    source.add_argument(
+        "-b", "--batch",
+        help="File of video URLs (one per line), or a playlist or channel URL, to summarize in one run",
     )
 
     parser.add_argument(
         "-t", "--time", 
-        help="Time range in YouTube format (e.g., '0:00:00-1:00:00' or '30-90' for seconds)"
+        help="Time range(s) in YouTube format (e.g., '0:00:00-1:00:00', '30-90' for seconds, or '0:00-5:00,20:00-25:00')"
+    )
+    parser.add_argument(
+        "--outputs",
+        default="summary",
+        help="Comma-separated outputs generated from one transcript fetch for a single video: summary, tldr, key_points, chapters, tags",
     )
     parser.add_argument(
         "--save_local",
@@ -25,48 +164,146 @@ def main():
     parser.add_argument(
         "--save_notion", action="store_true", help="Save summary to Notion"
     )
+    parser.add_argument(
+        "--save_transcript",
+        action="store_true",
+        help="Also save the raw transcript to the outputs directory",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Print the summary incrementally as it is generated",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Follow a live stream, updating a running summary from the new captions until it ends",
+    )
+    parser.add_argument(
+        "--watch_interval", type=float, default=180,
+        help="Watch mode: seconds between checks for new captions",
+    )
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print a per-stage latency breakdown at the end",
+    )
+    parser.add_argument(
+        "-o", "--output",
+        help="Batch mode: JSONL file for the results, also used to resume (default: outputs/batch_<source hash>.jsonl)",
+    )
+    parser.add_argument(
+        "--extraction_concurrency", type=int, default=4,
+        help="Batch mode: videos fetching transcripts at once",
+    )
+    parser.add_argument(
+        "--llm_concurrency", type=int, default=2,
+        help="Batch mode: videos being summarized by the LLM at once",
+    )
 
 
     args = parser.parse_args()
 
+    from src.agents.outputs import parse_outputs
+
     try:
-        start_time = datetime.now()
+        outputs = parse_outputs(args.outputs)
+    except ValueError as e:
+        print(f"❌ {e}")
+        return
+
+    if args.watch and (args.batch or args.time or args.stream or outputs != ["summary"]):
+        print("❌ --watch follows one whole stream and can't be combined with -b, -t, --stream or --outputs")
+        return
+
+    if args.batch:
+        # Batch items are summarized and cached as the summary alone
+        single_only = [
+            flag
+            for flag, used in (
+                ("--outputs", outputs != ["summary"]),
+                ("--stream", args.stream),
+                ("--save_transcript", args.save_transcript),
+            )
+            if used
+        ]
+        if single_only:
+            parser.error(f"-b can't be combined with {', '.join(single_only)}")
+
+    if args.batch:
+        with collect_timings() as timings:
+            run_batch(args)
+        if args.timings:
+            print_timings(timings)
+        return
+
+    try:
+        with collect_timings() as timings:
+            start_time = datetime.now()
 
-        agent = YouTubeSummarizerAgent()
-        
-        # Parse time range if provided
-        if args.time:
             try:
-                start_time_ms, end_time_ms = parse_time_to_milliseconds(args.time)
-                print(f"🕒 Processing time range: {start_time_ms/1000:.1f}s to {end_time_ms/1000:.1f}s")
-                summary = agent.summarize_video(
-                    args.link, 
-                    enable_time_range=True,
-                    start_time=start_time_ms,
-                    end_time=end_time_ms
-                )
+                extract_video_id(args.link)
             except ValueError as e:
-                print(f"❌ Error parsing time range: {e}")
-                print("💡 Examples: '30-90', '0:30-1:30', '0:00:30-0:01:30'")
+                print(f"❌ {e}")
                 return
-        else:
-            summary = agent.summarize_video(args.link)
 
-        end_time = datetime.now()
-        duration = (end_time - start_time).total_seconds() / 60
+            # Imported here so --help and argument errors don't pay for LangChain
+            from src.agents import YouTubeSummarizerAgent
 
-        print(
-            f"Completed at {end_time.strftime('%Y-%m-%d %H:%M:%S')} (took {duration:.2f} minutes)"
-        )
+            agent = YouTubeSummarizerAgent()
+        
+            # Parse time range if provided
+            if args.time:
+                try:
+                    time_ranges = parse_time_to_milliseconds(args.time)
+                except ValueError as e:
+                    print(f"❌ Error parsing time range: {e}")
+                    print("💡 Examples: '30-90', '0:30-1:30', '0:00:30-0:01:30', '0:00-5:00,20:00-25:00'")
+                    return
+                for start_time_ms, end_time_ms in time_ranges:
+                    print(f"🕒 Processing time range: {start_time_ms/1000:.1f}s to {end_time_ms/1000:.1f}s")
+                time_range = {"time_ranges": time_ranges}
+            else:
+                time_range = {}
+
+            if args.watch:
+                summary = watch_summary(agent, args.link, args.watch_interval)
+                if not summary:
+                    print("❌ No captions were summarized")
+                    return
+            elif args.stream:
+                summary = asyncio.run(stream_summary(agent, args.link, outputs, **time_range))
+            else:
+                result = agent.run(args.link, outputs=outputs, **time_range)
+                summary = render_outputs(result.get("summarized_text"), result.get("output_texts", {}))
+                route = result.get("route")
+                if args.timings and route:
+                    print(
+                        f"🧭 Route: {route['name']} ({route['model_name']}, {route['strategy']}, "
+                        f"~{route['transcript_tokens']} transcript tokens)"
+                    )
+
+            end_time = datetime.now()
+            duration = (end_time - start_time).total_seconds() / 60
+
+            print(
+                f"Completed at {end_time.strftime('%Y-%m-%d %H:%M:%S')} (took {duration:.2f} minutes)"
+            )
+
+            if args.save_transcript:
+                filename = save_transcript_to_file(args.link, time_range.get("time_ranges"))
+                print(f"\nTranscript saved to: {filename}")
+
+            if args.save_local:
+                filename = save_summary_to_file(summary)
+                print(f"\nSummary saved to: {filename}")
 
-        if args.save_local:
-            filename = save_summary_to_file(summary)
-            print(f"\nSummary saved to: {filename}")
+            if args.save_notion:
+                message = save_summary_to_notion(summary, args.link)
+                print(message)
 
-        if args.save_notion:
-            filename = save_summary_to_file(summary)
-            message = save_summary_to_notion(filename, args.link)
-            print(message)
+        if args.timings:
+            print_timings(timings)
 
     except Exception:
         raise
@@ -79,5 +316,11 @@ if __name__ == "__main__":
     python app.py -l "https://www.youtube.com/watch?v=5eAS2xEn_D8" --save_notion
     python app.py -l "https://www.youtube.com/watch?v=5eAS2xEn_D8" -t "30-120" --save_local
     python app.py -l "https://www.youtube.com/watch?v=5GEoaC_g-Wk" -t "0:00:00-1:00:00" --save_notion
+    python app.py -l "https://www.youtube.com/watch?v=5eAS2xEn_D8" --stream
+    python app.py -l "https://www.youtube.com/watch?v=5eAS2xEn_D8" --timings
+    python app.py -l "https://www.youtube.com/watch?v=5eAS2xEn_D8" --outputs summary,tldr,tags --save_local
+    python app.py -l "https://www.youtube.com/watch?v=xxxxxxxxxxx" --watch --watch_interval 120 --save_local
+    python app.py -b urls.txt --llm_concurrency 4 -o outputs/backlog.jsonl
+    python app.py -b "https://www.youtube.com/playlist?list=PLxxxx" --save_local
     """
     main()
@@ -0,0 +1,79 @@
+"""
+Per-request latency of one-off requests.get calls versus the shared pooled
+session, against a local keep-alive HTTP server.
+
+Usage:
+    python benchmarks/http_pooling.py --requests 500 --concurrency 4
+"""
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import get_session  # noqa: E402
+
+BODY = b'{"events": []}' * 64
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Send headers and body in one segment; otherwise Nagle plus delayed ACKs
+    # add ~40ms to every request on a reused connection
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(BODY)))
+        self.end_headers()
+        self.wfile.write(BODY)
+
+    def log_message(self, *args):
+        pass
+
+
+def measure(get, url: str, total: int, concurrency: int):
+    def one(_):
+        started = time.perf_counter()
+        get(url).raise_for_status()
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = sorted(pool.map(one, range(total)))
+    elapsed = time.perf_counter() - started
+    return {
+        "p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "p95_ms": round(latencies[int(len(latencies) * 0.95) - 1] * 1000, 2),
+        "throughput_rps": round(total / elapsed, 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), KeepAliveHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/timedtext"
+
+    session = get_session("benchmark")
+    print("one-off requests.get:", measure(lambda u: requests.get(u, timeout=30), url, args.requests, args.concurrency))
+    print("pooled session:      ", measure(session.get, url, args.requests, args.concurrency))
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Check the cold-start import cost of the CLI (app) and the API server (main).
+
+Each entry point is imported in a fresh interpreter with `python -X importtime`.
+The check fails if the total import time exceeds its budget, or if a heavy
+dependency that should only load when its stage runs was imported up front.
+
+Usage:
+    python benchmarks/import_budget.py
+    python benchmarks/import_budget.py --scale 2   # slower machine
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Module -> (budget in ms, packages that must not be imported)
+BUDGETS = {
+    "app": (300, ("yt_dlp", "youtube_transcript_api", "langchain_google_genai", "langgraph", "langchain_core", "fastapi", "httpx")),
+    "main": (800, ("yt_dlp", "youtube_transcript_api", "langchain_google_genai", "langgraph")),
+}
+
+
+def import_time_ms(module: str) -> float:
+    """Sum of the cumulative times of the top-level imports triggered by `import module`"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    total_us = 0
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative_us, name = line[len("import time:"):].split("|")
+        # Top-level entries are indented by one space; nested ones are already included
+        if not name.startswith("  ") and cumulative_us.strip().isdigit():
+            total_us += int(cumulative_us)
+    return total_us / 1000
+
+
+def loaded_modules(module: str) -> set:
+    code = f"import json, sys; import {module}; print(json.dumps(sorted(sys.modules)))"
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True
+    )
+    return {name.split(".")[0] for name in json.loads(result.stdout.splitlines()[-1])}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="best of N runs is compared to the budget")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget by this factor")
+    args = parser.parse_args()
+
+    ok = True
+    for module, (budget_ms, forbidden) in BUDGETS.items():
+        elapsed = min(import_time_ms(module) for _ in range(args.runs))
+        budget = budget_ms * args.scale
+        eager = sorted(set(forbidden) & loaded_modules(module))
+        passed = elapsed <= budget and not eager
+        ok = ok and passed
+        print(f"{'ok  ' if passed else 'FAIL'} import {module}: {elapsed:.0f} ms (budget {budget:.0f} ms)")
+        if eager:
+            print(f"     imported eagerly: {', '.join(eager)}")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Compare peak RSS of the legacy json3 parsing path with the streaming one.
+
+The legacy path is what _fetch_and_clean_subtitles used to do: json.loads the
+whole document, collect every segment string, then join them. The streaming
+path feeds 64 KiB chunks through iter_json3_events into a SubtitleIndex.
+Each mode runs in a fresh interpreter so their peaks don't mix.
+
+Usage:
+    python benchmarks/json3_memory.py --hours 10
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WORDS = "the of and to in is you that it he was for on are as with his they at be this have from".split()
+
+
+def write_fixture(path: str, hours: float) -> None:
+    """Auto-caption style json3: one event per ~2 seconds, one seg per word"""
+    rng = random.Random(0)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write('{"wireMagic": "pb3", "pens": [{}], "events": [')
+        for i in range(int(hours * 3600 / 2)):
+            segs = [{"utf8": (" " if j else "") + rng.choice(WORDS), "tOffsetMs": j * 200} for j in range(8)]
+            event = {"tStartMs": i * 2000, "dDurationMs": 2500, "wWinId": 1, "segs": segs}
+            f.write(("," if i else "") + json.dumps(event))
+        f.write("]}")
+
+
+def run_legacy(path: str) -> int:
+    with open(path, "rb") as f:
+        subtitle_data = json.loads(f.read())
+    text_segments = []
+    for event in subtitle_data.get("events", []):
+        for segment in event.get("segs", []):
+            if "utf8" in segment:
+                text_segments.append(segment["utf8"])
+    return len(" ".join(text_segments).strip())
+
+
+def run_streaming(path: str) -> int:
+    from src.extractors.json3_stream import iter_json3_events
+    from src.extractors.subtitle_index import SubtitleIndex
+
+    def chunks():
+        with open(path, "rb") as f:
+            yield from iter(lambda: f.read(64 * 1024), b"")
+
+    index = SubtitleIndex.from_events(iter_json3_events(chunks()))
+    return len(index.slice_text())
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in KiB on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--hours", type=float, default=10)
+    parser.add_argument("--mode", choices=["legacy", "streaming"])
+    parser.add_argument("--path")
+    args = parser.parse_args()
+
+    if args.mode:
+        baseline = peak_rss_mb()
+        chars = run_legacy(args.path) if args.mode == "legacy" else run_streaming(args.path)
+        print(json.dumps({"mode": args.mode, "chars": chars, "peak_rss_mb": round(peak_rss_mb(), 1), "startup_rss_mb": round(baseline, 1)}))
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fixture.json3")
+        write_fixture(path, args.hours)
+        print(f"fixture: {args.hours}h, {os.path.getsize(path) / 1e6:.1f} MB")
+        for mode in ("legacy", "streaming"):
+            result = subprocess.run(
+                [sys.executable, __file__, "--mode", mode, "--path", path],
+                check=True, capture_output=True, text=True,
+            )
+            print(result.stdout.strip())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+Measure the near-duplicate index: fingerprint cost, how far edited and
+unrelated transcripts land from each other, and add/find latency once the
+index holds hundreds of thousands of entries.
+
+Entries are random 64-bit fingerprints, which is what SimHash gives unrelated
+transcripts; queries are either random (the usual miss) or a stored
+fingerprint with up to max_distance bits flipped (a hit).
+
+Usage:
+    python benchmarks/near_duplicates.py --entries 300000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.agents.near_duplicates import (  # noqa: E402
+    NearDuplicateConfig,
+    NearDuplicateIndex,
+    hamming_distance,
+    transcript_fingerprint,
+)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: round(samples[min(len(samples) - 1, int(q * len(samples)))] * 1000, 3)
+    return {"p50_ms": pick(0.5), "p95_ms": pick(0.95), "p99_ms": pick(0.99)}
+
+
+def transcript(rng: random.Random, words: int) -> list:
+    vocab = [f"word{i}" for i in range(5000)]
+    return [rng.choice(vocab) for _ in range(words)]
+
+
+def edited(rng: random.Random, words: list, ratio: float) -> list:
+    """Replace a fraction of the words, as differing auto-captions would"""
+    words = list(words)
+    for i in rng.sample(range(len(words)), int(len(words) * ratio)):
+        words[i] = f"edit{rng.randrange(1000)}"
+    return words
+
+
+def measure_fingerprints(rng: random.Random, words: int) -> dict:
+    base = transcript(rng, words)
+    started = time.perf_counter()
+    fingerprint = transcript_fingerprint(" ".join(base))
+    seconds = time.perf_counter() - started
+    distances = {
+        f"edited_{ratio:.0%}": hamming_distance(
+            fingerprint, transcript_fingerprint(" ".join(edited(rng, base, ratio)))
+        )
+        for ratio in (0.01, 0.05, 0.1, 0.3)
+    }
+    distances["unrelated"] = hamming_distance(
+        fingerprint, transcript_fingerprint(" ".join(transcript(rng, words)))
+    )
+    return {"words": words, "fingerprint_ms": round(seconds * 1000, 1), "distance_bits": distances}
+
+
+def flip_bits(rng: random.Random, fingerprint: int, bits: int) -> int:
+    for bit in rng.sample(range(64), bits):
+        fingerprint ^= 1 << bit
+    return fingerprint
+
+
+def measure_index(rng: random.Random, path: str, entries: int, queries: int) -> dict:
+    max_distance = NearDuplicateConfig().max_distance
+    index = NearDuplicateIndex(path, max_distance)
+    stored = []
+    started = time.perf_counter()
+    add_samples = []
+    for i in range(entries):
+        fingerprint = rng.getrandbits(64)
+        stored.append(fingerprint)
+        add_started = time.perf_counter()
+        index.add(f"video{i:07d}", fingerprint)
+        add_samples.append(time.perf_counter() - add_started)
+    fill_seconds = time.perf_counter() - started
+
+    miss_samples, hit_samples, found = [], [], 0
+    for _ in range(queries):
+        query = rng.getrandbits(64)
+        started = time.perf_counter()
+        index.find(query)
+        miss_samples.append(time.perf_counter() - started)
+
+        target = rng.randrange(entries)
+        query = flip_bits(rng, stored[target], rng.randint(0, max_distance))
+        started = time.perf_counter()
+        match = index.find(query)
+        hit_samples.append(time.perf_counter() - started)
+        found += match is not None and match.video_id == f"video{target:07d}"
+    index.close()
+    return {
+        "entries": entries,
+        "fill_seconds": round(fill_seconds, 1),
+        "db_mb": round(os.path.getsize(path) / 1e6, 1),
+        "add": percentiles(add_samples),
+        "find_miss": percentiles(miss_samples),
+        "find_hit": percentiles(hit_samples),
+        "hit_recall": round(found / queries, 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--entries", type=int, default=300_000)
+    parser.add_argument("--queries", type=int, default=2_000)
+    parser.add_argument("--words", type=int, default=10_000, help="Transcript length; about an hour of speech")
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    print(json.dumps(measure_fingerprints(rng, args.words)))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "fingerprints.sqlite3")
+        print(json.dumps(measure_index(rng, path, args.entries, args.queries)))
+
+
+if __name__ == "__main__":
+    main()
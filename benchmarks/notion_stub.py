@@ -0,0 +1,182 @@
+"""
+Upload a long summary through NotionSaver to a local Notion stand-in and check
+that every block arrives, in order, within the API limits.
+
+The stand-in rejects requests with more than 100 children or rich_text items
+over 2000 characters, and answers 429 with Retry-After once clients exceed
+the configured request rate.
+
+Usage:
+    python benchmarks/notion_stub.py --paragraphs 1000 --rate 3
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.core import TokenBucket  # noqa: E402
+from src.notion_integration.noiton_saver import NotionSaver  # noqa: E402
+
+
+class NotionStub(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, rate: float):
+        super().__init__(("127.0.0.1", 0), NotionStubHandler)
+        self.rate = rate
+        self.lock = threading.Lock()
+        self.pages = {}
+        self.recent = deque()
+        self.requests = 0
+        self.throttled = 0
+        self.archived = 0
+
+    def admit(self) -> bool:
+        """Sliding one-second window; False means the request gets a 429."""
+        now = time.monotonic()
+        with self.lock:
+            self.requests += 1
+            while self.recent and now - self.recent[0] > 1.0:
+                self.recent.popleft()
+            if len(self.recent) >= self.rate:
+                self.throttled += 1
+                return False
+            self.recent.append(now)
+            return True
+
+
+class NotionStubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def do_POST(self):
+        self._handle()
+
+    def do_PATCH(self):
+        self._handle()
+
+    def _handle(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if not self.server.admit():
+            return self._reply(429, {"code": "rate_limited"}, {"Retry-After": "1"})
+
+        children = body.get("children", [])
+        error = validate(children)
+        if error:
+            return self._reply(400, {"code": "validation_error", "message": error})
+
+        with self.server.lock:
+            if self.path == "/pages":
+                page_id = str(uuid.uuid4())
+                self.server.pages[page_id] = list(children)
+                return self._reply(200, {"object": "page", "id": page_id})
+            parts = self.path.strip("/").split("/")
+            if len(parts) == 2 and parts[0] == "pages" and body.get("archived"):
+                if self.server.pages.pop(parts[1], None) is not None:
+                    self.server.archived += 1
+                    return self._reply(200, {"object": "page", "id": parts[1], "archived": True})
+            if len(parts) == 3 and parts[0] == "blocks" and parts[2] == "children":
+                page = self.server.pages.get(parts[1])
+                if page is not None:
+                    page.extend(children)
+                    return self._reply(200, {"object": "list", "results": children})
+        self._reply(404, {"code": "object_not_found"})
+
+    def _reply(self, status, payload, headers=None):
+        data = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def validate(children):
+    if len(children) > 100:
+        return f"{len(children)} children exceeds the limit of 100"
+    for block in children:
+        rich_text = block.get(block["type"], {}).get("rich_text", [])
+        if len(rich_text) > 100:
+            return f"{len(rich_text)} rich_text items exceeds the limit of 100"
+        for item in rich_text:
+            if len(item["text"]["content"]) > 2000:
+                return "rich_text content exceeds 2000 characters"
+    return None
+
+
+def block_text(block):
+    rich_text = block.get(block["type"], {}).get("rich_text", [])
+    return "".join(item["text"]["content"] for item in rich_text)
+
+
+def make_summary(paragraphs: int) -> str:
+    parts = []
+    for i in range(paragraphs):
+        if i % 50 == 0:
+            parts.append(f"## Section {i // 50}")
+        # Every 25th paragraph is long enough to need splitting
+        length = 4500 if i % 25 == 0 else 300
+        parts.append((f"Paragraph {i}. " * length)[:length])
+    return "\n\n".join(parts)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--paragraphs", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=3, help="requests per second allowed by the stand-in")
+    parser.add_argument("--client-rate", type=float, default=None, help="client limiter rate (default: --rate)")
+    args = parser.parse_args()
+
+    server = NotionStub(args.rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    saver = NotionSaver(
+        notion_token="stub-token",
+        parent_page_id="stub-parent",
+        base_url=f"http://127.0.0.1:{server.server_address[1]}",
+    )
+    client_rate = args.client_rate or args.rate
+    saver.rate_limiter = TokenBucket(rate=client_rate, capacity=max(1, int(client_rate)))
+
+    content = make_summary(args.paragraphs)
+    expected = saver._text_to_blocks(content)
+
+    started = time.perf_counter()
+    page = saver.create_page("Benchmark", content)
+    elapsed = time.perf_counter() - started
+    server.shutdown()
+
+    if page is None:
+        sys.exit("upload failed")
+    received = server.pages[page["id"]]
+    in_order = [block_text(b) for b in received] == [block_text(b) for b in expected]
+    print(
+        json.dumps(
+            {
+                "blocks": len(received),
+                "in_order": in_order,
+                "requests": server.requests,
+                "throttled": server.throttled,
+                "seconds": round(elapsed, 2),
+                "blocks_per_second": round(len(received) / elapsed, 1),
+            }
+        )
+    )
+    if not in_order:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
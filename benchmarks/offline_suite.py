@@ -0,0 +1,206 @@
+"""
+Offline latency/throughput suite for the extractor, the summarization graph
+and the /summarize endpoint, with YouTube and Gemini replaced by local
+stand-ins (see stand_ins.py).
+
+Scenarios, per fixture:
+    fetch_and_clean  download + parse + clean of the whole json3 document
+    slice            5-minute time-range slice of an already parsed transcript
+    graph            YouTubeSummarizerAgent.run with a fake chat model
+    endpoint         GET /summarize from N concurrent clients
+
+Usage:
+    python benchmarks/offline_suite.py --fixtures 1m,1h --save benchmarks/baseline.json
+    python benchmarks/offline_suite.py --baseline benchmarks/baseline.json
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Awaitable, Callable, Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Measure the pipeline itself, not the summary cache
+os.environ["SUMMARY_CACHE_BACKEND"] = "none"
+
+import httpx  # noqa: E402
+
+from stand_ins import (  # noqa: E402
+    FIXTURE_MINUTES,
+    FakeChatModel,
+    FixtureServer,
+    make_info_provider,
+    prepare_fixtures,
+    video_url,
+)
+from src.agents import YouTubeSummarizerAgent  # noqa: E402
+from src.extractors import YouTubeSubtitleExtractor  # noqa: E402
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    index = max(0, min(len(sorted_values) - 1, round(q * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def report(latencies: List[float], elapsed: float) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(statistics.median(latencies) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+def run_threads(fn: Callable[[int], object], total: int, concurrency: int) -> Dict[str, float]:
+    def one(i: int) -> float:
+        started = time.perf_counter()
+        fn(i)
+        return time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        latencies = list(pool.map(one, range(total)))
+    return report(latencies, time.perf_counter() - started)
+
+
+async def run_clients(fn: Callable[[int], Awaitable[object]], total: int, concurrency: int) -> Dict[str, float]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int) -> float:
+        async with semaphore:
+            started = time.perf_counter()
+            await fn(i)
+            return time.perf_counter() - started
+
+    started = time.perf_counter()
+    latencies = await asyncio.gather(*(one(i) for i in range(total)))
+    return report(list(latencies), time.perf_counter() - started)
+
+
+def run_suite(args, server: FixtureServer) -> Dict[str, Dict[str, float]]:
+    import main as api
+
+    extractor = YouTubeSubtitleExtractor(
+        log_level=logging.WARNING,
+        prefer_transcript_api=False,
+        info_provider=make_info_provider(server.base_url),
+    )
+    llm = FakeChatModel(
+        latency=args.llm_latency,
+        tokens_per_second=args.llm_tokens_per_second,
+        output_tokens=args.llm_output_tokens,
+    )
+    agent = YouTubeSummarizerAgent(llm=llm, extractor=extractor)
+    # The ASGI transport skips the lifespan, so the app uses this agent
+    api.agent = agent
+
+    results = {}
+    rng = random.Random(0)
+    for name in args.fixtures:
+        url = video_url(name)
+        duration_ms = FIXTURE_MINUTES.get(name, 60) * 60_000
+        _, subtitle_url = extractor._get_subtitle_url(url)
+
+        results[f"fetch_and_clean[{name}]"] = run_threads(
+            lambda i: extractor._fetch_and_clean_subtitles(subtitle_url),
+            args.iterations, args.concurrency,
+        )
+
+        index = extractor._get_subtitle_index(url)
+
+        def slice_once(i: int) -> str:
+            start = rng.randrange(0, max(1, duration_ms - 300_000))
+            return index.slice_text([(start, start + 300_000)])
+
+        results[f"slice[{name}]"] = run_threads(slice_once, args.iterations * 10, args.concurrency)
+
+        # Distinct ranges so concurrent runs are not coalesced into one
+        results[f"graph[{name}]"] = run_threads(
+            lambda i: agent.run(url, time_ranges=[(0, duration_ms - i * 1000)]),
+            args.iterations, args.concurrency,
+        )
+
+        async def endpoint() -> Dict[str, float]:
+            transport = httpx.ASGITransport(app=api.app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+                async def request(i: int) -> None:
+                    end = duration_ms // 1000 - i - 1
+                    response = await client.get("/summarize", params={"url": url, "time": f"0-{end}"})
+                    response.raise_for_status()
+
+                return await run_clients(request, args.iterations, args.clients)
+
+        results[f"endpoint[{name}]"] = asyncio.run(endpoint())
+        print(f"  {name} done", file=sys.stderr)
+
+    agent.close()
+    return results
+
+
+def compare(results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float) -> bool:
+    """Print the change against the baseline; False if any p95 or throughput regressed beyond tolerance"""
+    ok = True
+    print(f"\n{'scenario':<24}{'p95 ms':>12}{'base':>10}{'change':>9}{'rps':>10}{'base':>10}{'change':>9}")
+    for scenario, current in results.items():
+        base = baseline.get(scenario)
+        if base is None:
+            print(f"{scenario:<24}{current['p95_ms']:>12}{'-':>10}{'':>9}{current['throughput_rps']:>10}")
+            continue
+        p95_change = current["p95_ms"] / base["p95_ms"] - 1 if base["p95_ms"] else 0.0
+        rps_change = current["throughput_rps"] / base["throughput_rps"] - 1 if base["throughput_rps"] else 0.0
+        regressed = p95_change > tolerance or rps_change < -tolerance
+        ok = ok and not regressed
+        print(
+            f"{scenario:<24}{current['p95_ms']:>12}{base['p95_ms']:>10}{p95_change:>+9.0%}"
+            f"{current['throughput_rps']:>10}{base['throughput_rps']:>10}{rps_change:>+9.0%}"
+            + ("  REGRESSION" if regressed else "")
+        )
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fixtures", default="1m,10m,1h,10h", type=lambda s: s.split(","))
+    parser.add_argument("--recorded-dir", help="directory of recorded <fixture>.json3 captures to use instead of generated ones")
+    parser.add_argument("--iterations", type=int, default=20)
+    parser.add_argument("--concurrency", type=int, default=4, help="threads for the in-process scenarios")
+    parser.add_argument("--clients", type=int, default=8, help="concurrent clients for the endpoint scenario")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="fake model time to first token, seconds")
+    parser.add_argument("--llm-tokens-per-second", type=float, default=2000)
+    parser.add_argument("--llm-output-tokens", type=int, default=400)
+    parser.add_argument("--save", help="write the results to this baseline file")
+    parser.add_argument("--baseline", help="compare against this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative regression")
+    args = parser.parse_args()
+
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        fixtures = prepare_fixtures(tmp, args.fixtures, args.recorded_dir)
+        with FixtureServer(fixtures) as server:
+            results = run_suite(args, server)
+
+    print(json.dumps(results, indent=2))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+            f.write("\n")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
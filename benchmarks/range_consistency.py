@@ -0,0 +1,69 @@
+"""
+Check that time-range queries on SubtitleIndex return exactly the events the
+streaming iter_event_segments filter returns.
+
+Fixtures mix ordinary captions with long events that outlast the short ones
+after them, zero-length events and ranges touching event edges, which is
+where a bisect-based lookup can disagree with the plain overlap test. The
+check fails on the first mismatch.
+
+Usage:
+    python benchmarks/range_consistency.py
+    python benchmarks/range_consistency.py --cases 20000 --seed 7
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.extractors.json3_stream import iter_event_segments  # noqa: E402
+from src.extractors.subtitle_index import SubtitleIndex, merge_time_ranges  # noqa: E402
+
+
+def make_events(rng: random.Random, count: int) -> list:
+    events, start = [], 0
+    for i in range(count):
+        start += rng.choice([0, 500, 1000, 2000, 3000])
+        duration = rng.choice([0, 500, 1000, 2500, 10_000, 60_000])
+        events.append({"tStartMs": start, "dDurationMs": duration, "segs": [{"utf8": f"e{i}"}]})
+    return events
+
+
+def make_ranges(rng: random.Random, events: list) -> list:
+    edges = [e["tStartMs"] for e in events] + [e["tStartMs"] + e["dDurationMs"] for e in events]
+    ranges = []
+    for _ in range(rng.randint(1, 3)):
+        # Half the ranges start or end exactly on an event edge
+        start = rng.choice(edges) if rng.random() < 0.5 else rng.randrange(0, max(edges) + 1)
+        end = start + rng.choice([0, 1, 999, 1000, 5000, 30_000])
+        ranges.append((start, end))
+    return ranges
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    for case in range(args.cases):
+        events = make_events(rng, rng.randint(1, 40))
+        ranges = make_ranges(rng, events)
+        index = SubtitleIndex.from_events(events)
+        expected = list(iter_event_segments(events, merge_time_ranges(ranges)))
+        indexed = index.segments(ranges)
+        sliced = index.slice_text(ranges)
+        if indexed != expected or sliced != " ".join(expected):
+            print(f"FAIL case {case}: ranges {ranges}")
+            print(f"     streaming: {expected}")
+            print(f"     indexed:   {indexed}")
+            print(f"     sliced:    {sliced!r}")
+            sys.exit(1)
+    print(f"ok   {args.cases} cases: indexed and streaming range queries agree")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""
+Local stand-ins for YouTube and Gemini used by the offline benchmarks.
+
+- FixtureServer serves json3 files over keep-alive HTTP, like the timedtext endpoint.
+- make_info_provider returns a yt-dlp replacement for YouTubeSubtitleExtractor(info_provider=...).
+- FakeChatModel answers after a fixed latency and streams at a fixed token rate,
+  for YouTubeSummarizerAgent(llm=...).
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, Optional
+from urllib.parse import parse_qs, urlparse
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from json3_memory import write_fixture  # noqa: E402
+from src.extractors import extract_video_id  # noqa: E402
+
+# Fixture name -> video length in minutes
+FIXTURE_MINUTES = {"1m": 1, "10m": 10, "1h": 60, "10h": 600}
+
+
+def video_url(name: str) -> str:
+    return f"https://www.youtube.com/watch?v=bench-{name}"
+
+
+def prepare_fixtures(directory: str, names: List[str], recorded_dir: Optional[str] = None) -> Dict[str, str]:
+    """
+    Return fixture name -> json3 path.
+
+    Recorded captures in recorded_dir (<name>.json3) are used as is; any other
+    name from FIXTURE_MINUTES is generated as auto-caption style json3.
+    """
+    paths = {}
+    for name in names:
+        recorded = os.path.join(recorded_dir, f"{name}.json3") if recorded_dir else None
+        if recorded and os.path.exists(recorded):
+            paths[name] = recorded
+            continue
+        if name not in FIXTURE_MINUTES:
+            raise ValueError(f"Unknown fixture {name!r} and no recording found")
+        paths[name] = os.path.join(directory, f"{name}.json3")
+        write_fixture(paths[name], FIXTURE_MINUTES[name] / 60)
+    return paths
+
+
+class _FixtureHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    wbufsize = 64 * 1024
+
+    def do_GET(self):
+        video_id = parse_qs(urlparse(self.path).query).get("v", [""])[0]
+        path = self.server.fixtures.get(video_id.replace("bench-", "", 1))
+        if path is None:
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(os.path.getsize(path)))
+        self.end_headers()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(64 * 1024), b""):
+                self.wfile.write(chunk)
+
+    def log_message(self, *args):
+        pass
+
+
+class FixtureServer(ThreadingHTTPServer):
+    """Serves fixture json3 documents at /api/timedtext?v=bench-<name>"""
+
+    daemon_threads = True
+
+    def __init__(self, fixtures: Dict[str, str]):
+        super().__init__(("127.0.0.1", 0), _FixtureHandler)
+        self.fixtures = fixtures
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self):
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        self.server_close()
+
+
+def make_info_provider(base_url: str) -> Callable[[str], dict]:
+    """A yt-dlp extract_info replacement pointing subtitle URLs at the fixture server"""
+
+    def extract_info(url: str) -> dict:
+        video_id = extract_video_id(url)
+        minutes = FIXTURE_MINUTES.get(video_id.replace("bench-", "", 1), 0)
+        return {
+            "id": video_id,
+            "title": f"Benchmark video {video_id}",
+            "duration": minutes * 60,
+            "language": "en",
+            "subtitles": {},
+            "automatic_captions": {
+                "en": [{"ext": "json3", "url": f"{base_url}/api/timedtext?v={video_id}&fmt=json3"}]
+            },
+            "chapters": None,
+            "live_status": "not_live",
+        }
+
+    return extract_info
+
+
+class FakeChatModel(BaseChatModel):
+    """Chat model with a fixed time to first token and a fixed output token rate"""
+
+    latency: float = 0.2
+    tokens_per_second: float = 200.0
+    output_tokens: int = 400
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-benchmark"
+
+    def _tokens(self, messages: List[BaseMessage]) -> List[str]:
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        words = [f"# Summary of {prompt_chars} characters\n\n"]
+        words.extend(f"word{i} " for i in range(self.output_tokens - 1))
+        return words
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        time.sleep(self.latency + len(tokens) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs: Any) -> ChatResult:
+        tokens = self._tokens(messages)
+        await asyncio.sleep(self.latency + len(tokens) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    def _stream(self, messages, stop=None, run_manager=None, **kwargs: Any) -> Iterator[ChatGenerationChunk]:
+        time.sleep(self.latency)
+        for token in self._tokens(messages):
+            time.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+    async def _astream(
+        self, messages, stop=None, run_manager=None, **kwargs: Any
+    ) -> AsyncIterator[ChatGenerationChunk]:
+        await asyncio.sleep(self.latency)
+        for token in self._tokens(messages):
+            await asyncio.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
@@ -1,10 +1,42 @@
+import json
+from contextlib import asynccontextmanager
 from datetime import datetime
+from typing import TYPE_CHECKING, Any, AsyncIterator, Dict, List, Optional
 from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
-from src.agents import YouTubeSummarizerAgent
-from src.utils import validate_youtube_url
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel
+from src.core import LLMQueueTimeout, collect_timings, render_metrics
+from src.jobs import JobStore, JobWorkerConfig, JobWorkerPool
+from src.utils import get_notion_saver, validate_youtube_url
+from src.utils.utils import parse_time_to_milliseconds
 
-app = FastAPI(title="YouTube Video Summarizer")
+if TYPE_CHECKING:
+    from src.agents import YouTubeSummarizerAgent
+
+# One agent per worker process: building it loads the env, creates the LLM
+# client and compiles the graph, none of which should happen per request
+agent: Optional["YouTubeSummarizerAgent"] = None
+jobs: Optional[JobWorkerPool] = None
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    from src.agents import YouTubeSummarizerAgent
+
+    global agent, jobs
+    agent = YouTubeSummarizerAgent()
+    # Jobs left running by a previous process are queued again on start
+    jobs = JobWorkerPool(agent, JobStore.from_env(), JobWorkerConfig.from_env())
+    jobs.start()
+    yield
+    jobs.stop()
+    jobs.store.close()
+    agent.close()
+    agent = jobs = None
+
+
+app = FastAPI(title="YouTube Video Summarizer", lifespan=lifespan)
 
 
 @app.get("/")
@@ -12,29 +44,146 @@ async def root():
     return {"message": "Working!.."}
 
 
-@app.get("/summarize")
-async def summarize_youtube_video(url: str):
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type="text/plain; version=0.0.4")
+
+
+def _parse_time_ranges(time: Optional[str]):
+    if not time:
+        return None
     try:
-        if not validate_youtube_url(url):
-            raise HTTPException(status_code=400, detail="Invalid YouTube URL")
+        return parse_time_to_milliseconds(time)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=f"Invalid time range: {e}")
 
-        agent = YouTubeSummarizerAgent()
-        summary_text = agent.summarize_video(url)
-        timestamp = datetime.now().isoformat()
 
-        return JSONResponse(
-            content={
+def _parse_outputs(outputs: Optional[str]) -> List[str]:
+    # Already loaded by the agent, so importing it here is free
+    from src.agents import parse_outputs
+
+    try:
+        return parse_outputs(outputs)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/summarize")
+async def summarize_youtube_video(
+    url: str,
+    time: Optional[str] = None,
+    outputs: Optional[str] = None,
+    save_notion: bool = False,
+    timings: bool = False,
+):
+    if not validate_youtube_url(url):
+        raise HTTPException(status_code=400, detail="Invalid YouTube URL")
+    time_ranges = _parse_time_ranges(time)
+    requested = _parse_outputs(outputs)
+    if save_notion and "summary" not in requested:
+        raise HTTPException(status_code=400, detail="save_notion requires the summary output")
+
+    try:
+        with collect_timings() as collected:
+            result = await agent.arun(url, time_ranges=time_ranges, outputs=requested)
+            timestamp = datetime.now().isoformat()
+
+            content = {
                 "status": "success",
                 "url": url,
-                "summary": summary_text,
+                "summary": result.get("summarized_text"),
+                "outputs": result.get("output_texts", {}),
+                "cache_hit": result.get("cache_hit", False),
+                "route": result.get("route"),
                 "timestamp": timestamp,
             }
-        )
+            if save_notion:
+                # run_in_threadpool copies the context, so the upload is timed too
+                page = await run_in_threadpool(
+                    get_notion_saver().save_summary, result["summarized_text"], url
+                )
+                content["notion_page"] = page.get("url") if page else None
+        if timings:
+            content["timings"] = collected.to_dict()
 
+        return JSONResponse(content=content)
+
+    except LLMQueueTimeout as e:
+        # Over the model's rate budget for longer than the queue deadline
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "30"})
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing video: {str(e)}")
 
 
+def _format_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+@app.get("/summarize/stream")
+async def stream_youtube_video_summary(
+    url: str, time: Optional[str] = None, outputs: Optional[str] = None
+):
+    if not validate_youtube_url(url):
+        raise HTTPException(status_code=400, detail="Invalid YouTube URL")
+    time_ranges = _parse_time_ranges(time)
+    requested = _parse_outputs(outputs)
+
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            async for event in agent.astream(
+                url, time_ranges=time_ranges, outputs=requested
+            ):
+                yield _format_sse(event["event"], event["data"])
+        except Exception as e:
+            # Headers are already sent, so errors are reported in-band
+            yield _format_sse("error", {"detail": f"Error processing video: {str(e)}"})
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+class JobRequest(BaseModel):
+    url: str
+    time: Optional[str] = None
+    save_targets: List[str] = []
+    priority: int = 0
+    # "summary", or "watch" to keep a running summary of a live stream until it ends
+    kind: str = "summary"
+
+
+@app.post("/jobs", status_code=202)
+async def create_job(request: JobRequest):
+    if not validate_youtube_url(request.url):
+        raise HTTPException(status_code=400, detail="Invalid YouTube URL")
+    time_ranges = _parse_time_ranges(request.time)
+
+    try:
+        # The job table is SQLite, so it is written off the event loop
+        job = await run_in_threadpool(
+            jobs.submit,
+            request.url,
+            time_ranges,
+            request.save_targets,
+            request.priority,
+            request.kind,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    return {"job_id": job.id, "status": job.status}
+
+
+@app.get("/jobs/{job_id}")
+async def get_job(job_id: str):
+    job = await run_in_threadpool(jobs.store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+
 if __name__ == "__main__":
     import uvicorn
 
@@ -1,3 +1,49 @@
-from .summarizer_agent import YouTubeSummarizerAgent
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ["YouTubeSummarizerAgent"]
+# The agent pulls in LangChain and LangGraph, so it is only imported on first use
+_EXPORTS = {
+    "YouTubeSummarizerAgent": ".summarizer_agent",
+    "SummaryCache": ".summary_cache",
+    "InMemorySummaryCache": ".summary_cache",
+    "SQLiteSummaryCache": ".summary_cache",
+    "SummarizerConfig": ".summarizer_agent",
+    "CompactionConfig": ".compaction",
+    "Route": ".routing",
+    "RoutingPolicy": ".routing",
+    "SegmentTreeConfig": ".segment_tree",
+    "OUTPUT_TYPES": ".outputs",
+    "parse_outputs": ".outputs",
+    "LiveSummarizer": ".live",
+    "WatchConfig": ".live",
+    "WatchState": ".live",
+    "NearDuplicateConfig": ".near_duplicates",
+    "NearDuplicateIndex": ".near_duplicates",
+    "transcript_fingerprint": ".near_duplicates",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .summarizer_agent import YouTubeSummarizerAgent, SummarizerConfig
+    from .summary_cache import SummaryCache, InMemorySummaryCache, SQLiteSummaryCache
+    from .compaction import CompactionConfig
+    from .routing import Route, RoutingPolicy
+    from .segment_tree import SegmentTreeConfig
+    from .outputs import OUTPUT_TYPES, parse_outputs
+    from .live import LiveSummarizer, WatchConfig, WatchState
+    from .near_duplicates import NearDuplicateConfig, NearDuplicateIndex, transcript_fingerprint
@@ -0,0 +1,59 @@
+from typing import Iterable, List
+
+# Gemini tokenizes typical transcript text at roughly four characters per token;
+# a heuristic is enough here since it only drives chunk sizing
+CHARS_PER_TOKEN = 4
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def chunk_segments(
+    segments: Iterable[str], chunk_size_tokens: int, overlap_tokens: int = 0
+) -> List[str]:
+    """
+    Group transcript segments into chunks of at most ``chunk_size_tokens``.
+
+    Chunks never split a segment, so boundaries always fall between json3 events.
+    Each chunk after the first repeats the trailing segments of the previous one,
+    up to ``overlap_tokens``, so the map step keeps some context across a cut.
+    A single segment larger than the budget becomes a chunk of its own.
+    ``segments`` is consumed once, so it may be a stream.
+    """
+    if chunk_size_tokens <= 0:
+        raise ValueError("chunk_size_tokens must be positive")
+    if overlap_tokens >= chunk_size_tokens:
+        raise ValueError("overlap_tokens must be smaller than chunk_size_tokens")
+
+    chunks: List[str] = []
+    current: List[str] = []
+    current_tokens = 0
+    # Number of leading segments in `current` that were carried over as overlap
+    carried = 0
+
+    for segment in segments:
+        segment_tokens = estimate_tokens(segment) + 1
+        if current_tokens + segment_tokens > chunk_size_tokens and len(current) > carried:
+            chunks.append(" ".join(current))
+
+            overlap: List[str] = []
+            overlap_size = 0
+            for previous in reversed(current):
+                previous_tokens = estimate_tokens(previous) + 1
+                if overlap_size + previous_tokens > overlap_tokens:
+                    break
+                overlap.insert(0, previous)
+                overlap_size += previous_tokens
+
+            current = overlap
+            current_tokens = overlap_size
+            carried = len(overlap)
+
+        current.append(segment)
+        current_tokens += segment_tokens
+
+    if len(current) > carried:
+        chunks.append(" ".join(current))
+
+    return chunks
@@ -0,0 +1,132 @@
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Tuple
+
+from .chunking import estimate_tokens
+
+# Caption annotations for non-speech audio: [Music], [Applause], ♪ ... ♪, (laughs)
+_ANNOTATION_RE = re.compile(
+    r"\[[^\[\]]{1,40}\]|[♪♫]+|\((?:music|applause|laughter|laughs|inaudible|silence)\)",
+    re.IGNORECASE,
+)
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+# English hesitations; some are ordinary words in other languages ("um", "er" in German)
+_FILLERS = frozenset({"um", "uh", "umm", "uhh", "erm", "er", "hmm", "mm"})
+
+
+@dataclass(frozen=True)
+class CompactionConfig:
+    enabled: bool = True
+    drop_annotations: bool = True
+    # Only for English transcripts, so off unless enabled
+    drop_fillers: bool = False
+    # Longest n-gram whose immediate repetition is collapsed ("you know you know");
+    # single repeated words are left alone, since "that that" can be correct. 0 or 1 disables
+    max_repeat_ngram: int = 4
+    # Longest prefix of a caption compared against the end of the previous one,
+    # to drop text that auto-captions repeat as they roll
+    max_rolling_overlap: int = 12
+    # Re-split the text into one segment per sentence, where captions have punctuation
+    sentence_segmentation: bool = False
+
+
+@dataclass
+class CompactionStats:
+    segments_before: int = 0
+    segments_after: int = 0
+    chars_before: int = 0
+    chars_after: int = 0
+    tokens_before: int = 0
+    tokens_after: int = 0
+
+    @property
+    def tokens_saved(self) -> int:
+        return self.tokens_before - self.tokens_after
+
+    @property
+    def saved_ratio(self) -> float:
+        return self.tokens_saved / self.tokens_before if self.tokens_before else 0.0
+
+
+def _key(word: str) -> str:
+    return word.strip(".,!?;:\"'").lower()
+
+
+def compact_segments(
+    segments: Iterable[str], config: CompactionConfig = CompactionConfig()
+) -> Tuple[List[str], CompactionStats]:
+    """
+    Remove redundancy from transcript segments before they are prompted.
+
+    Runs in a single pass: every word is compared against a bounded window of
+    the words kept before it (max_rolling_overlap, max_repeat_ngram), so the
+    cost is linear in the transcript length. Segments that end up empty are
+    dropped; the rest keep their order and boundaries.
+
+    Returns:
+        Tuple[List[str], CompactionStats]: Compacted segments and before/after sizes
+    """
+    stats = CompactionStats()
+    kept: List[str] = []
+    # Comparison keys of the kept words, for rolling-overlap and repeat checks
+    keys: List[str] = []
+    compacted: List[str] = []
+
+    for segment in segments:
+        stats.segments_before += 1
+        stats.chars_before += len(segment)
+        stats.tokens_before += estimate_tokens(segment) + 1
+        if not config.enabled:
+            compacted.append(segment)
+            continue
+
+        if config.drop_annotations:
+            segment = _ANNOTATION_RE.sub(" ", segment)
+        words = segment.split()
+        if config.drop_fillers:
+            words = [w for w in words if _key(w) not in _FILLERS]
+        if not words:
+            continue
+
+        # Rolling captions start with the tail of the previous caption
+        word_keys = [_key(w) for w in words]
+        limit = min(config.max_rolling_overlap, len(words), len(keys))
+        for overlap in range(limit, 1, -1):
+            if keys[-overlap:] == word_keys[:overlap]:
+                words, word_keys = words[overlap:], word_keys[overlap:]
+                break
+
+        start = len(kept)
+        for word, key in zip(words, word_keys):
+            kept.append(word)
+            keys.append(key)
+            # Only collapse repeats whose second copy is inside this segment
+            for n in range(2, min(config.max_repeat_ngram, (len(kept) - start)) + 1):
+                # Cheap last-word check first; most words are not repeats
+                if (
+                    len(keys) >= 2 * n
+                    and key == keys[-n - 1]
+                    and keys[-n:] == keys[-2 * n : -n]
+                ):
+                    del kept[-n:], keys[-n:]
+                    break
+
+        if len(kept) > start:
+            compacted.append(" ".join(kept[start:]))
+        # Only a bounded tail is ever compared, so drop the rest
+        window = max(config.max_rolling_overlap, 2 * config.max_repeat_ngram)
+        if len(kept) > 4 * window:
+            del kept[:-window], keys[:-window]
+
+    if config.enabled and config.sentence_segmentation:
+        compacted = [
+            sentence
+            for sentence in _SENTENCE_END_RE.split(" ".join(compacted))
+            if sentence
+        ]
+
+    stats.segments_after = len(compacted)
+    for segment in compacted:
+        stats.chars_after += len(segment)
+        stats.tokens_after += estimate_tokens(segment) + 1
+    return compacted, stats
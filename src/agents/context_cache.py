@@ -0,0 +1,56 @@
+import functools
+import logging
+import os
+from datetime import timedelta
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+@functools.lru_cache(maxsize=1)
+def _cache_client():
+    # Part of the Gemini client's own dependencies, so nothing extra to install
+    from google.ai import generativelanguage_v1beta as glm
+
+    return glm.CacheServiceClient(client_options={"api_key": os.getenv("GOOGLE_API_KEY")})
+
+
+def create_context_cache(model_name: str, text: str, ttl_seconds: int) -> Optional[str]:
+    """
+    Store text in Gemini's explicit context cache, so several prompts can
+    reference it instead of each resending it.
+
+    Args:
+        model_name: Model the cache is created for; only calls to the same
+            model can use it
+        text: The shared prompt prefix
+        ttl_seconds: Lifetime of the cache if it is never deleted
+
+    Returns:
+        Optional[str]: The cache name to pass as cached_content, or None if the
+        model or account doesn't support caching (prompts then carry the text)
+    """
+    from google.ai import generativelanguage_v1beta as glm
+
+    model = model_name if model_name.startswith("models/") else f"models/{model_name}"
+    try:
+        cache = _cache_client().create_cached_content(
+            cached_content=glm.CachedContent(
+                model=model,
+                contents=[glm.Content(role="user", parts=[glm.Part(text=text)])],
+                ttl=timedelta(seconds=ttl_seconds),
+            )
+        )
+    except Exception as e:
+        logger.warning(f"Context caching unavailable, sending the transcript with every prompt: {str(e)}")
+        return None
+    logger.info(f"Created context cache {cache.name} for {model}")
+    return cache.name
+
+
+def delete_context_cache(name: str) -> None:
+    """Delete a context cache early; failures are left to its TTL"""
+    try:
+        _cache_client().delete_cached_content(name=name)
+    except Exception as e:
+        logger.warning(f"Could not delete context cache {name}: {str(e)}")
@@ -0,0 +1,156 @@
+import logging
+import os
+import threading
+from contextlib import nullcontext
+from dataclasses import dataclass, fields
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Tuple
+
+from src.extractors import LIVE_STATUSES
+from .chunking import estimate_tokens
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class WatchConfig:
+    # Seconds between two reads of the captions
+    poll_seconds: float = 180.0
+    # New speech below this many tokens waits for the next poll, unless the stream ended
+    min_new_tokens: int = 200
+    # Length the running summary is kept under
+    max_summary_words: int = 1500
+    # Consecutive failed polls tolerated before giving up
+    max_failures: int = 5
+
+    @classmethod
+    def from_env(cls) -> "WatchConfig":
+        """Read WATCH_POLL_SECONDS"""
+        defaults = cls()
+        return cls(poll_seconds=float(os.getenv("WATCH_POLL_SECONDS", defaults.poll_seconds)))
+
+
+@dataclass
+class WatchState:
+    video_url: str
+    summary: str = ""
+    # tStartMs of the last caption event folded into the summary
+    watermark_ms: int = -1
+    updates: int = 0
+    live_status: Optional[str] = None
+    ended: bool = False
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "WatchState":
+        return cls(**{f.name: data[f.name] for f in fields(cls) if f.name in data})
+
+
+class LiveSummarizer:
+    """
+    Keep a running summary of a live stream, or of any video whose captions
+    are still growing.
+
+    Every poll re-reads the json3 captions, keeps the events that start after
+    the last one already folded in, and once enough new speech has built up,
+    folds it into the summary. The LLM only sees the new speech and the
+    previous summary, so an update costs the same an hour into the stream as
+    at its start. Passing a saved WatchState resumes a watch where it stopped.
+
+    llm_slot, e.g. a semaphore shared with other work, is held around every
+    summary update, so watches count against the same LLM concurrency limit.
+    """
+
+    def __init__(
+        self,
+        agent,
+        video_url: str,
+        config: Optional[WatchConfig] = None,
+        state: Optional[WatchState] = None,
+        llm_slot: Optional[ContextManager] = None,
+    ):
+        self.agent = agent
+        self.config = config or WatchConfig()
+        self.state = state or WatchState(video_url=video_url)
+        self.llm_slot = llm_slot
+        # Events read but not folded in yet, waiting for min_new_tokens
+        self._pending: List[Tuple[int, str]] = []
+
+    def poll(self) -> bool:
+        """
+        Read the new captions and fold them into the summary if there are enough.
+
+        Returns:
+            bool: True if the summary was updated
+        """
+        read_ms = self._pending[-1][0] if self._pending else self.state.watermark_ms
+        events, status = self.agent.extractor.get_new_events(self.state.video_url, read_ms)
+        self.state.live_status = status
+        live = status in LIVE_STATUSES
+        if live and events:
+            # The newest caption line of a running stream may still be growing
+            events = events[:-1]
+        self._pending.extend(events)
+
+        new_tokens = sum(estimate_tokens(text) for _, text in self._pending)
+        if not self._pending or (live and new_tokens < self.config.min_new_tokens):
+            self.state.ended = not live
+            return False
+
+        window = (self._pending[0][0], self._pending[-1][0])
+        logger.info(
+            f"Folding {len(self._pending)} new caption events (~{new_tokens} tokens) "
+            f"into the running summary of {self.state.video_url}"
+        )
+        with self.llm_slot or nullcontext():
+            summary = self.agent.fold_into_summary(
+                self.state.summary,
+                [text for _, text in self._pending],
+                window,
+                self.config.max_summary_words,
+            )
+        changed = summary != self.state.summary
+        self.state.summary = summary
+        self.state.watermark_ms = window[1]
+        self.state.updates += changed
+        # Only marked ended once the last captions are folded in, so a failed
+        # final update is retried
+        self.state.ended = not live
+        self._pending = []
+        return changed
+
+    def watch(
+        self,
+        on_update: Optional[Callable[[WatchState], None]] = None,
+        stop: Optional[threading.Event] = None,
+    ) -> WatchState:
+        """
+        Poll until the stream has ended and its last captions are folded in.
+
+        Args:
+            on_update: Called with the state after every summary update
+            stop: Set to stop watching early; the returned state can be resumed
+
+        Returns:
+            WatchState: The final state; ended is False if the watch was stopped
+        """
+        stop = stop or threading.Event()
+        failures = 0
+        while True:
+            try:
+                changed = self.poll()
+                failures = 0
+            except Exception as e:
+                failures += 1
+                if failures >= self.config.max_failures:
+                    raise
+                logger.warning(
+                    f"Polling {self.state.video_url} failed "
+                    f"({failures}/{self.config.max_failures}): {str(e)}"
+                )
+                changed = False
+            if changed and on_update:
+                on_update(self.state)
+            if self.state.ended:
+                logger.info(f"Stream {self.state.video_url} ended after {self.state.updates} updates")
+                return self.state
+            if stop.wait(self.config.poll_seconds):
+                return self.state
@@ -0,0 +1,238 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+from typing import List, Optional
+
+DEFAULT_INDEX_PATH = ".cache/fingerprints.sqlite3"
+MEMORY_PATH = ":memory:"
+FINGERPRINT_BITS = 64
+
+_WORD_RE = re.compile(r"\w+")
+
+
+@dataclass(frozen=True)
+class NearDuplicateConfig:
+    enabled: bool = True
+    # Words per shingle; longer shingles make the fingerprint more sensitive to edits
+    shingle_words: int = 3
+    # Transcripts whose fingerprints differ in at most this many bits are the same content
+    max_distance: int = 3
+    # Shorter transcripts share too few shingles for their fingerprints to mean much
+    min_words: int = 200
+
+    def __post_init__(self):
+        # The index splits fingerprints into max_distance + 1 bands, each at most 32 bits
+        if not 1 <= self.max_distance <= 7:
+            raise ValueError("max_distance must be between 1 and 7 bits")
+
+
+@dataclass(frozen=True)
+class NearDuplicate:
+    video_id: str
+    # Bits in which the two fingerprints differ
+    distance: int
+
+
+def transcript_fingerprint(
+    text: str, shingle_words: int = 3, min_words: int = 200
+) -> Optional[int]:
+    """
+    64-bit SimHash of a transcript over its word shingles.
+
+    Transcripts with most shingles in common get fingerprints that differ in
+    few bits, whatever their length, so reuploads and mirrors whose captions
+    differ in casing, punctuation or a few words still land close together.
+
+    Args:
+        text: Transcript text
+        shingle_words: Words per shingle
+        min_words: Shorter transcripts get no fingerprint
+
+    Returns:
+        Optional[int]: The fingerprint, or None if the transcript is too short
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < max(min_words, shingle_words):
+        return None
+
+    # Encoded once, so each shingle is a slice instead of a join
+    normalized = " ".join(words).encode("utf-8") + b" "
+    starts = [0]
+    for word in words:
+        starts.append(starts[-1] + len(word.encode("utf-8")) + 1)
+    digests = b"".join(
+        hashlib.blake2b(normalized[starts[i] : starts[i + shingle_words]], digest_size=8).digest()
+        for i in range(len(words) - shingle_words + 1)
+    )
+
+    # Each bit of the fingerprint is the majority vote of that bit over all
+    # shingle hashes, counted per digest byte
+    shingles = len(digests) // 8
+    fingerprint = 0
+    for byte in range(8):
+        values = Counter(digests[byte::8])
+        for bit in range(8):
+            ones = sum(count for value, count in values.items() if value >> bit & 1)
+            if 2 * ones > shingles:
+                fingerprint |= 1 << (byte * 8 + bit)
+    return fingerprint
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(a ^ b).count("1")
+
+
+def _band_buckets(fingerprint: int, bands: int) -> List[int]:
+    """
+    One bucket per band of the fingerprint. Two fingerprints less than
+    `bands` bits apart agree on at least one whole band, so they always share
+    a bucket. The band count is part of the bucket, so buckets written under
+    another max_distance never match.
+    """
+    width = FINGERPRINT_BITS // bands
+    buckets = []
+    for band in range(bands):
+        bits = width if band < bands - 1 else FINGERPRINT_BITS - width * band
+        value = fingerprint >> (band * width) & ((1 << bits) - 1)
+        buckets.append(bands << 58 | band << 52 | value)
+    return buckets
+
+
+def _to_signed(value: int) -> int:
+    # SQLite integers are signed 64-bit
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+class NearDuplicateIndex:
+    """
+    Fingerprints of summarized videos in SQLite, searchable by Hamming
+    distance. Only whole-video transcripts are indexed: a time range of one
+    video is not a reupload of another.
+
+    Lookups use banded LSH: every fingerprint is filed under one bucket per
+    band, and a query only compares the entries sharing one of its buckets.
+    With the default four 16-bit bands, a random fingerprint shares a bucket
+    with about one in 16,000 entries, so a query touches a handful of rows out
+    of hundreds of thousands, through the primary key alone.
+    """
+
+    def __init__(self, path: str = DEFAULT_INDEX_PATH, max_distance: int = 3):
+        self.path = path
+        self.bands = max_distance + 1
+        self.max_distance = max_distance
+        if path != MEMORY_PATH:
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprints ("
+                "id INTEGER PRIMARY KEY, video_id TEXT NOT NULL UNIQUE, "
+                "fingerprint INTEGER NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS fingerprint_buckets ("
+                "bucket INTEGER NOT NULL, entry_id INTEGER NOT NULL, "
+                "PRIMARY KEY (bucket, entry_id)) WITHOUT ROWID"
+            )
+
+    @classmethod
+    def from_env(cls, max_distance: int = 3) -> Optional["NearDuplicateIndex"]:
+        """
+        Create a fingerprint index from environment variables.
+
+        NEAR_DUPLICATE_INDEX selects "memory" (default), "sqlite" or "none";
+        NEAR_DUPLICATE_INDEX_PATH is the file of the sqlite backend. Use the
+        sqlite backend together with the sqlite summary cache, so both outlive
+        the process.
+
+        Returns:
+            NearDuplicateIndex: Configured index, or None if detection is disabled
+        """
+        backend = os.getenv("NEAR_DUPLICATE_INDEX", "memory").lower()
+        if backend == "none":
+            return None
+        if backend == "sqlite":
+            return cls(os.getenv("NEAR_DUPLICATE_INDEX_PATH", DEFAULT_INDEX_PATH), max_distance)
+        if backend == "memory":
+            return cls(MEMORY_PATH, max_distance)
+        raise ValueError(f"Unknown NEAR_DUPLICATE_INDEX: {backend}")
+
+    def add(self, video_id: str, fingerprint: int) -> None:
+        """
+        File the fingerprint of a summarized whole video.
+
+        Args:
+            video_id: YouTube video ID
+            fingerprint: transcript_fingerprint() of its transcript
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT id FROM fingerprints WHERE video_id = ?", (video_id,)
+            ).fetchone()
+            if row is None:
+                entry_id = self._conn.execute(
+                    "INSERT INTO fingerprints (video_id, fingerprint, created_at) VALUES (?, ?, ?)",
+                    (video_id, _to_signed(fingerprint), time.time()),
+                ).lastrowid
+            else:
+                entry_id = row[0]
+                self._conn.execute(
+                    "UPDATE fingerprints SET fingerprint = ?, created_at = ? WHERE id = ?",
+                    (_to_signed(fingerprint), time.time(), entry_id),
+                )
+                self._conn.execute(
+                    "DELETE FROM fingerprint_buckets WHERE entry_id = ?", (entry_id,)
+                )
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO fingerprint_buckets (bucket, entry_id) VALUES (?, ?)",
+                [(bucket, entry_id) for bucket in _band_buckets(fingerprint, self.bands)],
+            )
+
+    def find(
+        self, fingerprint: int, exclude_video_id: Optional[str] = None
+    ) -> Optional[NearDuplicate]:
+        """
+        Find the closest indexed video within max_distance bits.
+
+        Args:
+            fingerprint: transcript_fingerprint() of the new transcript
+            exclude_video_id: The requested video itself, which never counts as
+                its own duplicate
+
+        Returns:
+            Optional[NearDuplicate]: The closest match, or None
+        """
+        buckets = _band_buckets(fingerprint, self.bands)
+        placeholders = ", ".join("?" * len(buckets))
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT DISTINCT f.video_id, f.fingerprint FROM fingerprint_buckets b "
+                "JOIN fingerprints f ON f.id = b.entry_id "
+                f"WHERE b.bucket IN ({placeholders})",
+                buckets,
+            ).fetchall()
+
+        best: Optional[NearDuplicate] = None
+        for video_id, stored in rows:
+            if video_id == exclude_video_id:
+                continue
+            distance = hamming_distance(fingerprint, stored & (1 << 64) - 1)
+            if distance <= self.max_distance and (best is None or distance < best.distance):
+                best = NearDuplicate(video_id=video_id, distance=distance)
+        return best
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM fingerprints").fetchone()[0]
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,32 @@
+from typing import Iterable, List, Optional, Union
+
+# Everything one pipeline run can produce from a single transcript fetch, in
+# the order results are presented
+OUTPUT_TYPES = ("summary", "tldr", "key_points", "chapters", "tags")
+DEFAULT_OUTPUTS = ("summary",)
+
+
+def parse_outputs(outputs: Optional[Union[str, Iterable[str]]]) -> List[str]:
+    """
+    Normalize a requested set of output types.
+
+    Args:
+        outputs: Output type names, as an iterable or a comma-separated string;
+            None or empty requests only the summary
+
+    Returns:
+        List[str]: The distinct output types, in OUTPUT_TYPES order
+
+    Raises:
+        ValueError: If an output type is unknown
+    """
+    if isinstance(outputs, str):
+        outputs = outputs.split(",")
+    requested = {output.strip().lower() for output in outputs or []} - {""}
+    unknown = requested - set(OUTPUT_TYPES)
+    if unknown:
+        raise ValueError(
+            f"Unknown output types: {', '.join(sorted(unknown))} "
+            f"(expected any of {', '.join(OUTPUT_TYPES)})"
+        )
+    return [output for output in OUTPUT_TYPES if output in (requested or DEFAULT_OUTPUTS)]
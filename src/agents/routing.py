@@ -0,0 +1,128 @@
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from src.core.metrics import REGISTRY
+
+ROUTE_TOTAL = REGISTRY.counter(
+    "summarizer_route_total",
+    "Summaries produced per route",
+    labelnames=("route", "model", "strategy"),
+)
+ROUTE_LLM_SECONDS = REGISTRY.histogram(
+    "summarizer_route_llm_duration_seconds",
+    "Duration of LLM calls per route",
+    labelnames=("route",),
+)
+ROUTE_PROMPT_TOKENS = REGISTRY.counter(
+    "summarizer_route_prompt_tokens_total",
+    "Estimated prompt tokens sent to the LLM per route",
+    labelnames=("route",),
+)
+
+STRATEGIES = ("single", "chunked")
+
+
+@dataclass(frozen=True)
+class Route:
+    name: str
+    model_name: str
+    # Output token budget of every LLM call on this route
+    max_tokens: int
+    strategy: str = "single"
+    # The route applies when the transcript is at most this many tokens; None means any size
+    max_transcript_tokens: Optional[int] = None
+    # When set, the route only applies to time-range requests covering at most
+    # this many minutes
+    max_range_minutes: Optional[float] = None
+
+    def __post_init__(self):
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"Route {self.name!r} has unknown strategy {self.strategy!r}")
+
+    def matches(self, transcript_tokens: int, range_minutes: Optional[float]) -> bool:
+        if self.max_transcript_tokens is not None and transcript_tokens > self.max_transcript_tokens:
+            return False
+        if self.max_range_minutes is not None and (
+            range_minutes is None or range_minutes > self.max_range_minutes
+        ):
+            return False
+        return True
+
+
+@dataclass(frozen=True)
+class RoutingPolicy:
+    """
+    Ordered routing table: the first route matching the transcript is used, so
+    routes go from the most to the least specific. The last route should match
+    everything.
+    """
+
+    routes: Tuple[Route, ...]
+
+    def __post_init__(self):
+        if not self.routes:
+            raise ValueError("A routing policy needs at least one route")
+
+    def select(
+        self,
+        transcript_tokens: int,
+        time_ranges: Optional[Sequence[Tuple[int, int]]] = None,
+    ) -> Route:
+        """
+        Pick the route for a transcript.
+
+        Args:
+            transcript_tokens: Estimated tokens of the compacted transcript
+            time_ranges: Requested (start_ms, end_ms) windows; empty means the whole video
+
+        Returns:
+            Route: The first matching route, or the last one if none match
+        """
+        range_minutes = (
+            sum(end - start for start, end in time_ranges) / 60_000 if time_ranges else None
+        )
+        for route in self.routes:
+            if route.matches(transcript_tokens, range_minutes):
+                return route
+        return self.routes[-1]
+
+    @classmethod
+    def default(
+        cls, model_name: str, max_tokens: int, chunking_threshold_tokens: int
+    ) -> "RoutingPolicy":
+        """
+        The built-in table: short clips get a smaller output budget, and
+        transcripts above the chunking threshold are summarized with map-reduce.
+        """
+        return cls(
+            routes=(
+                Route("short", model_name, min(max_tokens, 2048), max_transcript_tokens=4_000),
+                Route("standard", model_name, max_tokens, max_transcript_tokens=chunking_threshold_tokens),
+                Route("long", model_name, max_tokens, strategy="chunked"),
+            )
+        )
+
+    @classmethod
+    def from_dicts(cls, routes: List[Dict[str, Any]]) -> "RoutingPolicy":
+        return cls(routes=tuple(Route(**route) for route in routes))
+
+    @classmethod
+    def from_env(cls) -> Optional["RoutingPolicy"]:
+        """
+        Load a routing table from the JSON file named by SUMMARIZER_ROUTES: a
+        list of Route fields, e.g. [{"name": "short", "model_name": "...",
+        "max_tokens": 2048, "max_transcript_tokens": 4000}, ...].
+
+        Returns:
+            RoutingPolicy: The configured table, or None if the variable is unset
+        """
+        path = os.getenv("SUMMARIZER_ROUTES")
+        if not path:
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dicts(json.load(f))
+
+    def to_dicts(self) -> List[Dict[str, Any]]:
+        return [asdict(route) for route in self.routes]
@@ -0,0 +1,127 @@
+from dataclasses import dataclass
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+TimeRange = Tuple[int, int]
+
+
+@dataclass(frozen=True)
+class SegmentTreeConfig:
+    enabled: bool = True
+    # Length of the fixed time windows summarized on their own
+    leaf_minutes: float = 5.0
+    # Number of consecutive nodes merged into one node of the level above
+    fanout: int = 4
+    # Time-range requests covering fewer whole leaves are summarized directly
+    min_leaves: int = 2
+    # A request with no cached node to reuse costs more LLM calls through the
+    # tree than summarized directly, but only the tree stores windows for later
+    # requests to reuse; turn this off to summarize such requests directly
+    seed_cold_requests: bool = True
+
+    @property
+    def leaf_ms(self) -> int:
+        return int(self.leaf_minutes * 60_000)
+
+
+@dataclass(frozen=True)
+class TreeNode:
+    """
+    A node of a video's summary tree. Level 0 nodes are leaves covering
+    leaf_ms each, aligned to the start of the video; a level k node covers
+    fanout ** k consecutive leaves.
+    """
+
+    level: int
+    index: int
+
+    def span(self, fanout: int) -> Tuple[int, int]:
+        """First leaf and one past the last leaf covered by the node"""
+        width = fanout ** self.level
+        return self.index * width, (self.index + 1) * width
+
+    def time_range(self, leaf_ms: int, fanout: int) -> TimeRange:
+        first, last = self.span(fanout)
+        return first * leaf_ms, last * leaf_ms
+
+    def children(self, fanout: int) -> List["TreeNode"]:
+        return [
+            TreeNode(self.level - 1, self.index * fanout + i) for i in range(fanout)
+        ]
+
+
+def plan_ranges(
+    time_ranges: Sequence[TimeRange], leaf_ms: int, fanout: int
+) -> Tuple[List[Union[TreeNode, TimeRange]], int]:
+    """
+    Cover merged, sorted time ranges with the fewest tree nodes.
+
+    Each range is split into its partial edges and the whole leaves between
+    them; consecutive whole leaves are covered greedily by the largest
+    aligned node that fits, like a segment tree query. Partial edges are
+    returned as (start_ms, end_ms) windows, to be summarized on their own.
+
+    Returns:
+        Tuple[List[Union[TreeNode, TimeRange]], int]: The parts in playback
+        order, and the number of whole leaves they cover
+    """
+    parts: List[Union[TreeNode, TimeRange]] = []
+    whole_leaves = 0
+    for start, end in time_ranges:
+        first = -(-start // leaf_ms)
+        last = end // leaf_ms
+        if first >= last:
+            parts.append((start, end))
+            continue
+        if start < first * leaf_ms:
+            parts.append((start, first * leaf_ms))
+
+        whole_leaves += last - first
+        position = first
+        while position < last:
+            level = 0
+            while (
+                position % fanout ** (level + 1) == 0
+                and position + fanout ** (level + 1) <= last
+            ):
+                level += 1
+            parts.append(TreeNode(level, position // fanout ** level))
+            position += fanout ** level
+
+        if last * leaf_ms < end:
+            parts.append((last * leaf_ms, end))
+    return parts, whole_leaves
+
+
+def missing_by_level(
+    nodes: Sequence[TreeNode],
+    lookup: Callable[[TreeNode], Optional[str]],
+    fanout: int,
+) -> Tuple[Dict[TreeNode, str], Dict[int, List[TreeNode]]]:
+    """
+    Look up the planned nodes, and below every one that isn't cached, its
+    children, recursively.
+
+    Returns:
+        Tuple[Dict[TreeNode, str], Dict[int, List[TreeNode]]]: The cached notes
+        found, and the nodes that have to be summarized grouped by level;
+        computing the levels bottom-up makes each node's children available
+    """
+    found: Dict[TreeNode, str] = {}
+    missing: Dict[int, List[TreeNode]] = {}
+    seen = set()
+    stack = list(nodes)
+    while stack:
+        node = stack.pop()
+        if node in seen:
+            continue
+        seen.add(node)
+        notes = lookup(node)
+        if notes is not None:
+            found[node] = notes
+            continue
+        missing.setdefault(node.level, []).append(node)
+        if node.level > 0:
+            stack.extend(node.children(fanout))
+    for level_nodes in missing.values():
+        level_nodes.sort(key=lambda node: node.index)
+    return found, missing
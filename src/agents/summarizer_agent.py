@@ -1,13 +1,49 @@
 import os
+import asyncio
+import contextvars
+import functools
+import hashlib
 import logging
-from typing import Optional, Dict, Any
-from dataclasses import dataclass
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Optional, Dict, Any, List, AsyncIterator, Tuple, Union
+from dataclasses import asdict, dataclass, field
 
-from langchain_google_genai import ChatGoogleGenerativeAI
+from langchain_core.callbacks.manager import adispatch_custom_event
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph, START, END
 from typing_extensions import TypedDict
 from dotenv import load_dotenv
-from src.utils import get_clean_subtitles
+from src.utils import get_extractor
+from src.extractors import extract_video_id, merge_time_ranges
+from src.core import (
+    AsyncSingleFlight,
+    SingleFlight,
+    backoff_delay,
+    get_llm_limiter,
+    is_transient_error,
+    record_size,
+    timed_stage,
+)
+from .chunking import chunk_segments, estimate_tokens
+from .compaction import CompactionConfig, compact_segments
+from .context_cache import create_context_cache, delete_context_cache
+from .near_duplicates import NearDuplicateConfig, NearDuplicateIndex, transcript_fingerprint
+from .outputs import OUTPUT_TYPES, parse_outputs
+from .routing import (
+    ROUTE_LLM_SECONDS,
+    ROUTE_PROMPT_TOKENS,
+    ROUTE_TOTAL,
+    RoutingPolicy,
+)
+from .segment_tree import SegmentTreeConfig, TreeNode, missing_by_level, plan_ranges
+from .summary_cache import SummaryCache, make_summary_cache_key
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+    from src.core import LLMRateLimiter
+    from src.extractors import YouTubeSubtitleExtractor
 
 # Configure logging
 logging.basicConfig(
@@ -16,6 +52,10 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Tag on the LLM call that produces the final article, so streaming can tell
+# its tokens apart from the intermediate map-stage calls
+FINAL_ANSWER_TAG = "final_answer"
+
 
 @dataclass
 class SummarizerConfig:
@@ -24,87 +64,1011 @@ class SummarizerConfig:
     max_tokens: int = 8192
     timeout: Optional[int] = None
     max_retries: int = 2
+    # Retries of calls that fail with a server error (5xx); throttling is retried by the limiter
+    server_error_retries: int = 2
+    # Threads used to run blocking extraction (yt-dlp, HTTP) off the event loop
+    extraction_workers: int = 4
+    # Transcripts above this size are summarized with map-reduce instead of one call
+    chunking_threshold_tokens: int = 100_000
+    chunk_size_tokens: int = 16_000
+    chunk_overlap_tokens: int = 400
+    # Maximum number of chunk summaries requested from the LLM at once
+    map_concurrency: int = 4
+    # Redundancy removed from the transcript before it is prompted
+    compaction: CompactionConfig = field(default_factory=CompactionConfig)
+    # Model, output budget and strategy per transcript size; None uses the
+    # SUMMARIZER_ROUTES file if set, otherwise RoutingPolicy.default() built
+    # from the fields above
+    routing: Optional[RoutingPolicy] = None
+    # Videos with creator chapters are summarized chapter by chapter, in
+    # parallel, once the transcript reaches chapter_min_tokens
+    use_chapters: bool = True
+    chapter_min_tokens: int = 8_000
+    # Time-range requests are summarized from cached fixed-size window summaries
+    segment_tree: SegmentTreeConfig = field(default_factory=SegmentTreeConfig)
+    # When several outputs are generated from a transcript of at least this
+    # size, it is uploaded once to Gemini's context cache and shared by them
+    context_cache_min_tokens: int = 32_768
+    context_cache_ttl_seconds: int = 600
+    # Transcripts fingerprinted close to an already summarized one (reuploads,
+    # mirrors) reuse its cached outputs instead of prompting again
+    near_duplicates: NearDuplicateConfig = field(default_factory=NearDuplicateConfig)
+
+
+def _format_timestamp(ms: int) -> str:
+    minutes, seconds = divmod(ms // 1000, 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}:{minutes:02d}:{seconds:02d}" if hours else f"{minutes}:{seconds:02d}"
 
 
 class AgentGraphState(TypedDict):
     start_link: str
     summarized_text: str
-    enable_time_range: bool
-    start_time: int
-    end_time: int
+    # Merged, sorted (start_ms, end_ms) windows; empty means the whole video
+    time_ranges: List[Tuple[int, int]]
+    cache_key: str
+    cache_hit: bool
+    segments: List[str]
+    chunk_summaries: List[str]
+    # The route picked for this transcript (Route fields plus transcript_tokens)
+    route: Dict[str, Any]
+    # Per chapter: title, start_ms, end_ms and compacted transcript text
+    chapters: List[Dict[str, Any]]
+    # Requested output types, those not found in the cache, and the texts of
+    # every output besides the summary
+    outputs: List[str]
+    pending_outputs: List[str]
+    output_texts: Dict[str, str]
+    # Name of the Gemini context cache holding the transcript, if one was created
+    context_cache: Optional[str]
+    # SimHash of the transcript, filed in the near-duplicate index once its
+    # outputs are stored
+    fingerprint: Optional[int]
 
 
 class YouTubeSummarizerAgent:
-    def __init__(self, config: Optional[SummarizerConfig] = None):
+    def __init__(
+        self,
+        config: Optional[SummarizerConfig] = None,
+        summary_cache: Optional[SummaryCache] = None,
+        llm: Optional["BaseChatModel"] = None,
+        extractor: Optional["YouTubeSubtitleExtractor"] = None,
+        limiter: Optional["LLMRateLimiter"] = None,
+        duplicate_index: Optional[NearDuplicateIndex] = None,
+    ):
         self.config = config or SummarizerConfig()
-        self._initialize_llm()
+        self.routing = (
+            self.config.routing
+            or RoutingPolicy.from_env()
+            or RoutingPolicy.default(
+                self.config.model_name,
+                self.config.max_tokens,
+                self.config.chunking_threshold_tokens,
+            )
+        )
+        self.summary_cache = (
+            summary_cache if summary_cache is not None else SummaryCache.from_env()
+        )
+        # Matches are only useful while their outputs are still in the summary cache
+        near_duplicates = self.config.near_duplicates
+        self.duplicate_index = None
+        if near_duplicates.enabled and self.summary_cache:
+            self.duplicate_index = (
+                duplicate_index
+                if duplicate_index is not None
+                else NearDuplicateIndex.from_env(near_duplicates.max_distance)
+            )
+        # Hash of the prompt templates, so editing a prompt invalidates old cache entries
+        self.prompt_version = hashlib.sha256(
+            (
+                self._create_transcript_context("")
+                + "".join(self._create_output_instructions(output) for output in OUTPUT_TYPES)
+                + self._create_chunk_prompt("", 0, 0)
+                + self._create_reduce_prompt([])
+                + self._create_segment_prompt("", (0, 0))
+                + self._create_chapter_prompt("", "", (0, 0))
+                + self._create_merge_prompt([], (0, 0))
+                + self._create_increment_prompt("", "", (0, 0), 0)
+            ).encode("utf-8")
+        ).hexdigest()[:16]
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.config.extraction_workers,
+            thread_name_prefix="summarizer-extract",
+        )
+        self._flight = SingleFlight()
+        self._aflight = AsyncSingleFlight()
+        # Both default to the real services; passing them in allows offline runs
+        self.extractor = extractor or get_extractor()
+        # A passed-in llm or limiter serves every route
+        self._shared_llm = llm
+        self._shared_limiter = limiter
+        self._llms: Dict[Tuple[str, int], "BaseChatModel"] = {}
+        self._llms_lock = threading.Lock()
+        if llm is None:
+            self._initialize_llm()
+        else:
+            self.llm = llm
         self.graph = self._build_graph()
 
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
+
     def _initialize_llm(self) -> None:
         load_dotenv(".env")
 
-        api_key = os.getenv("GOOGLE_API_KEY")
-        if not api_key:
+        if not os.getenv("GOOGLE_API_KEY"):
             raise ValueError("GOOGLE_API_KEY environment variable is required")
 
-        self.llm = ChatGoogleGenerativeAI(
-            model=self.config.model_name,
+        self.llm = self._create_llm(self.config.model_name, self.config.max_tokens)
+        logger.info(f"LLM initialized with model: {self.config.model_name}")
+
+    def _create_llm(self, model_name: str, max_tokens: int) -> "BaseChatModel":
+        # The Gemini client is the slowest import in the project; it is only
+        # needed when no llm was passed in
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        return ChatGoogleGenerativeAI(
+            model=model_name,
             temperature=self.config.temperature,
-            max_tokens=self.config.max_tokens,
+            max_tokens=max_tokens,
             timeout=self.config.timeout,
-            max_retries=self.config.max_retries,
-            google_api_key=api_key,
+            # Throttled calls are retried by the limiter, which also backs off
+            # every other caller, and server errors by _call_llm; retrying here
+            # too would hide the 429s from the limiter
+            max_retries=0,
+            google_api_key=os.getenv("GOOGLE_API_KEY"),
         )
-        logger.info(f"LLM initialized with model: {self.config.model_name}")
 
-    def _summarize_node(self, state: AgentGraphState) -> Dict[str, Any]:
+    def _llm_for(self, route: Dict[str, Any]) -> "BaseChatModel":
+        if self._shared_llm is not None:
+            return self._shared_llm
+        key = (route["model_name"], route["max_tokens"])
+        if key == (self.config.model_name, self.config.max_tokens):
+            return self.llm
+        with self._llms_lock:
+            if key not in self._llms:
+                logger.info(f"LLM initialized with model: {key[0]} (max_tokens={key[1]})")
+                self._llms[key] = self._create_llm(*key)
+            return self._llms[key]
+
+    def _limiter_for(self, route: Dict[str, Any]) -> "LLMRateLimiter":
+        # Shared by every agent in the process that calls the same model
+        return self._shared_limiter or get_llm_limiter(route["model_name"])
+
+    def _make_cache_key(self, state: AgentGraphState) -> str:
+        return make_summary_cache_key(
+            video_id=extract_video_id(state["start_link"]),
+            time_ranges=[list(r) for r in state.get("time_ranges", [])],
+            routing=self.routing.to_dicts(),
+            temperature=self.config.temperature,
+            prompt_version=self.prompt_version,
+            compaction=asdict(self.config.compaction),
+        )
+
+    def _output_key(self, state: AgentGraphState, output: str) -> str:
+        if output == "summary":
+            return state["cache_key"]
+        return make_summary_cache_key(
+            kind="output",
+            output=output,
+            video_id=extract_video_id(state["start_link"]),
+            time_ranges=[list(r) for r in state.get("time_ranges", [])],
+            routing=self.routing.to_dicts(),
+            temperature=self.config.temperature,
+            prompt_version=self.prompt_version,
+            compaction=asdict(self.config.compaction),
+        )
+
+    def _cache_lookup_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        cache_key = state.get("cache_key") or self._make_cache_key(state)
+        state = {**state, "cache_key": cache_key}
+        outputs = state.get("outputs") or parse_outputs(None)
+        if not self.summary_cache:
+            return {"cache_key": cache_key, "cache_hit": False, "pending_outputs": outputs}
+
+        update: Dict[str, Any] = {"cache_key": cache_key, "output_texts": {}}
+        pending = []
+        for output in outputs:
+            cached = self.summary_cache.get(self._output_key(state, output))
+            if cached is None:
+                pending.append(output)
+            elif output == "summary":
+                update["summarized_text"] = cached
+            else:
+                update["output_texts"][output] = cached
+        update.update(cache_hit=not pending, pending_outputs=pending)
+
+        if pending:
+            logger.info(f"Summary cache miss for {', '.join(pending)}")
+        else:
+            logger.info("Summary cache hit, skipping extraction and LLM call")
+        return update
+
+    def _cache_store_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        # Deferred until every branch has finished, so it also releases the
+        # context cache the branches shared
+        self._release_context_cache(state)
+        if self.summary_cache:
+            stored = False
+            for output in state["pending_outputs"]:
+                text = (
+                    state.get("summarized_text")
+                    if output == "summary"
+                    else state.get("output_texts", {}).get(output)
+                )
+                if text:
+                    self.summary_cache.set(self._output_key(state, output), text)
+                    stored = True
+            if stored and self.duplicate_index is not None and state.get("fingerprint") is not None:
+                self.duplicate_index.add(
+                    extract_video_id(state["start_link"]), state["fingerprint"]
+                )
+        return {"context_cache": None}
+
+    def _route_after_cache_lookup(self, state: AgentGraphState) -> str:
+        if state.get("cache_hit"):
+            return "hit"
+        # Other outputs need the full transcript anyway, which the tree avoids fetching
+        if state["pending_outputs"] == ["summary"] and self._use_segment_tree(state):
+            return "tree"
+        return "miss"
+
+    def _use_segment_tree(self, state: AgentGraphState) -> bool:
+        tree = self.config.segment_tree
+        if not (tree.enabled and self.summary_cache and state.get("time_ranges")):
+            return False
+        parts, whole_leaves = plan_ranges(state["time_ranges"], tree.leaf_ms, tree.fanout)
+        if whole_leaves < tree.min_leaves:
+            return False
+        if tree.seed_cold_requests:
+            return True
+        notes, _ = missing_by_level(
+            [part for part in parts if isinstance(part, TreeNode)],
+            lambda node: self.summary_cache.get(self._tree_node_key(state, node)),
+            tree.fanout,
+        )
+        return bool(notes)
+
+    def _extract_segments(self, state: AgentGraphState) -> Tuple[List[str], Optional[int]]:
+        """Compacted transcript segments, and the fingerprint of the uncompacted transcript"""
         if "start_link" not in state or not state["start_link"]:
             raise ValueError(
                 "State must contain a valid 'start_link' with the YouTube video URL"
             )
 
+        start_link = state["start_link"]
+        logger.info(f"Processing video: {start_link}")
+
+        segments = self.extractor.get_subtitle_segments(
+            start_link,
+            time_ranges=state.get("time_ranges") or None,
+        )
+        if not segments:
+            raise ValueError("Failed to extract subtitles from the video")
+
+        logger.info(f"Subtitles extracted successfully ({len(segments)} segments)")
+
+        # Only whole videos are fingerprinted; ranges are never matched against them
+        fingerprint = None
+        if self.duplicate_index is not None and not state.get("time_ranges"):
+            near_duplicates = self.config.near_duplicates
+            with timed_stage("fingerprint"):
+                fingerprint = transcript_fingerprint(
+                    " ".join(segments), near_duplicates.shingle_words, near_duplicates.min_words
+                )
+
+        with timed_stage("compaction"):
+            segments, stats = compact_segments(segments, self.config.compaction)
+        record_size("transcript_chars", stats.chars_before)
+        record_size("transcript_tokens", stats.tokens_before)
+        record_size("compacted_tokens", stats.tokens_after)
+        logger.info(
+            f"Compaction saved ~{stats.tokens_saved} of {stats.tokens_before} tokens "
+            f"({stats.saved_ratio:.0%}), {stats.segments_after} segments left"
+        )
+        if not segments:
+            raise ValueError("Transcript has no speech left after compaction")
+        return segments, fingerprint
+
+    def _extract_chapters(
+        self, state: AgentGraphState, transcript_tokens: int
+    ) -> List[Dict[str, Any]]:
+        """Compacted transcript of each chapter, if the video is long enough and has chapters"""
+        if not self.config.use_chapters or transcript_tokens < self.config.chapter_min_tokens:
+            return []
         try:
-            logger.info("Starting extraction and summarization process")
+            grouped = self.extractor.get_chapter_segments(
+                state["start_link"], time_ranges=state.get("time_ranges") or None
+            )
+        except Exception as e:
+            # Chapters only shape the article; without them the transcript is summarized as usual
+            logger.warning(f"Could not read chapters, summarizing without them: {str(e)}")
+            return []
+
+        chapters = []
+        for chapter, segments in grouped:
+            segments, _ = compact_segments(segments, self.config.compaction)
+            if segments:
+                chapters.append(
+                    {
+                        "title": chapter.title,
+                        "start_ms": chapter.start_ms,
+                        "end_ms": chapter.end_ms,
+                        "text": " ".join(segments).strip(),
+                    }
+                )
+        return chapters if len(chapters) >= 2 else []
+
+    def _find_near_duplicate(
+        self, state: AgentGraphState, fingerprint: Optional[int]
+    ) -> Dict[str, Any]:
+        """Cached outputs of an indexed transcript close to this one, as a state update"""
+        if fingerprint is None or self.duplicate_index is None:
+            return {}
+        match = self.duplicate_index.find(
+            fingerprint, exclude_video_id=extract_video_id(state["start_link"])
+        )
+        if match is None:
+            return {}
 
-            start_link = state["start_link"]
-            enable_time_range = state.get("enable_time_range", False)
-            start_time = state.get("start_time", 0)
-            end_time = state.get("end_time", 0)
+        source = {
+            "start_link": f"https://www.youtube.com/watch?v={match.video_id}",
+            "time_ranges": [],
+        }
+        source["cache_key"] = self._make_cache_key(source)
+        update: Dict[str, Any] = {"output_texts": dict(state.get("output_texts") or {})}
+        reused = []
+        for output in state["pending_outputs"]:
+            cached = self.summary_cache.get(self._output_key(source, output))
+            if cached is None:
+                continue
+            reused.append(output)
+            if output == "summary":
+                update["summarized_text"] = cached
+            else:
+                update["output_texts"][output] = cached
+        if not reused:
+            return {}
 
-            logger.info(f"Processing video: {start_link}")
+        logger.info(
+            f"Transcript is a near duplicate of {match.video_id} "
+            f"({match.distance} bits apart), reusing its {', '.join(reused)}"
+        )
+        update["duplicate_of"] = {"video_id": match.video_id, "distance": match.distance}
+        return update
 
-            subtitle = get_clean_subtitles(
-                start_link,
-                enable_time_range=enable_time_range,
-                start_time=start_time,
-                end_time=end_time,
+    def _missing_outputs(self, state: AgentGraphState) -> List[str]:
+        """Pending outputs that still have to be generated"""
+        return [
+            output
+            for output in state["pending_outputs"]
+            if not (
+                state.get("summarized_text")
+                if output == "summary"
+                else state.get("output_texts", {}).get(output)
             )
-            if not subtitle:
-                raise ValueError("Failed to extract subtitles from the video")
+        ]
+
+    def _extract_transcript(self, state: AgentGraphState) -> Dict[str, Any]:
+        segments, fingerprint = self._extract_segments(state)
+        duplicate = self._find_near_duplicate(state, fingerprint)
+        duplicate_of = duplicate.pop("duplicate_of", None)
+        missing = self._missing_outputs({**state, **duplicate})
+        transcript_tokens = sum(estimate_tokens(s) + 1 for s in segments)
+        route = self.routing.select(transcript_tokens, state.get("time_ranges"))
+        summary_pending = "summary" in missing
+        chapters = self._extract_chapters(state, transcript_tokens) if summary_pending else []
+        if chapters:
+            strategy = "chapters"
+        elif duplicate.get("summarized_text"):
+            strategy = "duplicate"
+        else:
+            strategy = route.strategy
+        ROUTE_TOTAL.inc(route=route.name, model=route.model_name, strategy=strategy)
+        logger.info(
+            f"Transcript is ~{transcript_tokens} tokens, using route {route.name!r} "
+            f"({route.model_name}, {strategy}, max_tokens={route.max_tokens})"
+        )
+        route_info = {**asdict(route), "strategy": strategy, "transcript_tokens": transcript_tokens}
+        if chapters:
+            route_info["chapters"] = len(chapters)
+        if duplicate_of:
+            route_info["duplicate_of"] = duplicate_of
+
+        # Prompts over the whole transcript: the single-call summary and every other output
+        shared = len(missing) - (summary_pending and strategy != "single")
+        context_cache = None
+        if (
+            shared >= 2
+            and self._shared_llm is None
+            and transcript_tokens >= self.config.context_cache_min_tokens
+        ):
+            with timed_stage("context_cache"):
+                context_cache = create_context_cache(
+                    route.model_name,
+                    self._create_transcript_context(" ".join(segments).strip()),
+                    self.config.context_cache_ttl_seconds,
+                )
+        return {
+            **duplicate,
+            "segments": segments,
+            "route": route_info,
+            "chapters": chapters,
+            "context_cache": context_cache,
+            "fingerprint": fingerprint,
+        }
 
-            logger.info("Subtitles extracted successfully")
+    def _fetch_transcript_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        return self._extract_transcript(state)
 
-            summarize_prompt = self._create_summarization_prompt(subtitle)
+    async def _afetch_transcript_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        # yt-dlp and the transcript API have no async interface, so they run
+        # on the bounded extraction pool instead of blocking the event loop
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        update = await loop.run_in_executor(
+            self._executor, context.run, self._extract_transcript, state
+        )
+        segments = update["segments"]
+        await adispatch_custom_event(
+            "transcript_fetched",
+            {"segments": len(segments), "chars": sum(len(s) for s in segments)},
+        )
+        return update
+
+    def _route_strategy(self, state: AgentGraphState) -> List[str]:
+        # The summary and the other outputs run as parallel branches
+        missing = self._missing_outputs(state)
+        branches = []
+        if "summary" in missing:
+            branches.append(state["route"]["strategy"])
+        if any(output != "summary" for output in missing):
+            branches.append("outputs")
+        # Everything was reused from a near duplicate
+        return branches or ["done"]
+
+    def _check_summary(self, summarized_text: str) -> str:
+        if not summarized_text:
+            raise ValueError("LLM returned empty summary")
+
+        logger.info("Summarization completed successfully")
+        return summarized_text
+
+    def _call_llm(
+        self, prompt: str, route: Dict[str, Any], context_cache: Optional[str] = None
+    ) -> str:
+        llm = self._llm_for(route)
+        kwargs = {"cached_content": context_cache} if context_cache else {}
+        tokens = estimate_tokens(prompt)
+        ROUTE_PROMPT_TOKENS.inc(tokens, route=route["name"])
+        started = time.perf_counter()
+        with timed_stage("llm"):
+            for attempt in range(self.config.server_error_retries + 1):
+                try:
+                    response = self._limiter_for(route).call(
+                        lambda: llm.invoke(prompt, **kwargs),
+                        tokens=tokens,
+                        max_retries=self.config.max_retries,
+                    )
+                    break
+                except Exception as e:
+                    if not is_transient_error(e) or attempt == self.config.server_error_retries:
+                        raise
+                    delay = backoff_delay(attempt)
+                    logger.warning(f"LLM server error, retrying in {delay:.1f}s: {str(e)}")
+                    time.sleep(delay)
+        ROUTE_LLM_SECONDS.observe(time.perf_counter() - started, route=route["name"])
+        return response.content
+
+    async def _acall_llm(
+        self,
+        prompt: str,
+        route: Dict[str, Any],
+        final: bool = False,
+        context_cache: Optional[str] = None,
+    ) -> str:
+        llm = self._llm_for(route)
+        config = {"tags": [FINAL_ANSWER_TAG]} if final else None
+        kwargs = {"cached_content": context_cache} if context_cache else {}
+        tokens = estimate_tokens(prompt)
+        ROUTE_PROMPT_TOKENS.inc(tokens, route=route["name"])
+        started = time.perf_counter()
+        with timed_stage("llm"):
+            for attempt in range(self.config.server_error_retries + 1):
+                try:
+                    response = await self._limiter_for(route).acall(
+                        lambda: llm.ainvoke(prompt, config=config, **kwargs),
+                        tokens=tokens,
+                        max_retries=self.config.max_retries,
+                    )
+                    break
+                except Exception as e:
+                    if not is_transient_error(e) or attempt == self.config.server_error_retries:
+                        raise
+                    delay = backoff_delay(attempt)
+                    logger.warning(f"LLM server error, retrying in {delay:.1f}s: {str(e)}")
+                    await asyncio.sleep(delay)
+        ROUTE_LLM_SECONDS.observe(time.perf_counter() - started, route=route["name"])
+        return response.content
+
+    def _timed_node(self, stage: str, func, afunc=None):
+        """Wrap a graph node so its duration and failures are recorded under stage"""
+
+        @functools.wraps(func)
+        def run(state: AgentGraphState) -> Dict[str, Any]:
+            with timed_stage(stage):
+                return func(state)
+
+        if afunc is None:
+            return run
+
+        @functools.wraps(afunc)
+        async def arun(state: AgentGraphState) -> Dict[str, Any]:
+            with timed_stage(stage):
+                return await afunc(state)
+
+        return RunnableLambda(run, afunc=arun)
+
+    def _release_context_cache(self, state: AgentGraphState) -> None:
+        if state.get("context_cache"):
+            delete_context_cache(state["context_cache"])
+
+    def _branch_node(self, stage: str, func, afunc):
+        """
+        Wrap a node that runs between fetch_transcript and cache_store. A
+        failing branch stops the graph before cache_store, so it releases the
+        context cache itself instead of leaving it billed until its TTL.
+        """
+
+        @functools.wraps(func)
+        def run(state: AgentGraphState) -> Dict[str, Any]:
+            try:
+                return func(state)
+            except Exception:
+                self._release_context_cache(state)
+                raise
+
+        @functools.wraps(afunc)
+        async def arun(state: AgentGraphState) -> Dict[str, Any]:
+            try:
+                return await afunc(state)
+            except Exception:
+                self._release_context_cache(state)
+                raise
+
+        return self._timed_node(stage, run, arun)
+
+    def _tree_node_key(self, state: AgentGraphState, node: TreeNode) -> str:
+        return make_summary_cache_key(
+            kind="segment_tree",
+            video_id=extract_video_id(state["start_link"]),
+            level=node.level,
+            index=node.index,
+            leaf_ms=self.config.segment_tree.leaf_ms,
+            fanout=self.config.segment_tree.fanout,
+            routing=self.routing.to_dicts(),
+            temperature=self.config.temperature,
+            prompt_version=self.prompt_version,
+            compaction=asdict(self.config.compaction),
+        )
+
+    def _plan_tree(
+        self, state: AgentGraphState
+    ) -> Tuple[List[Union[TreeNode, Tuple[int, int]]], Dict[Any, str], Dict[int, List[TreeNode]]]:
+        """Plan a time-range request onto the tree and look up the cached nodes"""
+        tree = self.config.segment_tree
+        parts, _ = plan_ranges(state["time_ranges"], tree.leaf_ms, tree.fanout)
+        notes, missing = missing_by_level(
+            [part for part in parts if isinstance(part, TreeNode)],
+            lambda node: self.summary_cache.get(self._tree_node_key(state, node)),
+            tree.fanout,
+        )
+        logger.info(
+            f"Segment tree: {len(parts)} parts, {len(notes)} cached nodes, "
+            f"{sum(len(nodes) for nodes in missing.values())} nodes to summarize"
+        )
+        return parts, notes, missing
+
+    def _window_job(
+        self, state: AgentGraphState, window: Tuple[int, int]
+    ) -> Optional[Tuple[str, Dict[str, Any], int]]:
+        """Prompt, route and transcript tokens for one time window; None if it has no speech"""
+        segments = self.extractor.get_subtitle_segments(
+            state["start_link"], time_ranges=[window]
+        )
+        segments, stats = compact_segments(segments, self.config.compaction)
+        if not segments:
+            return None
+        route = self.routing.select(stats.tokens_after, [window])
+        prompt = self._create_segment_prompt(" ".join(segments).strip(), window)
+        return prompt, {**asdict(route), "transcript_tokens": stats.tokens_after}, stats.tokens_after
+
+    def _tree_windows(
+        self, parts: List[Union[TreeNode, Tuple[int, int]]], missing: Dict[int, List[TreeNode]]
+    ) -> List[Tuple[Any, Tuple[int, int]]]:
+        """(notes key, time window) of the missing leaves and the partial edges"""
+        tree = self.config.segment_tree
+        windows = [
+            (leaf, leaf.time_range(tree.leaf_ms, tree.fanout)) for leaf in missing.get(0, [])
+        ]
+        windows.extend((part, part) for part in parts if not isinstance(part, TreeNode))
+        return windows
+
+    def _merge_job(
+        self, notes: Dict[Any, str], node: TreeNode
+    ) -> Union[str, Tuple[str, Dict[str, Any]]]:
+        """Notes of an internal node when no LLM call is needed, else its merge prompt and route"""
+        tree = self.config.segment_tree
+        children = [notes[child] for child in node.children(tree.fanout) if notes[child]]
+        if len(children) <= 1:
+            return children[0] if children else ""
+        merge_tokens = sum(estimate_tokens(child) for child in children)
+        window = node.time_range(tree.leaf_ms, tree.fanout)
+        route = self.routing.select(merge_tokens, [window])
+        prompt = self._create_merge_prompt(children, window)
+        return prompt, {**asdict(route), "transcript_tokens": merge_tokens}
+
+    def _store_tree_node(self, state: AgentGraphState, key: Any, notes: str) -> None:
+        # Windows without speech yet, e.g. of a stream still being captioned,
+        # are not stored so a later request picks up their captions
+        if isinstance(key, TreeNode) and notes:
+            self.summary_cache.set(self._tree_node_key(state, key), notes)
+
+    def _finish_tree(
+        self,
+        state: AgentGraphState,
+        parts: List[Union[TreeNode, Tuple[int, int]]],
+        notes: Dict[Any, str],
+        reused: int,
+        summarized: int,
+        transcript_tokens: int,
+    ) -> Dict[str, Any]:
+        chunk_summaries = [notes[part] for part in parts if notes[part]]
+        if not chunk_summaries:
+            raise ValueError("Failed to extract subtitles from the video")
+
+        notes_tokens = sum(estimate_tokens(summary) for summary in chunk_summaries)
+        route = self.routing.select(notes_tokens, state["time_ranges"])
+        ROUTE_TOTAL.inc(route=route.name, model=route.model_name, strategy="tree")
+        logger.info(
+            f"Segment tree reused {reused} and summarized {summarized} nodes, "
+            f"combining {len(chunk_summaries)} parts with route {route.name!r}"
+        )
+        return {
+            "chunk_summaries": chunk_summaries,
+            "route": {
+                **asdict(route),
+                "strategy": "tree",
+                "transcript_tokens": transcript_tokens,
+                "segment_tree": {
+                    "parts": len(parts),
+                    "reused_nodes": reused,
+                    "summarized_nodes": summarized,
+                },
+            },
+        }
+
+    def _tree_map_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        parts, notes, missing = self._plan_tree(state)
+        reused = len(notes)
+        call_llm = RunnableLambda(lambda job: self._call_llm(*job))
+        batch_config = {"max_concurrency": self.config.map_concurrency}
+
+        windows = self._tree_windows(parts, missing)
+        jobs = [self._window_job(state, window) for _, window in windows]
+        pending = [(key, job) for (key, _), job in zip(windows, jobs) if job is not None]
+        transcript_tokens = sum(job[2] for _, job in pending)
+        for key, _ in windows:
+            notes[key] = ""
+        summaries = call_llm.batch([job[:2] for _, job in pending], config=batch_config)
+        for (key, _), summary in zip(pending, summaries):
+            notes[key] = summary
+        for key, _ in windows:
+            self._store_tree_node(state, key, notes[key])
+
+        for level in sorted(level for level in missing if level > 0):
+            merges = [(node, self._merge_job(notes, node)) for node in missing[level]]
+            calls = [(node, job) for node, job in merges if isinstance(job, tuple)]
+            for node, job in merges:
+                if not isinstance(job, tuple):
+                    notes[node] = job
+            summaries = call_llm.batch([job for _, job in calls], config=batch_config)
+            for (node, _), summary in zip(calls, summaries):
+                notes[node] = summary
+            for node in missing[level]:
+                self._store_tree_node(state, node, notes[node])
+
+        summarized = sum(len(nodes) for nodes in missing.values())
+        return self._finish_tree(state, parts, notes, reused, summarized, transcript_tokens)
+
+    async def _atree_map_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        # Cache lookups and transcript slicing block, so they run on the extraction pool
+        parts, notes, missing = await loop.run_in_executor(
+            self._executor, context.run, self._plan_tree, state
+        )
+        reused = len(notes)
+        semaphore = asyncio.Semaphore(self.config.map_concurrency)
+        windows = self._tree_windows(parts, missing)
+        total = len(windows) + sum(len(missing[level]) for level in missing if level > 0)
+        completed = 0
+
+        async def resolve(job: Union[None, str, Tuple[str, Dict[str, Any]]]) -> str:
+            nonlocal completed
+            if isinstance(job, tuple):
+                async with semaphore:
+                    summary = await self._acall_llm(*job)
+            else:
+                summary = job or ""
+            completed += 1
+            await adispatch_custom_event(
+                "segment_done", {"completed": completed, "total": total}
+            )
+            return summary
+
+        jobs = await loop.run_in_executor(
+            self._executor,
+            context.run,
+            lambda: [self._window_job(state, window) for _, window in windows],
+        )
+        transcript_tokens = sum(job[2] for job in jobs if job is not None)
+        summaries = await asyncio.gather(
+            *(resolve(job[:2] if job is not None else None) for job in jobs)
+        )
+        for (key, _), summary in zip(windows, summaries):
+            notes[key] = summary
+            self._store_tree_node(state, key, summary)
+
+        for level in sorted(level for level in missing if level > 0):
+            jobs = [self._merge_job(notes, node) for node in missing[level]]
+            summaries = await asyncio.gather(*(resolve(job) for job in jobs))
+            for node, summary in zip(missing[level], summaries):
+                notes[node] = summary
+                self._store_tree_node(state, node, summary)
+
+        summarized = sum(len(nodes) for nodes in missing.values())
+        return self._finish_tree(state, parts, notes, reused, summarized, transcript_tokens)
+
+    def _chapter_key(self, state: AgentGraphState, chapter: Dict[str, Any]) -> str:
+        return make_summary_cache_key(
+            kind="chapter",
+            video_id=extract_video_id(state["start_link"]),
+            title=chapter["title"],
+            start_ms=chapter["start_ms"],
+            end_ms=chapter["end_ms"],
+            routing=self.routing.to_dicts(),
+            temperature=self.config.temperature,
+            prompt_version=self.prompt_version,
+            compaction=asdict(self.config.compaction),
+        )
+
+    def _chapter_job(
+        self, state: AgentGraphState, chapter: Dict[str, Any]
+    ) -> Union[str, Tuple[str, Dict[str, Any]]]:
+        """The cached section of a chapter, else its prompt and route"""
+        if self.summary_cache:
+            cached = self.summary_cache.get(self._chapter_key(state, chapter))
+            if cached is not None:
+                return cached
+        tokens = estimate_tokens(chapter["text"])
+        window = (chapter["start_ms"], chapter["end_ms"])
+        route = self.routing.select(tokens, [window])
+        prompt = self._create_chapter_prompt(chapter["title"], chapter["text"], window)
+        return prompt, {**asdict(route), "transcript_tokens": tokens}
+
+    def _assemble_chapters(
+        self, state: AgentGraphState, sections: List[str]
+    ) -> Dict[str, Any]:
+        for chapter, section in zip(state["chapters"], sections):
+            if self.summary_cache:
+                self.summary_cache.set(self._chapter_key(state, chapter), section)
+        # The creator's chapter titles become the article's headings
+        article = "\n\n".join(
+            f"## {chapter['title'] or _format_timestamp(chapter['start_ms'])}\n\n{section.strip()}"
+            for chapter, section in zip(state["chapters"], sections)
+            if section.strip()
+        )
+        logger.info(f"Assembled the article from {len(sections)} chapters")
+        return {"summarized_text": self._check_summary(article)}
+
+    def _map_chapters_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        jobs = [self._chapter_job(state, chapter) for chapter in state["chapters"]]
+        calls = [job for job in jobs if isinstance(job, tuple)]
+        logger.info(
+            f"Summarizing {len(calls)} of {len(jobs)} chapters "
+            f"with concurrency {self.config.map_concurrency}"
+        )
+        call_llm = RunnableLambda(lambda job: self._call_llm(*job))
+        summaries = iter(
+            call_llm.batch(calls, config={"max_concurrency": self.config.map_concurrency})
+        )
+        sections = [next(summaries) if isinstance(job, tuple) else job for job in jobs]
+        return self._assemble_chapters(state, sections)
+
+    async def _amap_chapters_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        jobs = await loop.run_in_executor(
+            self._executor,
+            contextvars.copy_context().run,
+            lambda: [self._chapter_job(state, chapter) for chapter in state["chapters"]],
+        )
+        semaphore = asyncio.Semaphore(self.config.map_concurrency)
+        completed = 0
+
+        async def summarize_chapter(job: Union[str, Tuple[str, Dict[str, Any]]]) -> str:
+            nonlocal completed
+            if isinstance(job, tuple):
+                async with semaphore:
+                    section = await self._acall_llm(*job)
+            else:
+                section = job
+            completed += 1
+            await adispatch_custom_event(
+                "chapter_done", {"completed": completed, "total": len(jobs)}
+            )
+            return section
+
+        sections = await asyncio.gather(*(summarize_chapter(job) for job in jobs))
+        return self._assemble_chapters(state, list(sections))
+
+    def _transcript_prompt(self, state: AgentGraphState, output: str) -> str:
+        """Prompt for one output of the whole transcript; the transcript itself
+        is left out when the context cache holds it"""
+        instructions = self._create_output_instructions(output)
+        if state.get("context_cache"):
+            return instructions
+        subtitle = " ".join(state["segments"]).strip()
+        return self._create_transcript_context(subtitle) + instructions
+
+    def _summarize_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        try:
+            summarize_prompt = self._transcript_prompt(state, "summary")
             logger.info("Sending subtitles to LLM for summarization")
 
-            response = self.llm.invoke(summarize_prompt)
-            summarized_text = response.content
+            summarized_text = self._call_llm(
+                summarize_prompt, state["route"], state.get("context_cache")
+            )
+            return {"summarized_text": self._check_summary(summarized_text)}
 
-            if not summarized_text:
-                raise ValueError("LLM returned empty summary")
+        except Exception as e:
+            logger.error(f"Error during summarization: {str(e)}")
+            raise
 
-            logger.info("Summarization completed successfully")
+    async def _asummarize_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        try:
+            summarize_prompt = self._transcript_prompt(state, "summary")
+            logger.info("Sending subtitles to LLM for summarization")
 
-            state["summarized_text"] = summarized_text
-            return state
+            summarized_text = await self._acall_llm(
+                summarize_prompt,
+                state["route"],
+                final=True,
+                context_cache=state.get("context_cache"),
+            )
+            return {"summarized_text": self._check_summary(summarized_text)}
 
         except Exception as e:
             logger.error(f"Error during summarization: {str(e)}")
             raise
 
-    def _create_summarization_prompt(self, subtitle: str) -> str:
+    def _output_prompts(self, state: AgentGraphState) -> List[Tuple[str, str]]:
+        outputs = [output for output in self._missing_outputs(state) if output != "summary"]
+        logger.info(f"Generating {', '.join(outputs)} from the transcript")
+        return [(output, self._transcript_prompt(state, output)) for output in outputs]
+
+    def _collect_outputs(
+        self, state: AgentGraphState, outputs: List[str], texts: List[str]
+    ) -> Dict[str, Any]:
+        for output, text in zip(outputs, texts):
+            if not text.strip():
+                raise ValueError(f"LLM returned an empty {output}")
+        generated = {output: text.strip() for output, text in zip(outputs, texts)}
+        return {"output_texts": {**state.get("output_texts", {}), **generated}}
+
+    def _outputs_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        prompts = self._output_prompts(state)
+        call_llm = RunnableLambda(
+            functools.partial(
+                self._call_llm, route=state["route"], context_cache=state.get("context_cache")
+            )
+        )
+        texts = call_llm.batch(
+            [prompt for _, prompt in prompts],
+            config={"max_concurrency": self.config.map_concurrency},
+        )
+        return self._collect_outputs(state, [output for output, _ in prompts], texts)
+
+    async def _aoutputs_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        prompts = self._output_prompts(state)
+        semaphore = asyncio.Semaphore(self.config.map_concurrency)
+        completed = 0
+
+        async def generate(output: str, prompt: str) -> str:
+            nonlocal completed
+            async with semaphore:
+                text = await self._acall_llm(
+                    prompt, state["route"], context_cache=state.get("context_cache")
+                )
+            completed += 1
+            await adispatch_custom_event(
+                "output_done",
+                {"output": output, "completed": completed, "total": len(prompts)},
+            )
+            return text
+
+        texts = await asyncio.gather(*(generate(*job) for job in prompts))
+        return self._collect_outputs(state, [output for output, _ in prompts], list(texts))
+
+    def _map_prompts(self, state: AgentGraphState) -> List[str]:
+        chunks = chunk_segments(
+            state["segments"],
+            self.config.chunk_size_tokens,
+            self.config.chunk_overlap_tokens,
+        )
+        logger.info(
+            f"Summarizing {len(chunks)} chunks with concurrency {self.config.map_concurrency}"
+        )
+        return [
+            self._create_chunk_prompt(chunk, index + 1, len(chunks))
+            for index, chunk in enumerate(chunks)
+        ]
+
+    def _map_chunks_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        prompts = self._map_prompts(state)
+        call_llm = RunnableLambda(functools.partial(self._call_llm, route=state["route"]))
+        chunk_summaries = call_llm.batch(
+            prompts, config={"max_concurrency": self.config.map_concurrency}
+        )
+        return {"chunk_summaries": chunk_summaries}
+
+    async def _amap_chunks_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        prompts = self._map_prompts(state)
+        semaphore = asyncio.Semaphore(self.config.map_concurrency)
+        completed = 0
+
+        async def summarize_chunk(prompt: str) -> str:
+            nonlocal completed
+            async with semaphore:
+                summary = await self._acall_llm(prompt, state["route"])
+            completed += 1
+            await adispatch_custom_event(
+                "chunk_done", {"completed": completed, "total": len(prompts)}
+            )
+            return summary
+
+        chunk_summaries = await asyncio.gather(*(summarize_chunk(p) for p in prompts))
+        return {"chunk_summaries": list(chunk_summaries)}
+
+    def _reduce_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        logger.info("Combining chunk summaries into the final article")
+        reduce_prompt = self._create_reduce_prompt(state["chunk_summaries"])
+        summarized_text = self._call_llm(reduce_prompt, state["route"])
+        return {"summarized_text": self._check_summary(summarized_text)}
+
+    async def _areduce_node(self, state: AgentGraphState) -> Dict[str, Any]:
+        logger.info("Combining chunk summaries into the final article")
+        reduce_prompt = self._create_reduce_prompt(state["chunk_summaries"])
+        summarized_text = await self._acall_llm(
+            reduce_prompt, state["route"], final=True
+        )
+        return {"summarized_text": self._check_summary(summarized_text)}
+
+    def _create_transcript_context(self, subtitle: str) -> str:
+        # Every prompt over the whole transcript starts with exactly this text and
+        # ends with its own instructions, so the outputs of one video share a
+        # prefix that Gemini can serve from its context cache
         return f"""
-        Summarize the following YouTube video transcript into a well-structured article.
+        The following is the transcript of a YouTube video.
+
+        Transcript:
+        {subtitle}
+        """
+
+    def _create_output_instructions(self, output: str) -> str:
+        instructions = {
+            "summary": """
+        Summarize the YouTube video transcript above into a well-structured article.
         Maintain the original language of the content and ensure the summary is comprehensive yet concise.
 
         DON'T SAY SOMETHING LIKE "Here is the summary of the video" or "The video is about". Just write the article directly.
@@ -116,44 +1080,436 @@ class YouTubeSummarizerAgent:
         - Structure the content in a readable format
         - Don't summarize it too much, make it as an article!
         - Make your summary as long as the original language, if language is English you must write in English, if language is Arabic you must write in Arabic, etc.
-        
+        """,
+            "tldr": """
+        Write a TL;DR of the YouTube video transcript above: two or three sentences on what the video covers and its main takeaway.
+
+        Instructions:
+        - Write in the original language of the transcript
+        - Write the TL;DR directly, without a heading or an introduction
+        """,
+            "key_points": """
+        List the key points of the YouTube video transcript above.
+
+        Instructions:
+        - Use a Markdown bullet list with one point per bullet, in the order they are discussed
+        - Keep important names, numbers and conclusions
+        - Write in the original language of the transcript
+        - Write only the list, without a heading or an introduction
+        """,
+            "chapters": """
+        Split the YouTube video transcript above into chapters, one per topic, in the order they are discussed.
+
+        Instructions:
+        - Use a Markdown numbered list, one chapter per item
+        - Give each chapter a short title, followed by one sentence on what it covers
+        - Write in the original language of the transcript
+        - Write only the list, without a heading or an introduction
+        """,
+            "tags": """
+        Give 5 to 10 tags describing the topics of the YouTube video transcript above.
+
+        Instructions:
+        - Write the tags on one line, separated by commas
+        - Use lowercase except for proper nouns, and no # signs
+        - Write in the original language of the transcript
+        - Write only the tags
+        """,
+        }
+        return instructions[output]
+
+    def _create_chunk_prompt(self, chunk: str, index: int, total: int) -> str:
+        return f"""
+        The following is part {index} of {total} of a long YouTube video transcript.
+        Write detailed notes of this part that will later be merged with the notes of the other parts into one article.
+
+        Instructions:
+        - Keep every key point, argument, example, name and number
+        - Keep the order in which topics are discussed
+        - Write in the original language of the transcript
+        - Don't add an introduction or conclusion, only the notes
+
+        Transcript part:
+        {chunk}
+        """
+
+    def _create_chapter_prompt(
+        self, title: str, transcript: str, window: Tuple[int, int]
+    ) -> str:
+        start, end = (_format_timestamp(ms) for ms in window)
+        return f"""
+        The following is the transcript of the chapter "{title}" ({start} to {end}) of a YouTube video.
+        Write the section of an article about the video that covers this chapter. The chapter title is added as the section heading, so don't repeat it.
+        Maintain the original language of the content and ensure the section is comprehensive yet concise.
+
+        DON'T SAY SOMETHING LIKE "In this chapter" or "The speaker says". Just write the section directly.
+
+        Instructions:
+        - Use ### sub-headings only where the chapter covers several topics
+        - Preserve key points and important details
+        - Maintain the original tone and context
+        - Don't summarize it too much, make it as an article!
+        - Write in the original language of the transcript
+
         Transcript:
-        {subtitle}
+        {transcript}
+        """
+
+    def _create_segment_prompt(self, transcript: str, window: Tuple[int, int]) -> str:
+        start, end = (_format_timestamp(ms) for ms in window)
+        return f"""
+        The following is the transcript of a YouTube video from {start} to {end}.
+        Write detailed notes of this part that will later be merged with the notes of other parts into one article.
+
+        Instructions:
+        - Keep every key point, argument, example, name and number
+        - Keep the order in which topics are discussed
+        - Write in the original language of the transcript
+        - Don't add an introduction or conclusion, only the notes
+
+        Transcript part:
+        {transcript}
+        """
+
+    def _create_merge_prompt(self, notes: List[str], window: Tuple[int, int]) -> str:
+        start, end = (_format_timestamp(ms) for ms in window)
+        parts = "\n\n".join(f"Part {index}:\n{part}" for index, part in enumerate(notes, start=1))
+        return f"""
+        The following are notes taken, in order, from consecutive parts of a YouTube video between {start} and {end}.
+        Merge them into one set of notes for that whole stretch of the video.
+
+        Instructions:
+        - Keep every key point, argument, example, name and number
+        - Merge topics that continue across parts instead of repeating them
+        - Keep the order in which topics are discussed
+        - Write in the original language of the notes
+        - Don't add an introduction or conclusion, only the notes
+
+        Notes:
+        {parts}
+        """
+
+    def _create_increment_prompt(
+        self, summary: str, transcript: str, window: Tuple[int, int], max_words: int
+    ) -> str:
+        start, end = (_format_timestamp(ms) for ms in window)
+        return f"""
+        The following is the running summary of a YouTube live stream so far, followed by the transcript of what was said next, from {start} to {end}.
+        Rewrite the summary so that it also covers the new part.
+
+        DON'T SAY SOMETHING LIKE "In this update" or "The stream continues". Just write the updated article directly.
+
+        Instructions:
+        - Keep clear headings and sections, adding sections for new topics
+        - Keep what the summary already says unless the new part corrects it
+        - Keep the whole summary under about {max_words} words, condensing the oldest sections first
+        - Write in the original language of the transcript
+        - If there is no summary yet, write it from the new part alone
+
+        Summary so far:
+        {summary}
+
+        New transcript:
+        {transcript}
+        """
+
+    def _create_reduce_prompt(self, chunk_summaries: List[str]) -> str:
+        notes = "\n\n".join(
+            f"Part {index}:\n{summary}"
+            for index, summary in enumerate(chunk_summaries, start=1)
+        )
+        return f"""
+        The following are notes taken, in order, from consecutive parts of one long YouTube video.
+        Combine them into a single well-structured article about the whole video.
+        Maintain the original language of the content and ensure the summary is comprehensive yet concise.
+
+        DON'T SAY SOMETHING LIKE "Here is the summary of the video" or "The video is about". Just write the article directly.
+
+        Instructions:
+        - Create clear headings and sections
+        - Preserve key points and important details
+        - Merge topics that continue across parts instead of repeating them
+        - Maintain the original tone and context
+        - Don't summarize it too much, make it as an article!
+        - Write in the original language of the notes
+
+        Notes:
+        {notes}
         """
 
     def _build_graph(self) -> StateGraph:
         graph = StateGraph(AgentGraphState)
-        graph.add_node("summarize", self._summarize_node)
-        graph.add_edge(START, "summarize")
-        graph.add_edge("summarize", END)
+        graph.add_node(
+            "cache_lookup", self._timed_node("cache_lookup", self._cache_lookup_node)
+        )
+        graph.add_node(
+            "fetch_transcript",
+            self._timed_node(
+                "fetch_transcript", self._fetch_transcript_node, self._afetch_transcript_node
+            ),
+        )
+        graph.add_node(
+            "summarize",
+            self._branch_node("summarize", self._summarize_node, self._asummarize_node),
+        )
+        graph.add_node(
+            "map_chunks",
+            self._branch_node("map_chunks", self._map_chunks_node, self._amap_chunks_node),
+        )
+        graph.add_node(
+            "map_chapters",
+            self._branch_node(
+                "map_chapters", self._map_chapters_node, self._amap_chapters_node
+            ),
+        )
+        graph.add_node(
+            "tree_map",
+            self._timed_node("tree_map", self._tree_map_node, self._atree_map_node),
+        )
+        graph.add_node(
+            "reduce", self._branch_node("reduce", self._reduce_node, self._areduce_node)
+        )
+        graph.add_node(
+            "generate_outputs",
+            self._branch_node("generate_outputs", self._outputs_node, self._aoutputs_node),
+        )
+        # Deferred, so it runs once after the summary and outputs branches both finish
+        graph.add_node(
+            "cache_store",
+            self._timed_node("cache_store", self._cache_store_node),
+            defer=True,
+        )
+
+        graph.add_edge(START, "cache_lookup")
+        graph.add_conditional_edges(
+            "cache_lookup",
+            self._route_after_cache_lookup,
+            {"hit": END, "miss": "fetch_transcript", "tree": "tree_map"},
+        )
+        graph.add_conditional_edges(
+            "fetch_transcript",
+            self._route_strategy,
+            {
+                "single": "summarize",
+                "chunked": "map_chunks",
+                "chapters": "map_chapters",
+                "outputs": "generate_outputs",
+                "done": "cache_store",
+            },
+        )
+        graph.add_edge("summarize", "cache_store")
+        graph.add_edge("map_chapters", "cache_store")
+        graph.add_edge("generate_outputs", "cache_store")
+        graph.add_edge("map_chunks", "reduce")
+        graph.add_edge("tree_map", "reduce")
+        graph.add_edge("reduce", "cache_store")
+        graph.add_edge("cache_store", END)
 
         compiled_graph = graph.compile()
         logger.info("Summarization graph compiled successfully")
 
         return compiled_graph
 
-    def summarize_video(self, video_url: str, enable_time_range: bool = False, start_time:int =0, end_time:int = 0) -> str:
+    def _initial_state(
+        self,
+        video_url: str,
+        enable_time_range: bool = False,
+        start_time: int = 0,
+        end_time: int = 0,
+        time_ranges: Optional[List[Tuple[int, int]]] = None,
+        outputs: Optional[List[str]] = None,
+    ) -> Dict[str, Any]:
         if not video_url or not isinstance(video_url, str):
             raise ValueError("A valid YouTube video URL is required")
 
+        state = {"start_link": video_url, "outputs": parse_outputs(outputs)}
+        if not time_ranges and enable_time_range:
+            time_ranges = [(start_time, end_time)]
+        state["time_ranges"] = merge_time_ranges(time_ranges or [])
+        state["cache_key"] = self._make_cache_key(state)
+        return state
+
+    def _flight_key(self, state: Dict[str, Any]) -> str:
+        return f"{state['cache_key']}:{','.join(state['outputs'])}"
+
+    def cached_summary(
+        self,
+        video_url: str,
+        time_ranges: Optional[List[Tuple[int, int]]] = None,
+    ) -> Optional[str]:
+        """Return the cached summary for a request without running the pipeline"""
+        if not self.summary_cache:
+            return None
+        state = self._initial_state(video_url, time_ranges=time_ranges)
+        return self.summary_cache.get(state["cache_key"])
+
+    def run(
+        self,
+        video_url: str,
+        enable_time_range: bool = False,
+        start_time: int = 0,
+        end_time: int = 0,
+        time_ranges: Optional[List[Tuple[int, int]]] = None,
+        outputs: Optional[List[str]] = None,
+    ) -> AgentGraphState:
+        """
+        Run the summarization graph and return its final state, including cache metadata.
+
+        outputs selects what is generated from the one transcript fetch (see
+        OUTPUT_TYPES); the summary lands in "summarized_text" and the others
+        in "output_texts". By default only the summary is generated.
+        """
+        state = self._initial_state(
+            video_url, enable_time_range, start_time, end_time, time_ranges, outputs
+        )
+        try:
+            # Identical in-flight requests share one pipeline run; the extractor
+            # additionally coalesces transcript fetches across time ranges
+            result = self._flight.do(self._flight_key(state), self.graph.invoke, state)
+            return dict(result)
+
+        except Exception as e:
+            logger.error(f"Failed to summarize video {video_url}: {str(e)}")
+            raise
+
+    async def arun(
+        self,
+        video_url: str,
+        enable_time_range: bool = False,
+        start_time: int = 0,
+        end_time: int = 0,
+        time_ranges: Optional[List[Tuple[int, int]]] = None,
+        outputs: Optional[List[str]] = None,
+    ) -> AgentGraphState:
+        """Async counterpart of run() that never blocks the calling event loop"""
+        state = self._initial_state(
+            video_url, enable_time_range, start_time, end_time, time_ranges, outputs
+        )
         try:
-            if enable_time_range:
-                state = {
-                    "start_link": video_url,
-                    "enable_time_range": enable_time_range,
-                    "start_time": start_time,
-                    "end_time": end_time
-                }
-                result = self.graph.invoke(state)
-                return result["summarized_text"]
-            state = {"start_link": video_url}
-            result = self.graph.invoke(state)
-            return result["summarized_text"]
+            result = await self._aflight.do(
+                self._flight_key(state), self.graph.ainvoke, state
+            )
+            return dict(result)
 
         except Exception as e:
             logger.error(f"Failed to summarize video {video_url}: {str(e)}")
             raise
 
+    async def astream(
+        self,
+        video_url: str,
+        enable_time_range: bool = False,
+        start_time: int = 0,
+        end_time: int = 0,
+        time_ranges: Optional[List[Tuple[int, int]]] = None,
+        outputs: Optional[List[str]] = None,
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the graph and yield progress as it happens.
+
+        Yields dicts with an "event" name and a "data" payload:
+        "stage" for pipeline progress, "token" for each piece of the final
+        article as the LLM produces it, and "done" with the finished summary
+        and the other requested outputs.
+        """
+        state = self._initial_state(
+            video_url, enable_time_range, start_time, end_time, time_ranges, outputs
+        )
+        root_run_id = None
+        final_state: Dict[str, Any] = {}
+        streamed = False
+
+        async for event in self.graph.astream_events(state, version="v2"):
+            kind = event["event"]
+            if root_run_id is None:
+                root_run_id = event["run_id"]
+
+            if kind == "on_custom_event":
+                yield {"event": "stage", "data": {"stage": event["name"], **event["data"]}}
+            elif kind == "on_chain_end" and event["name"] == "cache_lookup":
+                cache_hit = event["data"]["output"].get("cache_hit", False)
+                yield {"event": "stage", "data": {"stage": "cache_lookup", "cache_hit": cache_hit}}
+            elif kind == "on_chat_model_stream" and FINAL_ANSWER_TAG in event.get(
+                "tags", []
+            ):
+                text = event["data"]["chunk"].content
+                if text:
+                    streamed = True
+                    yield {"event": "token", "data": {"text": text}}
+            elif kind == "on_chain_end" and event["run_id"] == root_run_id:
+                final_state = event["data"]["output"]
+
+        # Chapter articles are assembled rather than generated by one final
+        # call, so they are sent as a single piece
+        if not streamed and not final_state.get("cache_hit") and final_state.get("summarized_text"):
+            yield {"event": "token", "data": {"text": final_state["summarized_text"]}}
+
+        yield {
+            "event": "done",
+            "data": {
+                "summary": final_state.get("summarized_text", ""),
+                "cache_hit": final_state.get("cache_hit", False),
+                "route": final_state.get("route"),
+                "outputs": final_state.get("output_texts", {}),
+            },
+        }
+
+    def summarize_video(
+        self,
+        video_url: str,
+        enable_time_range: bool = False,
+        start_time: int = 0,
+        end_time: int = 0,
+        time_ranges: Optional[List[Tuple[int, int]]] = None,
+    ) -> str:
+        result = self.run(video_url, enable_time_range, start_time, end_time, time_ranges)
+        return result["summarized_text"]
+
+    async def asummarize_video(
+        self,
+        video_url: str,
+        enable_time_range: bool = False,
+        start_time: int = 0,
+        end_time: int = 0,
+        time_ranges: Optional[List[Tuple[int, int]]] = None,
+    ) -> str:
+        result = await self.arun(
+            video_url, enable_time_range, start_time, end_time, time_ranges
+        )
+        return result["summarized_text"]
+
+    def fold_into_summary(
+        self,
+        summary: str,
+        segments: List[str],
+        window: Tuple[int, int],
+        max_words: int = 1500,
+    ) -> str:
+        """
+        Update a running summary with the next stretch of a growing transcript.
+
+        Only the new segments and the previous summary are prompted, so an
+        update costs about the same however long the stream has been running.
+
+        Args:
+            summary: The summary so far; empty for the first update
+            segments: Caption text of the new stretch
+            window: (start_ms, end_ms) covered by the new segments
+            max_words: Length the summary is kept under
+
+        Returns:
+            str: The updated summary, or the old one if the stretch has no speech
+        """
+        segments, _ = compact_segments(segments, self.config.compaction)
+        transcript = " ".join(segments).strip()
+        if not transcript:
+            return summary
+        tokens = estimate_tokens(transcript) + estimate_tokens(summary)
+        route = self.routing.select(tokens, [window])
+        prompt = self._create_increment_prompt(summary, transcript, window, max_words)
+        updated = self._call_llm(prompt, {**asdict(route), "transcript_tokens": tokens})
+        return self._check_summary(updated.strip())
+
 
 # if __name__ == "__main__":
 #     try:
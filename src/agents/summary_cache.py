@@ -0,0 +1,102 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SQLITE_PATH = ".cache/summaries.sqlite3"
+
+
+def make_summary_cache_key(**fields: Any) -> str:
+    """Build a stable cache key from the fields that determine a summary"""
+    payload = json.dumps(fields, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SummaryCache(ABC):
+    """Pluggable key/value store for finished summaries"""
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[str]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: str) -> None:
+        ...
+
+    @classmethod
+    def from_env(cls) -> Optional["SummaryCache"]:
+        """
+        Create a summary cache from environment variables.
+
+        SUMMARY_CACHE_BACKEND selects "memory" (default), "sqlite" or "none".
+        SUMMARY_CACHE_PATH and SUMMARY_CACHE_MAX_ENTRIES configure the backends.
+
+        Returns:
+            SummaryCache: Configured backend, or None if caching is disabled
+        """
+        backend = os.getenv("SUMMARY_CACHE_BACKEND", "memory").lower()
+        if backend == "none":
+            return None
+        if backend == "sqlite":
+            return SQLiteSummaryCache(os.getenv("SUMMARY_CACHE_PATH", DEFAULT_SQLITE_PATH))
+        if backend == "memory":
+            return InMemorySummaryCache(int(os.getenv("SUMMARY_CACHE_MAX_ENTRIES", 256)))
+        raise ValueError(f"Unknown SUMMARY_CACHE_BACKEND: {backend}")
+
+
+class InMemorySummaryCache(SummaryCache):
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class SQLiteSummaryCache(SummaryCache):
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS summaries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM summaries WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO summaries (key, value, created_at) VALUES (?, ?, ?)",
+                (key, value, time.time()),
+            )
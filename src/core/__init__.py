@@ -0,0 +1,54 @@
+import importlib
+from typing import TYPE_CHECKING
+
+# Submodules are imported on first use, so e.g. the metrics helpers don't pull
+# in requests
+_EXPORTS = {
+    "SingleFlight": ".single_flight",
+    "AsyncSingleFlight": ".single_flight",
+    "HttpClientConfig": ".http_client",
+    "PooledSession": ".http_client",
+    "get_session": ".http_client",
+    "TokenBucket": ".rate_limit",
+    "LLMLimiterConfig": ".llm_limiter",
+    "LLMQueueTimeout": ".llm_limiter",
+    "LLMRateLimiter": ".llm_limiter",
+    "get_llm_limiter": ".llm_limiter",
+    "backoff_delay": ".llm_limiter",
+    "is_transient_error": ".llm_limiter",
+    "Timings": ".metrics",
+    "collect_timings": ".metrics",
+    "record_size": ".metrics",
+    "render_metrics": ".metrics",
+    "timed_stage": ".metrics",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .single_flight import SingleFlight, AsyncSingleFlight
+    from .http_client import HttpClientConfig, PooledSession, get_session
+    from .rate_limit import TokenBucket
+    from .llm_limiter import (
+        LLMLimiterConfig,
+        LLMQueueTimeout,
+        LLMRateLimiter,
+        backoff_delay,
+        get_llm_limiter,
+        is_transient_error,
+    )
+    from .metrics import Timings, collect_timings, record_size, render_metrics, timed_stage
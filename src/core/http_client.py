@@ -0,0 +1,81 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, FrozenSet, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class HttpClientConfig:
+    connect_timeout: float = 10.0
+    read_timeout: float = 30.0
+    # Number of per-host pools kept alive, and connections kept per host
+    pool_connections: int = 10
+    pool_maxsize: int = 20
+    max_retries: int = 3
+    # Delay before retry n is backoff_factor * 2 ** (n - 1), plus up to
+    # backoff_jitter seconds of random jitter, capped at backoff_max
+    backoff_factor: float = 0.5
+    backoff_jitter: float = 0.5
+    backoff_max: float = 30.0
+    status_forcelist: Tuple[int, ...] = (429, 500, 502, 503, 504)
+    # Only idempotent methods are retried unless a client opts in
+    retry_methods: FrozenSet[str] = frozenset({"GET", "HEAD", "OPTIONS"})
+
+    @property
+    def timeout(self) -> Tuple[float, float]:
+        return (self.connect_timeout, self.read_timeout)
+
+
+class PooledSession(requests.Session):
+    """requests.Session with a default timeout and retrying, pooled adapters"""
+
+    def __init__(self, config: Optional[HttpClientConfig] = None):
+        super().__init__()
+        self.config = config or HttpClientConfig()
+        retry = Retry(
+            total=self.config.max_retries,
+            backoff_factor=self.config.backoff_factor,
+            backoff_jitter=self.config.backoff_jitter,
+            backoff_max=self.config.backoff_max,
+            status_forcelist=self.config.status_forcelist,
+            allowed_methods=self.config.retry_methods,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=self.config.pool_connections,
+            pool_maxsize=self.config.pool_maxsize,
+            max_retries=retry,
+        )
+        self.mount("https://", adapter)
+        self.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault("timeout", self.config.timeout)
+        return super().request(method, url, **kwargs)
+
+
+_sessions: Dict[str, PooledSession] = {}
+_sessions_lock = threading.Lock()
+
+
+def get_session(name: str = "default", config: Optional[HttpClientConfig] = None) -> PooledSession:
+    """
+    Return the process-wide session registered under ``name``.
+
+    Sessions are keyed by name so clients with different retry policies (or
+    default headers and cookies) don't share state. ``config`` only applies
+    when the session is first created.
+    """
+    with _sessions_lock:
+        session = _sessions.get(name)
+        if session is None:
+            session = _sessions[name] = PooledSession(config)
+        return session
+
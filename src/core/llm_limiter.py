@@ -0,0 +1,363 @@
+import asyncio
+import logging
+import os
+import random
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from .metrics import DURATION_BUCKETS, REGISTRY
+from .rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+QUEUE_DEPTH = REGISTRY.gauge(
+    "llm_limiter_queue_depth", "LLM calls waiting for the limiter", labelnames=("model",)
+)
+IN_FLIGHT = REGISTRY.gauge(
+    "llm_limiter_in_flight", "LLM calls currently running", labelnames=("model",)
+)
+CONCURRENCY_LIMIT = REGISTRY.gauge(
+    "llm_limiter_concurrency_limit", "Current adaptive concurrency limit", labelnames=("model",)
+)
+WAIT_SECONDS = REGISTRY.histogram(
+    "llm_limiter_wait_seconds",
+    "Time LLM calls spent queued in the limiter",
+    labelnames=("model",),
+    buckets=(0.001,) + DURATION_BUCKETS,
+)
+THROTTLED = REGISTRY.counter(
+    "llm_limiter_throttled_total",
+    "LLM calls rejected by the provider as rate limited (429 / RESOURCE_EXHAUSTED)",
+    labelnames=("model",),
+)
+TIMEOUTS = REGISTRY.counter(
+    "llm_limiter_timeouts_total",
+    "LLM calls that gave up waiting in the limiter",
+    labelnames=("model",),
+)
+
+_THROTTLE_RE = re.compile(r"\b429\b|resource.?exhausted|too.?many.?requests", re.IGNORECASE)
+# Server-side failures worth another try, but not a reason to slow everyone down
+_TRANSIENT_RE = re.compile(
+    r"\b50[0234]\b|internal.?server.?error|\binternal\b|unavailable"
+    r"|bad.?gateway|gateway.?timeout|overloaded",
+    re.IGNORECASE,
+)
+_RETRY_DELAY_RE = re.compile(r"retry(?:_delay| in|-after)[^0-9]{0,20}([0-9.]+)\s*s", re.IGNORECASE)
+
+
+class LLMQueueTimeout(TimeoutError):
+    """Raised when an LLM call cannot get through the limiter before its deadline"""
+
+
+@dataclass(frozen=True)
+class LLMLimiterConfig:
+    requests_per_minute: float = 2000
+    tokens_per_minute: float = 4_000_000
+    # Seconds of budget that can be spent in a burst
+    burst_seconds: float = 5.0
+    # AIMD window: grows by one slot per window of successes, halves on throttling
+    initial_concurrency: float = 8
+    min_concurrency: float = 1
+    max_concurrency: float = 32
+    decrease_factor: float = 0.5
+    # A call slower than this multiple of the moving average counts as a latency spike
+    latency_spike_factor: float = 3.0
+    # Calls faster than this never count as spikes, however small the average
+    latency_spike_min_seconds: float = 1.0
+    # How long a call may wait for capacity before failing
+    queue_timeout: float = 120.0
+    # Retries of throttled calls, with jittered exponential backoff
+    max_retries: int = 3
+    backoff_base: float = 1.0
+    backoff_max: float = 30.0
+
+    @classmethod
+    def from_env(cls) -> "LLMLimiterConfig":
+        """Read LLM_RPM, LLM_TPM, LLM_MAX_CONCURRENCY and LLM_QUEUE_TIMEOUT"""
+        defaults = cls()
+        return cls(
+            requests_per_minute=float(os.getenv("LLM_RPM", defaults.requests_per_minute)),
+            tokens_per_minute=float(os.getenv("LLM_TPM", defaults.tokens_per_minute)),
+            max_concurrency=float(os.getenv("LLM_MAX_CONCURRENCY", defaults.max_concurrency)),
+            initial_concurrency=min(
+                defaults.initial_concurrency,
+                float(os.getenv("LLM_MAX_CONCURRENCY", defaults.max_concurrency)),
+            ),
+            queue_timeout=float(os.getenv("LLM_QUEUE_TIMEOUT", defaults.queue_timeout)),
+        )
+
+
+def is_throttling_error(error: BaseException) -> bool:
+    """Whether an LLM client error means "slow down" (429 / RESOURCE_EXHAUSTED)"""
+    return bool(_THROTTLE_RE.search(f"{type(error).__name__} {error}"))
+
+
+def is_transient_error(error: BaseException) -> bool:
+    """Whether an LLM client error is a server-side failure (5xx) that may pass on retry"""
+    if isinstance(error, LLMQueueTimeout) or is_throttling_error(error):
+        return False
+    return bool(_TRANSIENT_RE.search(f"{type(error).__name__} {error}"))
+
+
+def backoff_delay(attempt: int, base: float = 1.0, maximum: float = 30.0) -> float:
+    """Jittered exponential backoff before retry number ``attempt`` (from 0)"""
+    return min(maximum, base * 2 ** attempt * (1 + random.random()))
+
+
+def _retry_delay(error: BaseException) -> Optional[float]:
+    match = _RETRY_DELAY_RE.search(str(error))
+    return float(match.group(1)) if match else None
+
+
+class LLMRateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budgets plus an AIMD concurrency
+    window for one model.
+
+    Calls wait in line until a concurrency slot and enough budget are free, or
+    fail with LLMQueueTimeout once their deadline passes. Successful calls
+    widen the window additively; throttling errors and latency spikes shrink
+    it multiplicatively, and throttled calls are retried with backoff. Usable
+    from threads and event loops at the same time.
+    """
+
+    def __init__(self, model: str, config: Optional[LLMLimiterConfig] = None):
+        self.model = model
+        self.config = config or LLMLimiterConfig()
+        burst = self.config.burst_seconds / 60
+        self._requests = TokenBucket(
+            self.config.requests_per_minute / 60,
+            max(1.0, self.config.requests_per_minute * burst),
+        )
+        self._tokens = TokenBucket(
+            self.config.tokens_per_minute / 60,
+            max(1.0, self.config.tokens_per_minute * burst),
+        )
+        self._lock = threading.Lock()
+        self._slot_freed = threading.Condition(self._lock)
+        self._limit = self.config.initial_concurrency
+        self._in_flight = 0
+        self._latency_avg: Optional[float] = None
+        CONCURRENCY_LIMIT.set(self._limit, model=model)
+
+    @property
+    def concurrency_limit(self) -> float:
+        return self._limit
+
+    def _try_enter(self) -> bool:
+        with self._lock:
+            if self._in_flight < max(1, int(self._limit)):
+                self._in_flight += 1
+                IN_FLIGHT.set(self._in_flight, model=self.model)
+                return True
+            return False
+
+    def _leave(self, latency: Optional[float], throttled: bool) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            IN_FLIGHT.set(self._in_flight, model=self.model)
+            spike = (
+                latency is not None
+                and self._latency_avg is not None
+                and latency > self.config.latency_spike_min_seconds
+                and latency > self._latency_avg * self.config.latency_spike_factor
+            )
+            if throttled or spike:
+                self._limit = max(
+                    self.config.min_concurrency, self._limit * self.config.decrease_factor
+                )
+                logger.warning(
+                    f"LLM {'throttled' if throttled else 'latency spike'}, "
+                    f"concurrency limit for {self.model} lowered to {self._limit:.1f}"
+                )
+            elif latency is not None:
+                self._limit = min(self.config.max_concurrency, self._limit + 1 / self._limit)
+            if latency is not None:
+                self._latency_avg = (
+                    latency
+                    if self._latency_avg is None
+                    else 0.8 * self._latency_avg + 0.2 * latency
+                )
+            CONCURRENCY_LIMIT.set(self._limit, model=self.model)
+            self._slot_freed.notify_all()
+
+    def _budget_wait(self, tokens: float) -> float:
+        """Take request and token budget, or return how long to wait for it"""
+        wait = self._requests.try_acquire(1)
+        if wait:
+            return wait
+        wait = self._tokens.try_acquire(tokens)
+        if wait:
+            # Give the request back so waiting for tokens doesn't burn RPM budget
+            self._requests.release(1)
+        return wait
+
+    def _clamp(self, tokens: float) -> float:
+        # Prompts larger than the burst still go through, once the bucket is full
+        return min(max(tokens, 1), self._tokens.capacity)
+
+    def _throttled(self, error: BaseException, attempt: int) -> float:
+        THROTTLED.inc(model=self.model)
+        delay = _retry_delay(error)
+        if delay is None:
+            delay = backoff_delay(attempt, self.config.backoff_base, self.config.backoff_max)
+        # Hold back every caller of this model, not just this one
+        self._requests.penalize(delay)
+        return delay
+
+    def _enter(self, tokens: float, deadline: float) -> None:
+        tokens = self._clamp(tokens)
+        QUEUE_DEPTH.inc(model=self.model)
+        started = time.monotonic()
+        try:
+            with self._slot_freed:
+                while self._in_flight >= max(1, int(self._limit)):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise self._timeout(time.monotonic() - started)
+                    self._slot_freed.wait(remaining)
+                self._in_flight += 1
+                IN_FLIGHT.set(self._in_flight, model=self.model)
+            try:
+                while True:
+                    wait = self._budget_wait(tokens)
+                    if not wait:
+                        break
+                    if time.monotonic() + wait > deadline:
+                        raise self._timeout(time.monotonic() - started)
+                    time.sleep(wait)
+            except BaseException:
+                # Includes interrupts, which would otherwise keep the slot forever
+                self._leave(None, False)
+                raise
+        finally:
+            QUEUE_DEPTH.dec(model=self.model)
+            WAIT_SECONDS.observe(time.monotonic() - started, model=self.model)
+
+    async def _aenter(self, tokens: float, deadline: float) -> None:
+        tokens = self._clamp(tokens)
+        QUEUE_DEPTH.inc(model=self.model)
+        started = time.monotonic()
+        poll = 0.005
+        try:
+            # Slots are also released by threads, so the event loop polls
+            while not self._try_enter():
+                if time.monotonic() + poll > deadline:
+                    raise self._timeout(time.monotonic() - started)
+                await asyncio.sleep(poll)
+                poll = min(poll * 2, 0.1)
+            try:
+                while True:
+                    wait = self._budget_wait(tokens)
+                    if not wait:
+                        break
+                    if time.monotonic() + wait > deadline:
+                        raise self._timeout(time.monotonic() - started)
+                    await asyncio.sleep(wait)
+            except BaseException:
+                # Includes cancellation, which would otherwise keep the slot forever
+                self._leave(None, False)
+                raise
+        finally:
+            QUEUE_DEPTH.dec(model=self.model)
+            WAIT_SECONDS.observe(time.monotonic() - started, model=self.model)
+
+    def _timeout(self, waited: float) -> LLMQueueTimeout:
+        TIMEOUTS.inc(model=self.model)
+        return LLMQueueTimeout(f"No LLM capacity for {self.model} after waiting {waited:.1f}s")
+
+    def call(
+        self,
+        fn: Callable[[], Any],
+        tokens: float = 1,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+    ) -> Any:
+        """
+        Run ``fn`` once capacity for a request of ``tokens`` tokens is available.
+
+        Args:
+            fn: The LLM call
+            tokens: Estimated tokens the call consumes
+            timeout: Seconds to wait for capacity, across retries; defaults to queue_timeout
+            max_retries: Retries of throttled calls; defaults to the config's max_retries
+
+        Returns:
+            Any: Whatever fn returns
+        """
+        deadline = time.monotonic() + (timeout if timeout is not None else self.config.queue_timeout)
+        retries = self.config.max_retries if max_retries is None else max_retries
+        for attempt in range(retries + 1):
+            self._enter(tokens, deadline)
+            started = time.monotonic()
+            try:
+                result = fn()
+            except Exception as e:
+                throttled = is_throttling_error(e)
+                self._leave(None, throttled)
+                if not throttled or attempt == retries:
+                    raise
+                delay = self._throttled(e, attempt)
+                if time.monotonic() + delay > deadline:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled or interrupted: free the slot without counting a throttle
+                self._leave(None, False)
+                raise
+            self._leave(time.monotonic() - started, False)
+            return result
+
+    async def acall(
+        self,
+        fn: Callable[[], Awaitable[Any]],
+        tokens: float = 1,
+        timeout: Optional[float] = None,
+        max_retries: Optional[int] = None,
+    ) -> Any:
+        """Async counterpart of call(); ``fn`` returns a fresh awaitable per attempt"""
+        deadline = time.monotonic() + (timeout if timeout is not None else self.config.queue_timeout)
+        retries = self.config.max_retries if max_retries is None else max_retries
+        for attempt in range(retries + 1):
+            await self._aenter(tokens, deadline)
+            started = time.monotonic()
+            try:
+                result = await fn()
+            except Exception as e:
+                throttled = is_throttling_error(e)
+                self._leave(None, throttled)
+                if not throttled or attempt == retries:
+                    raise
+                delay = self._throttled(e, attempt)
+                if time.monotonic() + delay > deadline:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                # Cancelled or interrupted: free the slot without counting a throttle
+                self._leave(None, False)
+                raise
+            self._leave(time.monotonic() - started, False)
+            return result
+
+
+_limiters: Dict[str, LLMRateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_llm_limiter(model: str, config: Optional[LLMLimiterConfig] = None) -> LLMRateLimiter:
+    """
+    Return the process-wide limiter for ``model``, so every agent, job worker
+    and batch run in the process shares one budget. ``config`` defaults to
+    LLMLimiterConfig.from_env() and only applies when the limiter is created.
+    """
+    with _limiters_lock:
+        limiter = _limiters.get(model)
+        if limiter is None:
+            limiter = _limiters[model] = LLMRateLimiter(model, config or LLMLimiterConfig.from_env())
+        return limiter
@@ -0,0 +1,247 @@
+import contextvars
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = tuple(10 ** exponent for exponent in range(2, 10))
+
+LabelValues = Tuple[str, ...]
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Gauge:
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: non-cumulative bucket counts (last one is +Inf), sum
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = tuple(str(labels[name]) for name in self.labelnames)
+        with self._lock:
+            counts, total = self._values.setdefault(
+                key, ([0] * (len(self.buckets) + 1), [0.0])
+            )
+            counts[bisect_left(self.buckets, value)] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets + (float("inf"),), counts):
+                    cumulative += count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    labels = _labels(self.labelnames + ("le",), key + (le,))
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                labels = _labels(self.labelnames, key)
+                lines.append(f"{self.name}_sum{labels} {total[0]:g}")
+                lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def _labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    pairs = ",".join(
+        '{}="{}"'.format(name, value.replace("\\", "\\\\").replace('"', '\\"'))
+        for name, value in zip(names, values)
+    )
+    return "{" + pairs + "}"
+
+
+class MetricsRegistry:
+    """Process-wide set of metrics, rendered in the Prometheus text format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        with self._lock:
+            return self._metrics.setdefault(name, Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        with self._lock:
+            return self._metrics.setdefault(name, Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DURATION_BUCKETS,
+    ) -> Histogram:
+        with self._lock:
+            return self._metrics.setdefault(
+                name, Histogram(name, help, labelnames, buckets)
+            )
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        lines: List[str] = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = MetricsRegistry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "summarizer_stage_duration_seconds",
+    "Time spent in each pipeline stage",
+    labelnames=("stage",),
+)
+STAGE_ERRORS = REGISTRY.counter(
+    "summarizer_stage_errors_total",
+    "Pipeline stages that ended with an exception",
+    labelnames=("stage",),
+)
+
+
+class Timings:
+    """Per-request breakdown filled in by the stages a request runs through"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.stages: Dict[str, float] = {}
+        self.sizes: Dict[str, int] = {}
+        self.errors: Dict[str, int] = {}
+
+    def add_stage(self, stage: str, seconds: float, failed: bool = False) -> None:
+        with self._lock:
+            self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+            if failed:
+                self.errors[stage] = self.errors.get(stage, 0) + 1
+
+    def add_size(self, kind: str, value: int) -> None:
+        with self._lock:
+            self.sizes[kind] = self.sizes.get(kind, 0) + value
+
+    def to_dict(self) -> Dict[str, Dict[str, float]]:
+        """Stage durations in milliseconds; stages can nest and run concurrently, so they overlap"""
+        with self._lock:
+            return {
+                "stages_ms": {
+                    stage: round(seconds * 1000, 1) for stage, seconds in self.stages.items()
+                },
+                "sizes": dict(self.sizes),
+                "errors": dict(self.errors),
+            }
+
+
+_current_timings: "contextvars.ContextVar[Optional[Timings]]" = contextvars.ContextVar(
+    "current_timings", default=None
+)
+
+
+@contextmanager
+def collect_timings() -> Iterator[Timings]:
+    """
+    Collect a per-request breakdown of the stages run inside the block.
+
+    Work handed to other threads only reports here if it runs in a copy of
+    this context (contextvars.copy_context().run).
+    """
+    timings = Timings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+@contextmanager
+def timed_stage(stage: str) -> Iterator[None]:
+    """Record the duration, and any exception, of a pipeline stage"""
+    failed = False
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        failed = True
+        STAGE_ERRORS.inc(stage=stage)
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.observe(elapsed, stage=stage)
+        timings = _current_timings.get()
+        if timings is not None:
+            timings.add_stage(stage, elapsed, failed)
+
+
+def record_size(kind: str, value: int) -> None:
+    """Record a byte, character or token count, e.g. record_size("transcript_bytes", n)"""
+    REGISTRY.histogram(
+        f"summarizer_{kind}", f"Distribution of {kind.replace('_', ' ')}", buckets=SIZE_BUCKETS
+    ).observe(value)
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.add_size(kind, value)
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
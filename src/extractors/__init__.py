@@ -1,3 +1,39 @@
-from .youtube_extractor import YouTubeSubtitleExtractor
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = ["YouTubeSubtitleExtractor"]
+# Submodules are imported on first use to keep CLI and server startup fast
+_EXPORTS = {
+    "YouTubeSubtitleExtractor": ".youtube_extractor",
+    "extract_video_id": ".youtube_extractor",
+    "Chapter": ".youtube_extractor",
+    "LIVE_STATUSES": ".youtube_extractor",
+    "SubtitleIndex": ".subtitle_index",
+    "merge_time_ranges": ".subtitle_index",
+    "TranscriptCache": ".transcript_cache",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
+
+
+if TYPE_CHECKING:
+    from .youtube_extractor import (
+        LIVE_STATUSES,
+        Chapter,
+        YouTubeSubtitleExtractor,
+        extract_video_id,
+    )
+    from .subtitle_index import SubtitleIndex, merge_time_ranges
+    from .transcript_cache import TranscriptCache
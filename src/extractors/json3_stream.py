@@ -0,0 +1,132 @@
+import codecs
+import json
+from typing import Iterable, Iterator, Optional, Sequence, Tuple
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\n\r"
+
+
+class _Reader:
+    """Incrementally decoded text buffer over an iterable of byte chunks"""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._chunks = iter(chunks)
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.exhausted = False
+
+    def fill(self) -> bool:
+        """Append the next chunk to the buffer; False once the input is exhausted"""
+        if self.exhausted:
+            return False
+
+        # Drop what has already been consumed so the buffer stays small
+        self.buffer = self.buffer[self.pos :]
+        self.pos = 0
+
+        chunk = next(self._chunks, None)
+        if chunk is None:
+            self.exhausted = True
+            self.buffer += self._utf8.decode(b"", final=True)
+            return False
+
+        self.buffer += self._utf8.decode(chunk)
+        return True
+
+    def drain(self) -> None:
+        for _ in self._chunks:
+            pass
+        self.exhausted = True
+
+    def skip_whitespace(self) -> Optional[str]:
+        """Advance past whitespace and return the next character, or None at EOF"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _WHITESPACE:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return None
+
+    def find(self, token: str) -> bool:
+        """Advance just past the next occurrence of ``token``"""
+        while True:
+            index = self.buffer.find(token, self.pos)
+            if index != -1:
+                self.pos = index + len(token)
+                return True
+            # Keep a tail in case the token straddles two chunks
+            self.pos = max(self.pos, len(self.buffer) - len(token))
+            if not self.fill():
+                return False
+
+    def decode_value(self):
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # Most likely the value is cut off at the end of the buffer
+                if self.fill():
+                    continue
+                raise
+            self.pos = end
+            return value
+
+
+def iter_json3_events(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """
+    Yield the objects of a json3 document's "events" array one at a time.
+
+    Only the event being decoded (plus one network chunk) is held in memory,
+    instead of the whole document tree that ``json.loads`` would build.
+    """
+    reader = _Reader(chunks)
+    if not reader.find('"events"'):
+        return
+
+    if reader.skip_whitespace() != ":":
+        raise ValueError("Malformed json3 document: expected ':' after \"events\"")
+    reader.pos += 1
+    if reader.skip_whitespace() != "[":
+        raise ValueError("Malformed json3 document: \"events\" is not an array")
+    reader.pos += 1
+
+    while True:
+        char = reader.skip_whitespace()
+        if char is None:
+            raise ValueError("Malformed json3 document: unterminated events array")
+        if char == "]":
+            # Drain the rest of the document so callers tee-ing the chunks
+            # (e.g. into the transcript cache) still see all of it
+            reader.drain()
+            return
+        if char == ",":
+            reader.pos += 1
+            continue
+        yield reader.decode_value()
+
+
+def event_text(event: dict) -> str:
+    return " ".join(
+        segment["utf8"] for segment in event.get("segs", []) if "utf8" in segment
+    )
+
+
+def iter_event_segments(
+    events: Iterable[dict], time_ranges: Optional[Sequence[Tuple[int, int]]] = None
+) -> Iterator[str]:
+    """
+    Yield the text of each event, optionally only the events overlapping one
+    of the (already merged) time ranges.
+    """
+    for event in events:
+        if time_ranges:
+            start = event.get("tStartMs", 0)
+            end = start + event.get("dDurationMs", 0)
+            if not any(start <= range_end and end >= range_start for range_start, range_end in time_ranges):
+                continue
+
+        text = event_text(event)
+        if text:
+            yield text
@@ -0,0 +1,152 @@
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+from .json3_stream import event_text
+
+TimeRange = Tuple[int, int]
+
+
+def merge_time_ranges(time_ranges: Sequence[TimeRange]) -> List[TimeRange]:
+    """Sort ranges and merge the ones that overlap or touch"""
+    merged: List[TimeRange] = []
+    for start, end in sorted(time_ranges):
+        if start > end:
+            raise ValueError("start_time must be less than end_time")
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class SubtitleIndex:
+    """
+    Compact, array-backed view of the text events of a json3 transcript.
+
+    Event i starts at ``starts[i]`` ms, lasts ``durations[i]`` ms and its text
+    is ``text[offsets[i]:offsets[i + 1] - 1]`` (events are separated by one
+    space in the shared buffer). Time-range queries are binary searches, and
+    the text of a contiguous run of events is a single slice of the buffer.
+    """
+
+    __slots__ = ("starts", "durations", "offsets", "text", "_max_ends")
+
+    def __init__(self, starts: array, durations: array, offsets: array, text: str):
+        self.starts = starts
+        self.durations = durations
+        self.offsets = offsets
+        self.text = text
+
+        # Running maximum of event end times; unlike the end times themselves it
+        # is sorted, so it can be bisected to find the first overlapping event
+        self._max_ends = array("q")
+        current = 0
+        for start, duration in zip(starts, durations):
+            current = max(current, start + duration)
+            self._max_ends.append(current)
+
+    @classmethod
+    def from_events(cls, events: Iterable[dict]) -> "SubtitleIndex":
+        """Build the index from json3 events; ``events`` may be a lazy stream"""
+        starts = array("q")
+        durations = array("q")
+        texts: List[str] = []
+        ordered = True
+
+        for event in events:
+            text = event_text(event)
+            if not text:
+                continue
+            start = event.get("tStartMs", 0)
+            if starts and start < starts[-1]:
+                ordered = False
+            starts.append(start)
+            durations.append(event.get("dDurationMs", 0))
+            texts.append(text)
+
+        # json3 events are already ordered; sorting is only a safety net
+        if not ordered:
+            order = sorted(range(len(starts)), key=starts.__getitem__)
+            starts = array("q", (starts[i] for i in order))
+            durations = array("q", (durations[i] for i in order))
+            texts = [texts[i] for i in order]
+
+        offsets = array("q", [0])
+        position = 0
+        for text in texts:
+            position += len(text) + 1
+            offsets.append(position)
+
+        return cls(starts, durations, offsets, " ".join(texts))
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def _span(self, start_time: int, end_time: int) -> List[Tuple[int, int]]:
+        """Index runs of the events that overlap [start_time, end_time]"""
+        # Events starting inside the window always overlap it and are contiguous
+        first = bisect_left(self.starts, start_time)
+        hi = bisect_right(self.starts, end_time)
+        # Earlier events overlap only if they last into the window; a long
+        # event can be followed by short ones that end before it starts
+        runs: List[Tuple[int, int]] = []
+        for i in range(bisect_left(self._max_ends, start_time), first):
+            if self.starts[i] + self.durations[i] < start_time:
+                continue
+            if runs and runs[-1][1] == i:
+                runs[-1] = (runs[-1][0], i + 1)
+            else:
+                runs.append((i, i + 1))
+        if first < hi:
+            if runs and runs[-1][1] == first:
+                runs[-1] = (runs[-1][0], hi)
+            else:
+                runs.append((first, hi))
+        return runs
+
+    def _spans(self, time_ranges: Optional[Sequence[TimeRange]]) -> List[Tuple[int, int]]:
+        if not time_ranges:
+            return [(0, len(self))] if len(self) else []
+
+        runs = sorted(
+            run
+            for start_time, end_time in merge_time_ranges(time_ranges)
+            for run in self._span(start_time, end_time)
+        )
+        # A long event can overlap several ranges, so runs are merged by index
+        spans: List[Tuple[int, int]] = []
+        for lo, hi in runs:
+            if spans and lo <= spans[-1][1]:
+                spans[-1] = (spans[-1][0], max(spans[-1][1], hi))
+            else:
+                spans.append((lo, hi))
+        return spans
+
+    def segment(self, i: int) -> str:
+        return self.text[self.offsets[i] : self.offsets[i + 1] - 1]
+
+    def segments(self, time_ranges: Optional[Sequence[TimeRange]] = None) -> List[str]:
+        """Text of each event overlapping any of the ranges (all events if none given)"""
+        return [self.segment(i) for lo, hi in self._spans(time_ranges) for i in range(lo, hi)]
+
+    def segments_starting_in(
+        self,
+        start_time: int,
+        end_time: int,
+        time_ranges: Optional[Sequence[TimeRange]] = None,
+    ) -> List[str]:
+        """Text of the events starting in [start_time, end_time) that overlap the ranges"""
+        return [
+            self.segment(i)
+            for lo, hi in self._spans(time_ranges or [(start_time, end_time)])
+            for i in range(lo, hi)
+            if start_time <= self.starts[i] < end_time
+        ]
+
+    def slice_text(self, time_ranges: Optional[Sequence[TimeRange]] = None) -> str:
+        """Text overlapping the ranges, taken as one buffer slice per range"""
+        return " ".join(
+            self.text[self.offsets[lo] : self.offsets[hi] - 1]
+            for lo, hi in self._spans(time_ranges)
+        )
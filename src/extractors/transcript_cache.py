@@ -0,0 +1,263 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, BinaryIO, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = ".cache/transcripts"
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+# Captions can still change after they are cached (a stream that was still
+# running, corrected auto-captions), so entries are refetched after a day
+DEFAULT_TTL_SECONDS = 24 * 60 * 60
+
+
+class TranscriptCache:
+    """
+    On-disk cache of raw json3 subtitle documents.
+
+    Entries are content-addressed by (video ID, language), stored gzip-compressed
+    and evicted least-recently-used once the cache grows past ``max_bytes``.
+    An entry's mtime records when it was written (used for the TTL) and its
+    atime is refreshed on every read (used for the LRU order).
+
+    A video's chapter list is kept next to its transcripts in a small JSON
+    entry, so a cached transcript can be split into chapters without asking
+    yt-dlp for the metadata again.
+    """
+
+    AUTO_LANG = "auto"
+    SUFFIX = ".json3.gz"
+    CHAPTERS_SUFFIX = ".chapters.json.gz"
+
+    def __init__(
+        self,
+        cache_dir: str = DEFAULT_CACHE_DIR,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        ttl_seconds: Optional[int] = DEFAULT_TTL_SECONDS,
+    ):
+        """
+        Args:
+            cache_dir (str): Directory the compressed entries are written to
+            max_bytes (int): Size budget of the cache directory on disk
+            ttl_seconds (int, optional): Entries older than this are treated as missing; None keeps them
+        """
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+
+    @classmethod
+    def from_env(cls) -> Optional["TranscriptCache"]:
+        """
+        Create a TranscriptCache from environment variables.
+
+        TRANSCRIPT_CACHE_DIR (set it to an empty string to disable caching),
+        TRANSCRIPT_CACHE_MAX_BYTES and TRANSCRIPT_CACHE_TTL (default one day,
+        0 to never expire) are honoured.
+
+        Returns:
+            TranscriptCache: Configured instance, or None if caching is disabled
+        """
+        cache_dir = os.getenv("TRANSCRIPT_CACHE_DIR", DEFAULT_CACHE_DIR)
+        if not cache_dir:
+            return None
+
+        max_bytes = int(os.getenv("TRANSCRIPT_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        ttl = int(os.getenv("TRANSCRIPT_CACHE_TTL") or DEFAULT_TTL_SECONDS)
+        return cls(cache_dir, max_bytes, ttl or None)
+
+    @staticmethod
+    def make_key(video_id: str, lang: str) -> str:
+        return hashlib.sha256(f"{video_id}:{lang}".encode("utf-8")).hexdigest()
+
+    def _path(self, video_id: str, lang: str) -> Path:
+        return self.cache_dir / f"{self.make_key(video_id, lang)}{self.SUFFIX}"
+
+    def _is_expired(self, stat: os.stat_result, now: float) -> bool:
+        if self.ttl_seconds is None:
+            return False
+        return now - stat.st_mtime > self.ttl_seconds
+
+    def open(self, video_id: str, lang: str) -> Optional[BinaryIO]:
+        """
+        Open a cached entry for streaming reads.
+
+        Returns:
+            BinaryIO: Decompressing file object, or None on a miss
+        """
+        path = self._path(video_id, lang)
+        try:
+            now = time.time()
+            stat = path.stat()
+            if self._is_expired(stat, now):
+                logger.info(f"Transcript cache entry expired for {video_id} ({lang})")
+                path.unlink(missing_ok=True)
+                return None
+
+            f = gzip.open(path, "rb")
+            os.utime(path, (now, stat.st_mtime))
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Dropping unreadable transcript cache entry {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+
+        logger.info(f"Transcript cache hit for {video_id} ({lang})")
+        return f
+
+    def get(self, video_id: str, lang: str) -> Optional[bytes]:
+        f = self.open(video_id, lang)
+        if f is None:
+            return None
+
+        try:
+            with f:
+                return f.read()
+        except (OSError, EOFError) as e:
+            self.discard(video_id, lang, reason=str(e))
+            return None
+
+    def discard(self, video_id: str, lang: str, reason: str = "") -> None:
+        path = self._path(video_id, lang)
+        logger.warning(f"Dropping unreadable transcript cache entry {path}: {reason}")
+        path.unlink(missing_ok=True)
+
+    def writer(self, video_id: str, lang: str) -> "CacheEntryWriter":
+        """Start writing an entry incrementally; it only becomes visible on commit()"""
+        return CacheEntryWriter(self, self._path(video_id, lang))
+
+    def put(self, video_id: str, lang: str, data: bytes) -> None:
+        writer = self.writer(video_id, lang)
+        writer.write(data)
+        writer.commit()
+
+    def _chapters_path(self, video_id: str) -> Path:
+        return self.cache_dir / f"{self.make_key(video_id, 'chapters')}{self.CHAPTERS_SUFFIX}"
+
+    def get_chapters(self, video_id: str) -> Optional[List[Any]]:
+        """The stored chapter list of a video (possibly empty), or None on a miss"""
+        path = self._chapters_path(video_id)
+        try:
+            now = time.time()
+            stat = path.stat()
+            if self._is_expired(stat, now):
+                path.unlink(missing_ok=True)
+                return None
+            chapters = json.loads(gzip.decompress(path.read_bytes()))
+            os.utime(path, (now, stat.st_mtime))
+        except FileNotFoundError:
+            return None
+        except (OSError, EOFError, ValueError) as e:
+            logger.warning(f"Dropping unreadable chapters cache entry {path}: {e}")
+            path.unlink(missing_ok=True)
+            return None
+        return chapters
+
+    def put_chapters(self, video_id: str, chapters: List[Any]) -> None:
+        writer = CacheEntryWriter(self, self._chapters_path(video_id))
+        writer.write(json.dumps(chapters, ensure_ascii=False).encode("utf-8"))
+        writer.commit()
+
+    def _entries(self) -> Iterator[Path]:
+        yield from self.cache_dir.glob(f"*{self.SUFFIX}")
+        yield from self.cache_dir.glob(f"*{self.CHAPTERS_SUFFIX}")
+
+    def clear(self) -> None:
+        with self._lock:
+            for path in self._entries():
+                path.unlink(missing_ok=True)
+
+    def _evict(self) -> None:
+        with self._lock:
+            entries = []
+            total = 0
+            for path in self._entries():
+                try:
+                    stat = path.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_atime, stat.st_size, path))
+                total += stat.st_size
+
+            if total <= self.max_bytes:
+                return
+
+            entries.sort()
+            for _, size, path in entries:
+                if total <= self.max_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total -= size
+                logger.info(f"Evicted transcript cache entry {path.name}")
+
+
+class CacheEntryWriter:
+    """
+    Streams data into a temp file next to the cache entry and atomically
+    renames it into place on commit(), so readers never see a partial entry.
+    Write failures are logged and turn the writer into a no-op: a failed
+    cache write must never fail the extraction itself.
+    """
+
+    def __init__(self, cache: TranscriptCache, path: Path):
+        self._cache = cache
+        self._path = path
+        self._tmp_path: Optional[str] = None
+        self._file: Optional[gzip.GzipFile] = None
+        try:
+            fd, self._tmp_path = tempfile.mkstemp(dir=cache.cache_dir, suffix=".tmp")
+            self._file = gzip.GzipFile(
+                fileobj=os.fdopen(fd, "wb"), mode="wb", compresslevel=6
+            )
+        except OSError as e:
+            self._fail(e)
+
+    def _fail(self, error: Exception) -> None:
+        logger.warning(f"Could not write transcript cache entry {self._path}: {error}")
+        self.discard()
+
+    def write(self, data: bytes) -> None:
+        if self._file is None:
+            return
+        try:
+            self._file.write(data)
+        except OSError as e:
+            self._fail(e)
+
+    def commit(self) -> None:
+        if self._file is None:
+            return
+        try:
+            fileobj = self._file.fileobj
+            self._file.close()
+            fileobj.close()
+            self._file = None
+            os.replace(self._tmp_path, self._path)
+            self._tmp_path = None
+        except OSError as e:
+            self._fail(e)
+            return
+
+        self._cache._evict()
+
+    def discard(self) -> None:
+        if self._file is not None:
+            try:
+                fileobj = self._file.fileobj
+                self._file.close()
+                fileobj.close()
+            except OSError:
+                pass
+            self._file = None
+        if self._tmp_path:
+            Path(self._tmp_path).unlink(missing_ok=True)
+            self._tmp_path = None
@@ -1,17 +1,82 @@
+import json
 import logging
-from typing import Optional
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import astuple, dataclass
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Tuple
 import requests
-import yt_dlp
-from youtube_transcript_api import (
-    YouTubeTranscriptApi,
-    TranscriptsDisabled,
-    NoTranscriptFound,
+from src.core import SingleFlight, get_session, record_size, timed_stage
+from .json3_stream import event_text, iter_event_segments, iter_json3_events
+from .subtitle_index import SubtitleIndex, TimeRange, merge_time_ranges
+from .transcript_cache import TranscriptCache
+
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# live_status values of a video whose captions are still growing
+LIVE_STATUSES = frozenset({"is_live", "is_upcoming"})
+
+# Fields of the yt-dlp info dict kept in the metadata cache
+INFO_FIELDS = (
+    "id",
+    "title",
+    "duration",
+    "language",
+    "subtitles",
+    "automatic_captions",
+    "chapters",
+    "live_status",
 )
 
 
+@dataclass(frozen=True)
+class Chapter:
+    title: str
+    start_ms: int
+    end_ms: int
+
+
+def extract_video_id(video_url: str) -> str:
+    try:
+        if "watch?v=" in video_url:
+            return video_url.split("watch?v=")[-1].split("&")[0]
+        elif "youtu.be/" in video_url:
+            return video_url.split("youtu.be/")[-1].split("?")[0]
+        else:
+            raise ValueError("Invalid YouTube URL format")
+    except Exception as e:
+        raise ValueError(f"Failed to extract video ID: {e}")
+
+
 class YouTubeSubtitleExtractor:
-    def __init__(self, log_level: int = logging.INFO):
+    def __init__(
+        self,
+        log_level: int = logging.INFO,
+        cache: Optional[TranscriptCache] = None,
+        prefer_transcript_api: bool = True,
+        info_cache_size: int = 64,
+        info_cache_ttl: float = 1800,
+        session: Optional[requests.Session] = None,
+        info_provider: Optional[Callable[[str], dict]] = None,
+    ):
         self.logger = self._setup_logger(log_level)
+        self.cache = cache
+        # Pooled keep-alive session with retries, shared by every extractor
+        self.session = session or get_session("youtube")
+        # Try youtube-transcript-api first; yt-dlp is only needed when it fails
+        self.prefer_transcript_api = prefer_transcript_api
+        # Returns the yt-dlp info dict for a URL; replaceable for offline runs
+        self.info_provider = info_provider or self._ytdlp_info
+        # yt-dlp metadata per video ID; subtitle URLs expire, so entries do too
+        self.info_cache_size = info_cache_size
+        self.info_cache_ttl = info_cache_ttl
+        self._info_cache: "OrderedDict[str, Tuple[float, dict]]" = OrderedDict()
+        self._info_lock = threading.Lock()
+        # Parsed transcripts, so repeated range queries skip decoding the json3
+        self.index_cache_size = 16
+        self._index_cache: "OrderedDict[Tuple[str, str], SubtitleIndex]" = OrderedDict()
+        self._index_lock = threading.Lock()
+        self._flight = SingleFlight()
         self.ydl_opts = {
             "subtitlesformat": "json3",
             "skip_download": True,
@@ -35,74 +100,252 @@ class YouTubeSubtitleExtractor:
         return logger
 
     def _extract_video_id(self, video_url: str) -> str:
-        try:
-            if "watch?v=" in video_url:
-                return video_url.split("watch?v=")[-1].split("&")[0]
-            elif "youtu.be/" in video_url:
-                return video_url.split("youtu.be/")[-1].split("?")[0]
-            else:
-                raise ValueError("Invalid YouTube URL format")
-        except Exception as e:
-            raise ValueError(f"Failed to extract video ID: {e}")
+        return extract_video_id(video_url)
 
-    def _detect_language(self, video_url: str) -> Optional[str]:
-        try:
-            video_id = self._extract_video_id(video_url)
-            self.logger.info(f"Detecting language for video ID: {video_id}")
-            transcripts = YouTubeTranscriptApi().list(video_id=video_id)
+    def _extract_info(self, video_url: str, refresh: bool = False) -> dict:
+        """Run yt-dlp once per video and keep the fields we need for a while"""
+        video_id = self._extract_video_id(video_url)
+        now = time.monotonic()
 
-            for transcript in transcripts:
-                self.logger.info(
-                    f"Found transcript in language: {transcript.language_code}"
-                )
-                return transcript.language_code
+        with self._info_lock:
+            cached = self._info_cache.get(video_id)
+            if cached and not refresh and now - cached[0] < self.info_cache_ttl:
+                self._info_cache.move_to_end(video_id)
+                return cached[1]
 
-        except (TranscriptsDisabled, NoTranscriptFound) as e:
-            self.logger.warning(f"No transcripts available: {e}")
-        except Exception as e:
-            self.logger.error(f"Error detecting language: {e}")
+        with timed_stage("extract_info"):
+            raw_info = self.info_provider(video_url)
 
-        return None
+        # The full info dict holds every video format; keep only what we use
+        info = {key: raw_info.get(key) for key in INFO_FIELDS}
+
+        with self._info_lock:
+            self._info_cache[video_id] = (now, info)
+            self._info_cache.move_to_end(video_id)
+            while len(self._info_cache) > self.info_cache_size:
+                self._info_cache.popitem(last=False)
 
-    def _get_subtitle_url(self, video_url: str, lang: str) -> str:
-        ydl_opts = {**self.ydl_opts, "subtitleslangs": [lang]}
+        return info
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
+    def _ytdlp_info(self, video_url: str) -> dict:
+        # yt-dlp takes a noticeable time to import and is often not needed at all
+        import yt_dlp
+
+        with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
             try:
-                info = ydl.extract_info(video_url, download=False)
-                subtitles = info.get("subtitles", {}).get(lang)
-                auto_captions = info.get("automatic_captions", {}).get(lang)
+                return ydl.extract_info(video_url, download=False)
+            except Exception as e:
+                raise ValueError(f"Failed to extract subtitle info: {e}")
 
-                subs = subtitles or auto_captions
+    def list_video_urls(self, collection_url: str, _depth: int = 0) -> List[str]:
+        """
+        Expand a playlist or channel URL into watch URLs with yt-dlp's flat
+        extraction, which lists the entries without resolving each video.
+        Channel URLs list tabs (videos, shorts, live) that are expanded in turn.
+        """
+        import yt_dlp
 
-                if not subs:
-                    raise ValueError(f"No subtitles found for language: {lang}")
+        opts = {"extract_flat": "in_playlist", "skip_download": True, "quiet": True}
+        with yt_dlp.YoutubeDL(opts) as ydl:
+            try:
+                info = ydl.extract_info(collection_url, download=False)
+            except Exception as e:
+                raise ValueError(f"Failed to list videos of {collection_url}: {e}")
 
-                # Note: yt-dlp may return multiple formats, I prefer json3 for cleaning
-                for sub in subs:
-                    if sub.get("ext") == "json3":
-                        return sub["url"]
+        urls: List[str] = []
+        for entry in info.get("entries") or []:
+            if not entry:
+                continue
+            if entry.get("ie_key") == "YoutubeTab" or entry.get("_type") == "playlist":
+                if _depth < 1:
+                    urls.extend(self.list_video_urls(entry.get("url") or entry["webpage_url"], _depth + 1))
+                continue
+            if entry.get("id"):
+                urls.append(f"https://www.youtube.com/watch?v={entry['id']}")
+        self.logger.info(f"Found {len(urls)} videos in {collection_url}")
+        return urls
 
-                raise ValueError(
-                    f"No JSON3 format subtitles found for language: {lang}"
-                )
+    def get_chapters(self, video_url: str) -> List[Chapter]:
+        """The creator's chapters from the video metadata; empty if it has none"""
+        video_id = self._extract_video_id(video_url)
+        if self.cache:
+            # Stored next to the transcript, so a cached transcript needs no yt-dlp call
+            cached = self.cache.get_chapters(video_id)
+            if cached is not None:
+                return [Chapter(*chapter) for chapter in cached]
 
-            except Exception as e:
-                raise ValueError(f"Failed to extract subtitle info: {e}")
+        info = self._extract_info(video_url)
+        chapters = []
+        for chapter in info.get("chapters") or []:
+            start_ms = int(chapter["start_time"] * 1000)
+            end_ms = int(chapter["end_time"] * 1000)
+            if end_ms > start_ms:
+                chapters.append(Chapter(chapter.get("title") or "", start_ms, end_ms))
+        if self.cache and info.get("live_status") not in LIVE_STATUSES:
+            self.cache.put_chapters(video_id, [list(astuple(chapter)) for chapter in chapters])
+        return chapters
+
+    def get_chapter_segments(
+        self,
+        video_url: str,
+        lang: Optional[str] = None,
+        time_ranges: Optional[Sequence[TimeRange]] = None,
+    ) -> List[Tuple[Chapter, List[str]]]:
+        """
+        Text of each json3 event grouped by chapter, in order.
+
+        With time ranges, chapters are clipped to the ranges and chapters
+        outside them are left out. Empty if the video has no chapters.
+        """
+        chapters = self.get_chapters(video_url)
+        if not chapters:
+            return []
+
+        index = self._get_subtitle_index(video_url, lang)
+        ranges = merge_time_ranges(time_ranges) if time_ranges else None
+        grouped = []
+        for chapter in chapters:
+            if ranges is None:
+                windows = [(chapter.start_ms, chapter.end_ms)]
+            else:
+                windows = [
+                    (max(start, chapter.start_ms), min(end, chapter.end_ms))
+                    for start, end in ranges
+                    if start < chapter.end_ms and end > chapter.start_ms
+                ]
+            if not windows:
+                continue
+            # A caption straddling a chapter boundary belongs to the chapter it starts in
+            segments = index.segments_starting_in(chapter.start_ms, chapter.end_ms, windows)
+            clipped = Chapter(chapter.title, windows[0][0], windows[-1][1])
+            grouped.append((clipped, segments))
+        return grouped
 
-    def _split_subtitles_by_time_range(self, events, start_time: int, end_time: int):
-        if start_time > end_time:
-            raise ValueError("start_time must be less than end_time")
+    def _pick_language(self, info: dict) -> Optional[str]:
+        subtitles = {
+            code: subs
+            for code, subs in (info.get("subtitles") or {}).items()
+            if code != "live_chat"
+        }
+        auto_captions = info.get("automatic_captions") or {}
+
+        # Prefer the video's own language, then creator-uploaded subtitles,
+        # then the untranslated auto captions
+        original = info.get("language")
+        if original and (original in subtitles or original in auto_captions):
+            return original
+        if subtitles:
+            return next(iter(subtitles))
+        for code in auto_captions:
+            if code.endswith("-orig"):
+                return code
+        return next(iter(auto_captions), None)
+
+    def _get_subtitle_url(self, video_url: str, lang: Optional[str] = None) -> Tuple[str, str]:
+        """Resolve the language (when not given) and its json3 URL from a single extract_info"""
+        info = self._extract_info(video_url)
+
+        if lang is None:
+            lang = self._pick_language(info)
+            if not lang:
+                raise ValueError("No subtitle language could be detected")
+            self.logger.info(f"Found subtitles in language: {lang}")
+
+        subtitles = (info.get("subtitles") or {}).get(lang)
+        auto_captions = (info.get("automatic_captions") or {}).get(lang)
+
+        subs = subtitles or auto_captions
+
+        if not subs:
+            raise ValueError(f"No subtitles found for language: {lang}")
+
+        # Note: yt-dlp may return multiple formats, I prefer json3 for cleaning
+        for sub in subs:
+            if sub.get("ext") == "json3":
+                return lang, sub["url"]
+
+        raise ValueError(f"No JSON3 format subtitles found for language: {lang}")
+
+    def _fetch_from_transcript_api(
+        self, video_id: str, lang: Optional[str] = None
+    ) -> Optional[bytes]:
+        """
+        Fetch the transcript through youtube-transcript-api alone, skipping yt-dlp.
+
+        The snippets are converted to a minimal json3 document so the rest of the
+        pipeline (cache, time ranges, chunking) does not care which path was used.
+
+        Returns:
+            bytes: json3 document, or None if the transcript API cannot serve it
+        """
+        from youtube_transcript_api import (
+            YouTubeTranscriptApi,
+            TranscriptsDisabled,
+            NoTranscriptFound,
+        )
 
-        text_segments = []
-        for event in events:
-            tStartMs = event.get("tStartMs", 0)
-            if start_time <= tStartMs <= end_time:
-                for segment in event.get("segs", []):
-                    if "utf8" in segment:
-                        text_segments.append(segment["utf8"])
-        
-        return " ".join(text_segments).strip()
+        try:
+            transcripts = YouTubeTranscriptApi(http_client=self.session).list(
+                video_id=video_id
+            )
+            if lang:
+                transcript = transcripts.find_transcript([lang])
+            else:
+                transcript = next(iter(transcripts), None)
+                if transcript is None:
+                    return None
+
+            self.logger.info(
+                f"Fetching transcript in language: {transcript.language_code}"
+            )
+            fetched = transcript.fetch()
+        except (TranscriptsDisabled, NoTranscriptFound) as e:
+            self.logger.warning(f"No transcripts available: {e}")
+            return None
+        except Exception as e:
+            self.logger.warning(f"Transcript API failed, falling back to yt-dlp: {e}")
+            return None
+
+        events = [
+            {
+                "tStartMs": int(snippet.start * 1000),
+                "dDurationMs": int(snippet.duration * 1000),
+                "segs": [{"utf8": snippet.text}],
+            }
+            for snippet in fetched.snippets
+        ]
+        return json.dumps({"events": events}, ensure_ascii=False).encode("utf-8")
+
+    def _stream_subtitles(self, subtitle_url: str) -> Iterator[bytes]:
+        try:
+            with self.session.get(subtitle_url, stream=True) as response:
+                response.raise_for_status()
+                yield from response.iter_content(chunk_size=STREAM_CHUNK_SIZE)
+        except requests.RequestException as e:
+            self.logger.error(f"Failed to fetch subtitles: {e}")
+            raise
+
+    def _build_index(self, chunks: Iterable[bytes]) -> SubtitleIndex:
+        try:
+            return SubtitleIndex.from_events(iter_json3_events(chunks))
+        except requests.RequestException:
+            raise
+        except Exception as e:
+            self.logger.error(f"Error processing subtitle data: {e}")
+            raise ValueError(f"Failed to process subtitle data: {e}")
+
+    def _resolve_time_ranges(
+        self,
+        enable_time_range: bool = False,
+        start_time: int = 0,
+        end_time: int = 0,
+        time_ranges: Optional[Sequence[TimeRange]] = None,
+    ) -> Optional[List[TimeRange]]:
+        if time_ranges:
+            return merge_time_ranges(time_ranges)
+        if enable_time_range:
+            return merge_time_ranges([(start_time, end_time)])
+        return None
 
     def _fetch_and_clean_subtitles(
         self,
@@ -111,64 +354,196 @@ class YouTubeSubtitleExtractor:
         start_time: int = 0,
         end_time: int = 0,
     ) -> str:
+        index = self._build_index(self._stream_subtitles(subtitle_url))
+        return index.slice_text(
+            self._resolve_time_ranges(enable_time_range, start_time, end_time)
+        ).strip()
+
+    def _iter_subtitle_chunks(
+        self, video_url: str, lang: Optional[str] = None
+    ) -> Iterator[bytes]:
+        """
+        Yield the raw json3 document of a video in chunks, from the transcript
+        cache when possible. Downloads are streamed into the cache as they are
+        read, so neither path holds the whole document in memory.
+        """
+        # Auto-detected transcripts are cached under a placeholder language so a
+        # repeat request can be served without the language lookup round-trip
+        cache_lang = lang or TranscriptCache.AUTO_LANG
+        video_id = self._extract_video_id(video_url)
+
+        if self.cache:
+            cached = self.cache.open(video_id, cache_lang)
+            if cached is not None:
+                self.logger.info("Using cached subtitles")
+                try:
+                    with cached:
+                        yield from iter(lambda: cached.read(STREAM_CHUNK_SIZE), b"")
+                except (OSError, EOFError) as e:
+                    self.cache.discard(video_id, cache_lang, reason=str(e))
+                    raise ValueError(f"Failed to read cached subtitles: {e}")
+                return
+
+        if self.prefer_transcript_api:
+            with timed_stage("transcript_api"):
+                subtitle_data = self._fetch_from_transcript_api(video_id, lang)
+            if subtitle_data is not None:
+                if self.cache:
+                    self.cache.put(video_id, cache_lang, subtitle_data)
+                yield subtitle_data
+                return
+
+        # Auto-detect language if not provided which means you can use any language that has subtitles
+        lang, subtitle_url = self._get_subtitle_url(video_url, lang)
+        self.logger.info(f"Using language code: {lang}")
+        self.logger.info("Subtitle URL obtained successfully")
+
+        # The captions of a stream that is still running keep growing
+        live = self._extract_info(video_url).get("live_status") in LIVE_STATUSES
+        writer = self.cache.writer(video_id, cache_lang) if self.cache and not live else None
         try:
-            response = requests.get(subtitle_url, timeout=30)
-            response.raise_for_status()
+            for chunk in self._stream_subtitles(subtitle_url):
+                if writer:
+                    writer.write(chunk)
+                yield chunk
+        except BaseException:
+            # Includes GeneratorExit: a partially read document is never cached
+            if writer:
+                writer.discard()
+            raise
+        if writer:
+            writer.commit()
 
-            subtitle_data = response.json()
-            events = subtitle_data.get("events", [])
+    def _load_subtitle_index(
+        self, video_url: str, lang: Optional[str] = None
+    ) -> SubtitleIndex:
+        received = 0
 
-            if enable_time_range:
-                return self._split_subtitles_by_time_range(events, start_time, end_time)
+        def counted(chunks: Iterator[bytes]) -> Iterator[bytes]:
+            nonlocal received
+            for chunk in chunks:
+                received += len(chunk)
+                yield chunk
 
-            # Default: extract all text segments
-            text_segments = []
-            for event in events:
-                for segment in event.get("segs", []):
-                    if "utf8" in segment:
-                        text_segments.append(segment["utf8"])
+        # Download and parsing are interleaved, so they are timed together
+        with timed_stage("transcript_load"):
+            index = self._build_index(counted(self._iter_subtitle_chunks(video_url, lang)))
+        record_size("transcript_bytes", received)
+        return index
 
-            return " ".join(text_segments).strip()
+    def _get_subtitle_index(
+        self, video_url: str, lang: Optional[str] = None
+    ) -> SubtitleIndex:
+        key = (self._extract_video_id(video_url), lang or TranscriptCache.AUTO_LANG)
+        with self._index_lock:
+            index = self._index_cache.get(key)
+            if index is not None:
+                self._index_cache.move_to_end(key)
+                return index
 
-        except requests.RequestException as e:
-            self.logger.error(f"Failed to fetch subtitles: {e}")
+        # Concurrent requests for the same transcript share one download and parse
+        index = self._flight.do(key, self._load_subtitle_index, video_url, lang)
+
+        with self._index_lock:
+            self._index_cache[key] = index
+            while len(self._index_cache) > self.index_cache_size:
+                self._index_cache.popitem(last=False)
+        return index
+
+    def get_new_events(
+        self, video_url: str, after_ms: int = -1, lang: Optional[str] = None
+    ) -> Tuple[List[Tuple[int, str]], Optional[str]]:
+        """
+        Re-read the json3 captions of a live or still growing video and return
+        the events that start after after_ms.
+
+        The metadata is refreshed and the transcript and index caches are
+        bypassed, since both would pin the captions as they were first seen.
+
+        Args:
+            video_url: YouTube video URL
+            after_ms: tStartMs of the last event already processed
+            lang: Caption language; detected when None
+
+        Returns:
+            Tuple[List[Tuple[int, str]], Optional[str]]: (tStartMs, text) of the new
+            events in playback order, and the video's current live_status
+        """
+        info = self._extract_info(video_url, refresh=True)
+        status = info.get("live_status")
+        try:
+            _, subtitle_url = self._get_subtitle_url(video_url, lang)
+        except ValueError:
+            # A stream that hasn't started, or has no captions yet
+            if status in LIVE_STATUSES:
+                return [], status
             raise
-        except Exception as e:
-            self.logger.error(f"Error processing subtitle data: {e}")
-            raise ValueError(f"Failed to process subtitle data: {e}")
 
-    def get_clean_subtitles(
+        events = []
+        with timed_stage("transcript_poll"):
+            for event in iter_json3_events(self._stream_subtitles(subtitle_url)):
+                start = event.get("tStartMs", 0)
+                text = event_text(event).strip()
+                if start > after_ms and text:
+                    events.append((start, text))
+        events.sort(key=lambda event: event[0])
+        return events, status
+
+    def iter_subtitle_segments(
+        self,
+        video_url: str,
+        lang: Optional[str] = None,
+        time_ranges: Optional[Sequence[TimeRange]] = None,
+    ) -> Iterator[str]:
+        """
+        Stream the text of each json3 event in the requested ranges.
+
+        Unlike get_subtitle_segments() this never materializes the transcript:
+        events are parsed and filtered one at a time as the document is read.
+        """
+        self.logger.info(f"Streaming subtitles for video: {video_url}")
+        events = iter_json3_events(self._iter_subtitle_chunks(video_url, lang))
+        ranges = merge_time_ranges(time_ranges) if time_ranges else None
+        yield from iter_event_segments(events, ranges)
+
+    def get_subtitle_segments(
         self,
         video_url: str,
         lang: Optional[str] = None,
         enable_time_range: bool = False,
         start_time: int = 0,
         end_time: int = 0,
-    ) -> str:
+        time_ranges: Optional[Sequence[TimeRange]] = None,
+    ) -> List[str]:
+        """Text of each json3 event in the requested ranges (the whole video if none)"""
         self.logger.info(f"Processing video: {video_url}")
 
-        # Auto-detect language if not provided which means you can use any language that has subtitles
-        if lang is None:
-            self.logger.info("Auto-detecting subtitle language...")
-            lang = self._detect_language(video_url)
-
-            if not lang:
-                raise ValueError("No subtitle language could be detected")
+        index = self._get_subtitle_index(video_url, lang)
+        ranges = self._resolve_time_ranges(
+            enable_time_range, start_time, end_time, time_ranges
+        )
+        if ranges:
+            self.logger.info(f"Extracting subtitles for time ranges (ms): {ranges}")
+        return index.segments(ranges)
 
-        self.logger.info(f"Using language code: {lang}")
+    def get_clean_subtitles(
+        self,
+        video_url: str,
+        lang: Optional[str] = None,
+        enable_time_range: bool = False,
+        start_time: int = 0,
+        end_time: int = 0,
+        time_ranges: Optional[Sequence[TimeRange]] = None,
+    ) -> str:
+        self.logger.info(f"Processing video: {video_url}")
 
-        subtitle_url = self._get_subtitle_url(video_url, lang)
-        self.logger.info("Subtitle URL obtained successfully")
-        self.logger.info("Fetching and cleaning subtitles...")
-        if enable_time_range:
-            self.logger.info(
-                f"Extracting subtitles from {start_time}ms to {end_time}ms"
-            )
-            cleaned_text = self._fetch_and_clean_subtitles(
-                subtitle_url, enable_time_range, start_time, end_time
-            )
-        else:
-            cleaned_text = self._fetch_and_clean_subtitles(subtitle_url)
+        index = self._get_subtitle_index(video_url, lang)
+        ranges = self._resolve_time_ranges(
+            enable_time_range, start_time, end_time, time_ranges
+        )
+        if ranges:
+            self.logger.info(f"Extracting subtitles for time ranges (ms): {ranges}")
+        cleaned_text = index.slice_text(ranges).strip()
 
         self.logger.info(
             f"Successfully extracted {len(cleaned_text)} characters of subtitle text"
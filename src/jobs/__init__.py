@@ -0,0 +1,15 @@
+from .store import Job, JobStore
+from .worker import JobWorkerConfig, JobWorkerPool, run_summary_stages
+from .batch import BatchConfig, BatchReport, BatchRunner, expand_batch_source
+
+__all__ = [
+    "BatchConfig",
+    "BatchReport",
+    "BatchRunner",
+    "Job",
+    "JobStore",
+    "JobWorkerConfig",
+    "JobWorkerPool",
+    "expand_batch_source",
+    "run_summary_stages",
+]
@@ -0,0 +1,227 @@
+import itertools
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from src.extractors import extract_video_id
+from .store import FAILED, SAVE_TARGETS, SUCCEEDED
+from .worker import run_summary_stages
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchConfig:
+    # Maximum number of videos inside each stage at once
+    extraction_concurrency: int = 4
+    llm_concurrency: int = 2
+    notion_concurrency: int = 1
+    save_targets: List[str] = field(default_factory=list)
+    # Applied to every video; None summarizes whole videos
+    time_ranges: Optional[List[Tuple[int, int]]] = None
+
+    def __post_init__(self):
+        unknown = set(self.save_targets) - SAVE_TARGETS
+        if unknown:
+            raise ValueError(f"Unknown save targets: {', '.join(sorted(unknown))}")
+
+
+@dataclass
+class BatchReport:
+    total: int = 0
+    skipped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+
+
+def expand_batch_source(source: str, extractor) -> Tuple[List[str], List[Tuple[str, str]]]:
+    """
+    Turn a batch source into video URLs, in order and without duplicates.
+
+    Args:
+        source: A file with one URL per line (blank lines and # comments are
+            ignored), or a video, playlist or channel URL
+        extractor: YouTubeSubtitleExtractor used to list playlists and channels
+
+    Returns:
+        Tuple[List[str], List[Tuple[str, str]]]: Video URLs, and the lines of
+        the file that are neither a video nor a listable playlist or channel,
+        with the reason
+
+    Raises:
+        ValueError: If the source is not a file and can't be expanded
+    """
+    if os.path.isfile(source):
+        with open(source, "r", encoding="utf-8") as f:
+            entries = [line.strip() for line in f]
+        entries = [entry for entry in entries if entry and not entry.startswith("#")]
+    else:
+        entries = [source]
+
+    urls: List[str] = []
+    invalid: List[Tuple[str, str]] = []
+    seen: Set[str] = set()
+    for entry in entries:
+        try:
+            extract_video_id(entry)
+            expanded = [entry]
+        except ValueError:
+            try:
+                expanded = extractor.list_video_urls(entry)
+            except ValueError as e:
+                if entry == source:
+                    raise
+                # One bad line doesn't stop the rest of the file
+                invalid.append((entry, str(e)))
+                continue
+        for url in expanded:
+            video_id = extract_video_id(url)
+            if video_id not in seen:
+                seen.add(video_id)
+                urls.append(url)
+    return urls, invalid
+
+
+def _checkpoint_key(video_id: str, time_ranges: Optional[List[Tuple[int, int]]]) -> str:
+    return json.dumps([video_id, [list(r) for r in time_ranges or []]])
+
+
+class BatchRunner:
+    """
+    Summarize many videos in one process and append one JSON line per video
+    to the output file as each finishes.
+
+    The output doubles as the checkpoint: videos that already have a
+    succeeded line for the same time ranges are skipped, so rerunning an
+    interrupted batch with the same output resumes it. Failed videos are
+    retried on the next run. Each stage has its own concurrency limit, so
+    transcripts for the next videos are fetched while others wait for the LLM.
+    """
+
+    def __init__(self, agent, output_path: str, config: Optional[BatchConfig] = None):
+        self.agent = agent
+        self.output_path = output_path
+        self.config = config or BatchConfig()
+        self._stages = {
+            "extraction": threading.BoundedSemaphore(self.config.extraction_concurrency),
+            "llm": threading.BoundedSemaphore(self.config.llm_concurrency),
+            "notion": threading.BoundedSemaphore(self.config.notion_concurrency),
+        }
+
+    def completed(self) -> Set[str]:
+        """Checkpoint keys of the videos already summarized into the output"""
+        done: Set[str] = set()
+        if not os.path.exists(self.output_path):
+            return done
+        with open(self.output_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A line cut short by a crash; the video is simply redone
+                    continue
+                if record.get("status") == SUCCEEDED:
+                    done.add(_checkpoint_key(record["video_id"], record.get("time_ranges")))
+        return done
+
+    def _summarize(self, url: str) -> Dict[str, Any]:
+        started = time.perf_counter()
+        record: Dict[str, Any] = {
+            "url": url,
+            "video_id": extract_video_id(url),
+            "time_ranges": [list(r) for r in self.config.time_ranges or []],
+        }
+        try:
+            result = run_summary_stages(
+                self.agent,
+                url,
+                self.config.time_ranges,
+                self.config.save_targets,
+                lambda stage: self._stages[stage],
+            )
+            record.update(status=SUCCEEDED, **result)
+        except Exception as e:
+            logger.error(f"Failed to summarize {url}: {str(e)}")
+            record.update(status=FAILED, error=str(e))
+        record["elapsed_seconds"] = round(time.perf_counter() - started, 3)
+        record["finished_at"] = datetime.now().isoformat()
+        return record
+
+    def _invalid_record(self, entry: str, error: str) -> Dict[str, Any]:
+        return {
+            "url": entry,
+            "video_id": None,
+            "time_ranges": [list(r) for r in self.config.time_ranges or []],
+            "status": FAILED,
+            "error": error,
+            "elapsed_seconds": 0.0,
+            "finished_at": datetime.now().isoformat(),
+        }
+
+    def run(
+        self,
+        urls: Iterable[str],
+        on_record: Optional[Callable[[Dict[str, Any]], None]] = None,
+        invalid: Sequence[Tuple[str, str]] = (),
+    ) -> BatchReport:
+        """
+        Summarize the videos not completed yet and append their results.
+
+        Args:
+            urls: Video URLs
+            on_record: Called with each result record, e.g. to print progress
+            invalid: (entry, reason) of source entries that are not videos,
+                recorded as failed without being run
+
+        Returns:
+            BatchReport: Counts of skipped, succeeded and failed videos
+        """
+        urls = list(urls)
+        done = self.completed()
+        pending = [
+            url
+            for url in urls
+            if _checkpoint_key(extract_video_id(url), self.config.time_ranges) not in done
+        ]
+        report = BatchReport(
+            total=len(urls) + len(invalid), skipped=len(urls) - len(pending)
+        )
+        if report.skipped:
+            logger.info(f"Resuming batch: {report.skipped} of {len(urls)} videos already done")
+
+        Path(self.output_path).parent.mkdir(parents=True, exist_ok=True)
+        # Enough threads to keep every stage busy at the same time
+        workers = self.config.extraction_concurrency + self.config.llm_concurrency
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="batch")
+        futures = [executor.submit(self._summarize, url) for url in pending]
+        try:
+            with open(self.output_path, "a", encoding="utf-8") as output:
+                records = itertools.chain(
+                    (self._invalid_record(entry, error) for entry, error in invalid),
+                    (future.result() for future in as_completed(futures)),
+                )
+                for record in records:
+                    output.write(json.dumps(record, ensure_ascii=False) + "\n")
+                    output.flush()
+                    os.fsync(output.fileno())
+                    if record["status"] == SUCCEEDED:
+                        report.succeeded += 1
+                    else:
+                        report.failed += 1
+                    if on_record:
+                        on_record(record)
+        except KeyboardInterrupt:
+            # Videos already written are kept; the rest are picked up on resume
+            for future in futures:
+                future.cancel()
+            raise
+        finally:
+            executor.shutdown(wait=False)
+        return report
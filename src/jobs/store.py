@@ -0,0 +1,267 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JOB_DB_PATH = ".cache/jobs.sqlite3"
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+SAVE_TARGETS = frozenset({"local", "notion"})
+
+# A one-off summary, or a running summary of a live stream kept up to date until it ends
+SUMMARY = "summary"
+WATCH = "watch"
+JOB_KINDS = frozenset({SUMMARY, WATCH})
+
+
+@dataclass
+class Job:
+    id: str
+    url: str
+    time_ranges: List[List[int]] = field(default_factory=list)
+    save_targets: List[str] = field(default_factory=list)
+    priority: int = 0
+    status: str = QUEUED
+    stage: Optional[str] = None
+    attempts: int = 0
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    created_at: float = 0.0
+    updated_at: float = 0.0
+    kind: str = SUMMARY
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobStore:
+    """
+    Durable job table in SQLite.
+
+    Jobs are claimed highest priority first, then oldest first. Running jobs
+    are kept alive with touch(); one whose process died stops being touched
+    and is put back in the queue by requeue_running().
+    """
+
+    _COLUMNS = (
+        "id, url, time_ranges, save_targets, priority, status, stage, "
+        "attempts, result, error, created_at, updated_at, kind"
+    )
+
+    def __init__(self, path: str = DEFAULT_JOB_DB_PATH):
+        self.path = path
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, url TEXT NOT NULL, time_ranges TEXT NOT NULL, "
+                "save_targets TEXT NOT NULL, priority INTEGER NOT NULL, "
+                "status TEXT NOT NULL, stage TEXT, attempts INTEGER NOT NULL, "
+                "result TEXT, error TEXT, created_at REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_queue "
+                "ON jobs (status, priority DESC, created_at)"
+            )
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "kind" not in columns:
+                # Tables created before watch jobs existed only hold summary jobs
+                self._conn.execute(
+                    f"ALTER TABLE jobs ADD COLUMN kind TEXT NOT NULL DEFAULT '{SUMMARY}'"
+                )
+
+    @classmethod
+    def from_env(cls) -> "JobStore":
+        """Create a job store at JOB_DB_PATH (default .cache/jobs.sqlite3)"""
+        return cls(os.getenv("JOB_DB_PATH", DEFAULT_JOB_DB_PATH))
+
+    def _row_to_job(self, row) -> Job:
+        (job_id, url, time_ranges, save_targets, priority, status, stage,
+         attempts, result, error, created_at, updated_at, kind) = row
+        return Job(
+            id=job_id,
+            url=url,
+            time_ranges=json.loads(time_ranges),
+            save_targets=json.loads(save_targets),
+            priority=priority,
+            status=status,
+            stage=stage,
+            attempts=attempts,
+            result=json.loads(result) if result else None,
+            error=error,
+            created_at=created_at,
+            updated_at=updated_at,
+            kind=kind,
+        )
+
+    def create(
+        self,
+        url: str,
+        time_ranges: Optional[List[List[int]]] = None,
+        save_targets: Optional[List[str]] = None,
+        priority: int = 0,
+        kind: str = SUMMARY,
+    ) -> Job:
+        """
+        Add a job to the queue.
+
+        Args:
+            url: YouTube video URL
+            time_ranges: (start_ms, end_ms) windows to summarize, empty for the whole video
+            save_targets: Where to save the summary besides the job result ("local", "notion")
+            priority: Higher values are picked up first
+            kind: "summary", or "watch" to follow a live stream until it ends
+
+        Returns:
+            Job: The queued job
+        """
+        unknown = set(save_targets or []) - SAVE_TARGETS
+        if unknown:
+            raise ValueError(f"Unknown save targets: {', '.join(sorted(unknown))}")
+        if kind not in JOB_KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if kind == WATCH and time_ranges:
+            raise ValueError("Watch jobs follow the whole stream and take no time ranges")
+
+        now = time.time()
+        job = Job(
+            id=uuid.uuid4().hex,
+            url=url,
+            time_ranges=[list(r) for r in time_ranges or []],
+            save_targets=list(save_targets or []),
+            priority=priority,
+            created_at=now,
+            updated_at=now,
+            kind=kind,
+        )
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"INSERT INTO jobs ({self._COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    job.id, job.url, json.dumps(job.time_ranges), json.dumps(job.save_targets),
+                    job.priority, job.status, job.stage, job.attempts, None, None,
+                    job.created_at, job.updated_at, job.kind,
+                ),
+            )
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        with self._lock:
+            row = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+        return self._row_to_job(row) if row else None
+
+    def claim_next(self, exclude_kinds: Sequence[str] = ()) -> Optional[Job]:
+        """Atomically move the next queued job, of any kind but exclude_kinds, to running"""
+        kinds = ", ".join("?" * len(exclude_kinds))
+        kind_filter = f"AND kind NOT IN ({kinds}) " if exclude_kinds else ""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                f"SELECT {self._COLUMNS} FROM jobs WHERE status = ? {kind_filter}"
+                "ORDER BY priority DESC, created_at LIMIT 1",
+                (QUEUED, *exclude_kinds),
+            ).fetchone()
+            if row is None:
+                return None
+            job = self._row_to_job(row)
+            job.status = RUNNING
+            job.attempts += 1
+            job.updated_at = time.time()
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, attempts = ?, updated_at = ? WHERE id = ?",
+                (job.status, job.attempts, job.updated_at, job.id),
+            )
+        return job
+
+    def set_stage(self, job_id: str, stage: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET stage = ?, updated_at = ? WHERE id = ?",
+                (stage, time.time(), job_id),
+            )
+
+    def touch(self, job_ids: Sequence[str]) -> None:
+        """Mark running jobs as still alive, so requeue_running() leaves them alone"""
+        if not job_ids:
+            return
+        ids = ", ".join("?" * len(job_ids))
+        with self._lock, self._conn:
+            self._conn.execute(
+                f"UPDATE jobs SET updated_at = ? WHERE status = ? AND id IN ({ids})",
+                (time.time(), RUNNING, *job_ids),
+            )
+
+    def set_progress(self, job_id: str, result: Dict[str, Any]) -> None:
+        """Store the partial result of a job that is still running"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET result = ?, updated_at = ? WHERE id = ?",
+                (json.dumps(result, ensure_ascii=False), time.time(), job_id),
+            )
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = NULL, result = ?, error = NULL, "
+                "updated_at = ? WHERE id = ?",
+                (SUCCEEDED, json.dumps(result, ensure_ascii=False), time.time(), job_id),
+            )
+
+    def fail(self, job_id: str, error: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? WHERE id = ?",
+                (FAILED, error, time.time(), job_id),
+            )
+
+    def requeue_running(self, max_attempts: int, stale_after: float = 0.0) -> int:
+        """
+        Recover jobs left running by a process that is gone.
+
+        Only jobs not updated or touched for stale_after seconds are
+        recovered, so processes sharing the table don't take over each
+        other's live jobs. Jobs that have already been attempted max_attempts
+        times are failed instead, so a job that crashes the worker cannot
+        loop forever. Watch jobs are exempt: they run for as long as the
+        stream, so every deploy during it interrupts them, and they resume
+        from their stored progress.
+
+        Returns:
+            int: Number of jobs put back in the queue
+        """
+        now = time.time()
+        cutoff = now - stale_after
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated_at = ? "
+                "WHERE status = ? AND updated_at <= ? AND attempts >= ? AND kind != ?",
+                (FAILED, "Interrupted too many times", now, RUNNING, cutoff, max_attempts, WATCH),
+            )
+            requeued = self._conn.execute(
+                "UPDATE jobs SET status = ?, stage = NULL, updated_at = ? "
+                "WHERE status = ? AND updated_at <= ?",
+                (QUEUED, now, RUNNING, cutoff),
+            ).rowcount
+        if requeued:
+            logger.info(f"Resuming {requeued} interrupted jobs")
+        return requeued
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
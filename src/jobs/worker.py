@@ -0,0 +1,294 @@
+import logging
+import os
+import threading
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, ContextManager, Dict, List, Optional, Sequence, Set, Tuple
+
+from src.agents.live import LiveSummarizer, WatchConfig, WatchState
+from src.utils import get_notion_saver, save_summary_to_file
+from .store import SUMMARY, WATCH, Job, JobStore
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class JobWorkerConfig:
+    workers: int = 4
+    # Maximum number of jobs inside each stage at once, across all workers
+    extraction_concurrency: int = 4
+    llm_concurrency: int = 2
+    notion_concurrency: int = 1
+    # Watch jobs run on their own threads, outside the workers; at most this many at once
+    watch_concurrency: int = 4
+    # How often idle workers check the table for jobs queued by other processes
+    poll_interval: float = 1.0
+    # Restarts a job survives before it is marked failed
+    max_attempts: int = 3
+    # Running jobs are touched this often; a job untouched for stale_after
+    # seconds belongs to a process that is gone and is queued again
+    heartbeat_interval: float = 10.0
+    stale_after: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> "JobWorkerConfig":
+        """Read JOB_WORKERS, JOB_{EXTRACTION,LLM,NOTION,WATCH}_CONCURRENCY and JOB_STALE_SECONDS"""
+        defaults = cls()
+        return cls(
+            workers=int(os.getenv("JOB_WORKERS", defaults.workers)),
+            extraction_concurrency=int(
+                os.getenv("JOB_EXTRACTION_CONCURRENCY", defaults.extraction_concurrency)
+            ),
+            llm_concurrency=int(os.getenv("JOB_LLM_CONCURRENCY", defaults.llm_concurrency)),
+            notion_concurrency=int(
+                os.getenv("JOB_NOTION_CONCURRENCY", defaults.notion_concurrency)
+            ),
+            watch_concurrency=int(
+                os.getenv("JOB_WATCH_CONCURRENCY", defaults.watch_concurrency)
+            ),
+            stale_after=float(os.getenv("JOB_STALE_SECONDS", defaults.stale_after)),
+        )
+
+
+class JobWorkerPool:
+    """
+    Threads that take jobs from a JobStore and run them through the summarizer.
+
+    Each job goes through extraction, LLM and save stages. A worker holds a
+    stage's semaphore only while it is in that stage, so slow LLM calls do not
+    stop other workers from fetching transcripts for the jobs behind them.
+
+    Watch jobs are handed to threads of their own, up to watch_concurrency at
+    once, so a stream that runs for hours does not hold a worker. Their summary
+    updates share the LLM semaphore, and the running summary is stored as the
+    job's result after every update. Stopping the pool leaves them running in
+    the table, so they resume from that summary on restart.
+
+    Several pools, e.g. one per server process, can share a table. Each
+    touches the jobs it runs every heartbeat_interval and only takes over
+    running jobs that went untouched for stale_after seconds.
+    """
+
+    def __init__(self, agent, store: JobStore, config: Optional[JobWorkerConfig] = None):
+        self.agent = agent
+        self.store = store
+        self.config = config or JobWorkerConfig()
+        self.watch_config = WatchConfig.from_env()
+        self._stages = {
+            "extraction": threading.BoundedSemaphore(self.config.extraction_concurrency),
+            "llm": threading.BoundedSemaphore(self.config.llm_concurrency),
+            "notion": threading.BoundedSemaphore(self.config.notion_concurrency),
+        }
+        # Taken before a watch job is claimed, so the cap holds across workers
+        self._watch_slots = threading.BoundedSemaphore(self.config.watch_concurrency)
+        self._wakeup = threading.Condition()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self._watch_threads: List[threading.Thread] = []
+        self._watch_threads_lock = threading.Lock()
+        # IDs of the jobs this pool is running, kept alive by the heartbeat
+        self._running: Set[str] = set()
+        self._running_lock = threading.Lock()
+
+    def start(self) -> None:
+        self._recover_stale()
+        self._stopping.clear()
+        for i in range(self.config.workers):
+            thread = threading.Thread(
+                target=self._worker_loop, name=f"job-worker-{i}", daemon=True
+            )
+            thread.start()
+            self._threads.append(thread)
+        heartbeat = threading.Thread(target=self._heartbeat_loop, name="job-heartbeat", daemon=True)
+        heartbeat.start()
+        self._threads.append(heartbeat)
+        logger.info(f"Started {self.config.workers} job workers")
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Stop taking new jobs and wait for running ones to finish"""
+        self._stopping.set()
+        with self._wakeup:
+            self._wakeup.notify_all()
+        with self._watch_threads_lock:
+            watch_threads, self._watch_threads = self._watch_threads, []
+        for thread in self._threads + watch_threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def submit(
+        self, url: str, time_ranges=None, save_targets=None, priority: int = 0, kind: str = SUMMARY
+    ) -> Job:
+        """Queue a job and wake an idle worker"""
+        job = self.store.create(url, time_ranges, save_targets, priority, kind)
+        with self._wakeup:
+            self._wakeup.notify()
+        return job
+
+    def _recover_stale(self) -> None:
+        if self.store.requeue_running(self.config.max_attempts, self.config.stale_after):
+            with self._wakeup:
+                self._wakeup.notify_all()
+
+    def _heartbeat_loop(self) -> None:
+        while not self._stopping.wait(self.config.heartbeat_interval):
+            with self._running_lock:
+                running = list(self._running)
+            try:
+                self.store.touch(running)
+                # Also picks up the jobs of a process that died while this one runs
+                self._recover_stale()
+            except Exception as e:
+                logger.error(f"Job heartbeat failed: {str(e)}")
+
+    def _worker_loop(self) -> None:
+        while not self._stopping.is_set():
+            watch_slot = self._watch_slots.acquire(blocking=False)
+            job = self.store.claim_next(exclude_kinds=() if watch_slot else (WATCH,))
+            if job is None or job.kind != WATCH:
+                if watch_slot:
+                    self._watch_slots.release()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(self.config.poll_interval)
+                continue
+            if job.kind == WATCH:
+                self._start_watch(job)
+                continue
+            self._process(job)
+
+    def _start_watch(self, job: Job) -> None:
+        thread = threading.Thread(
+            target=self._watch_loop, args=(job,), name=f"job-watch-{job.id[:8]}", daemon=True
+        )
+        with self._watch_threads_lock:
+            self._watch_threads = [t for t in self._watch_threads if t.is_alive()]
+            self._watch_threads.append(thread)
+        thread.start()
+
+    def _watch_loop(self, job: Job) -> None:
+        try:
+            self._process(job)
+        finally:
+            self._watch_slots.release()
+            # The slot may let a worker claim a watch job it had to pass over
+            with self._wakeup:
+                self._wakeup.notify()
+
+    def _process(self, job: Job) -> None:
+        with self._running_lock:
+            self._running.add(job.id)
+        try:
+            result = self._run_job(job)
+            if result is None:
+                logger.info(f"Job {job.id} interrupted, it resumes on the next start")
+                return
+            self.store.complete(job.id, result)
+            logger.info(f"Job {job.id} finished")
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {str(e)}")
+            self.store.fail(job.id, str(e))
+        finally:
+            with self._running_lock:
+                self._running.discard(job.id)
+
+    @contextmanager
+    def _stage(self, job: Job, stage: str):
+        # Reported once a slot is free, so a job waiting for one keeps its previous stage
+        with self._stages[stage]:
+            self.store.set_stage(job.id, stage)
+            yield
+
+    def _run_job(self, job: Job) -> Optional[Dict[str, Any]]:
+        if job.kind == WATCH:
+            return self._run_watch_job(job)
+        time_ranges = [tuple(r) for r in job.time_ranges] or None
+        return run_summary_stages(
+            self.agent,
+            job.url,
+            time_ranges,
+            job.save_targets,
+            lambda stage: self._stage(job, stage),
+        )
+
+    def _run_watch_job(self, job: Job) -> Optional[Dict[str, Any]]:
+        # A resumed job continues from the progress stored by its previous run
+        state = WatchState.from_dict(job.result) if job.result else None
+        watcher = LiveSummarizer(
+            self.agent, job.url, self.watch_config, state, llm_slot=self._stages["llm"]
+        )
+        self.store.set_stage(job.id, WATCH)
+        watcher.watch(
+            on_update=lambda state: self.store.set_progress(job.id, asdict(state)),
+            stop=self._stopping,
+        )
+        if not watcher.state.ended:
+            return None
+        if not watcher.state.summary:
+            raise ValueError("The stream ended without any captions to summarize")
+
+        result = asdict(watcher.state)
+        _save_summary(
+            result["summary"],
+            job.url,
+            job.save_targets,
+            lambda stage: self._stage(job, stage),
+            result,
+        )
+        return result
+
+
+def _save_summary(
+    summary: str,
+    url: str,
+    save_targets: Sequence[str],
+    stage: Callable[[str], ContextManager],
+    result: Dict[str, Any],
+) -> None:
+    """Save a summary to the save targets and record where in result"""
+    if "local" in save_targets:
+        result["file"] = save_summary_to_file(summary)
+    if "notion" in save_targets:
+        with stage("notion"):
+            page = get_notion_saver().save_summary(summary, url)
+        if page is None:
+            raise RuntimeError("Failed to save summary to Notion")
+        result["notion_page"] = page.get("url")
+
+
+def run_summary_stages(
+    agent,
+    url: str,
+    time_ranges: Optional[List[Tuple[int, int]]],
+    save_targets: Sequence[str],
+    stage: Callable[[str], ContextManager],
+) -> Dict[str, Any]:
+    """
+    Summarize one video through the extraction, LLM and Notion stages.
+
+    Args:
+        agent: The YouTubeSummarizerAgent to run
+        url: Video URL
+        time_ranges: Optional (start_ms, end_ms) windows
+        save_targets: Any of "local" and "notion"
+        stage: Returns the context manager to hold while in a stage, e.g. a semaphore
+
+    Returns:
+        Dict[str, Any]: summary, cache_hit, route and where the summary was saved
+    """
+    result: Dict[str, Any] = {}
+
+    summary = agent.cached_summary(url, time_ranges)
+    result["cache_hit"] = summary is not None
+    if summary is None:
+        with stage("extraction"):
+            # Warms the extractor's index and transcript caches, so the
+            # agent's own fetch in the LLM stage is a lookup
+            agent.extractor.get_subtitle_segments(url, time_ranges=time_ranges)
+        with stage("llm"):
+            state = agent.run(url, time_ranges=time_ranges)
+        summary = state["summarized_text"]
+        result["cache_hit"] = state.get("cache_hit", False)
+        result["route"] = state.get("route")
+    result["summary"] = summary
+    _save_summary(summary, url, save_targets, stage, result)
+    return result
@@ -4,19 +4,40 @@ import requests
 from pathlib import Path
 import re
 from dotenv import load_dotenv
+from src.core import HttpClientConfig, TokenBucket, get_session, timed_stage
 
 # Load environment variables from .env file
 load_dotenv()
 
+# Page creation and block appends are not idempotent: a read timeout or a
+# dropped connection may come after Notion did the work, so the session never
+# retries them. _request retries them on 429 only, which Notion returns
+# before doing any work
+NOTION_HTTP_CONFIG = HttpClientConfig(status_forcelist=(429,))
+
+# Notion API limits: children per request, characters per rich_text item and
+# rich_text items per block
+MAX_BLOCKS_PER_REQUEST = 100
+MAX_RICH_TEXT_CHARS = 2000
+MAX_RICH_TEXT_ITEMS = 100
+
+# Notion allows an average of 3 requests per second per integration; the
+# bucket is shared by every NotionSaver in the process
+_rate_limiter = TokenBucket(rate=3, capacity=3)
+
+DEFAULT_TITLE = "YouTube Video Summary"
+
 
 class NotionSaver:
-    def __init__(self, notion_token=None, parent_page_id=None):
+    def __init__(self, notion_token=None, parent_page_id=None, session=None, base_url=None):
         """
         Initialize the Notion integration
 
         Args:
             notion_token (str, optional): Your Notion integration token. If None, reads from .env
             parent_page_id (str, optional): Parent page ID. If None, reads from .env
+            session (requests.Session, optional): HTTP session. If None, uses the shared pooled Notion session
+            base_url (str, optional): API root. If None, reads NOTION_BASE_URL from .env or uses the public API
         """
         # Load from environment variables if not provided
         self.notion_token = notion_token or os.getenv("NOTION_TOKEN")
@@ -33,7 +54,11 @@ class NotionSaver:
             "Content-Type": "application/json",
             "Notion-Version": "2022-06-28",
         }
-        self.base_url = "https://api.notion.com/v1"
+        self.base_url = (
+            base_url or os.getenv("NOTION_BASE_URL") or "https://api.notion.com/v1"
+        ).rstrip("/")
+        self.rate_limiter = _rate_limiter
+        self.session = session or get_session("notion", NOTION_HTTP_CONFIG)
 
         print(f"🔑 Loaded Notion token: {self.notion_token[:10]}...")
         if self.parent_page_id:
@@ -79,10 +104,38 @@ class NotionSaver:
         Returns:
             dict: Notion API response or None if failed
         """
-        url = f"{self.base_url}/pages"
+        return self._create_page_from_blocks(title, self._text_to_blocks(content), youtube_url)
+
+    def save_summary(self, text, url=None, title=None):
+        """
+        Create a Notion page straight from summary text, without touching disk
+
+        Args:
+            text (str): Summary text
+            url (str, optional): YouTube URL to embed
+            title (str, optional): Page title. If None, uses the first # heading
+
+        Returns:
+            dict: Created page data or None if failed
+        """
+        heading, blocks = self._parse_content(text)
+        title = title or heading or DEFAULT_TITLE
+        print(f"📝 Using title: {title}")
+        return self._create_page_from_blocks(title, blocks, url)
+
+    def _create_page_from_blocks(self, title, content_blocks, youtube_url=None):
+        """
+        Create a new page in Notion from prebuilt blocks
+
+        Args:
+            title (str): Page title
+            content_blocks (list): Notion blocks for the page body
+            youtube_url (str, optional): YouTube URL to embed
 
-        # Convert content to Notion blocks
-        content_blocks = self._text_to_blocks(content)
+        Returns:
+            dict: Notion API response or None if failed
+        """
+        url = f"{self.base_url}/pages"
 
         # Prepare the page data
         if self.parent_page_id:
@@ -111,26 +164,84 @@ class NotionSaver:
                 {"object": "block", "type": "divider", "divider": {}}
             )
 
-        # Add the content blocks
-        page_data["children"].extend(content_blocks)
+        # Notion caps children per request: the page is created with the first
+        # batch and the rest is appended afterwards. Appends to one parent land
+        # in the order they are received, so they are sent one at a time
+        blocks = page_data["children"] + content_blocks
+        page_data["children"] = blocks[:MAX_BLOCKS_PER_REQUEST]
 
+        page = None
         try:
-            response = requests.post(url, headers=self.headers, json=page_data)
-
-            # Print the request data for debugging
-            if response.status_code != 200:
-                print(f"Request data: {json.dumps(page_data, indent=2)}")
-                print(f"Response status: {response.status_code}")
-                print(f"Response text: {response.text}")
-
-            response.raise_for_status()
-            return response.json()
+            with timed_stage("notion_upload"):
+                page = self._request("POST", url, page_data)
+                for start in range(MAX_BLOCKS_PER_REQUEST, len(blocks), MAX_BLOCKS_PER_REQUEST):
+                    self._append_blocks(page["id"], blocks[start : start + MAX_BLOCKS_PER_REQUEST])
+            return page
         except requests.exceptions.RequestException as e:
             print(f"Error creating page: {e}")
-            if hasattr(e, "response") and e.response:
+            if hasattr(e, "response") and e.response is not None:
                 print(f"Response: {e.response.text}")
+            if page is not None:
+                self._archive_page(page["id"])
             return None
 
+    def _archive_page(self, page_id):
+        """
+        Archive a page left incomplete by a failed upload
+
+        Args:
+            page_id (str): ID of the page to archive
+        """
+        try:
+            self._request("PATCH", f"{self.base_url}/pages/{page_id}", {"archived": True})
+            print(f"🗑️ Archived incomplete page {page_id}")
+        except requests.exceptions.RequestException as e:
+            print(f"❌ Failed to archive incomplete page {page_id}: {e}")
+
+    def _request(self, method, url, payload):
+        """
+        Send a rate-limited request to the Notion API
+
+        Args:
+            method (str): HTTP method
+            url (str): Endpoint URL
+            payload (dict): JSON body
+
+        Returns:
+            dict: Parsed JSON response
+        """
+        for attempt in range(NOTION_HTTP_CONFIG.max_retries + 1):
+            self.rate_limiter.acquire()
+            response = self.session.request(method, url, headers=self.headers, json=payload)
+            if response.status_code != 429:
+                break
+            # Every other request in the process backs off as well; the
+            # retry waits for the bucket like they do
+            retry_after = float(response.headers.get("Retry-After", 1))
+            self.rate_limiter.penalize(retry_after)
+            if method in NOTION_HTTP_CONFIG.retry_methods:
+                # Already retried by the session
+                break
+
+        if response.status_code != 200:
+            print(f"Request data: {json.dumps(payload, indent=2)[:2000]}")
+            print(f"Response status: {response.status_code}")
+            print(f"Response text: {response.text}")
+
+        response.raise_for_status()
+        return response.json()
+
+    def _append_blocks(self, block_id, blocks):
+        """
+        Append up to 100 child blocks to a page or block
+
+        Args:
+            block_id (str): Parent block or page ID
+            blocks (list): Notion blocks to append
+        """
+        url = f"{self.base_url}/blocks/{block_id}/children"
+        return self._request("PATCH", url, {"children": blocks})
+
     def read_file(self, file_path):
         """
         Read content from a text file
@@ -209,8 +320,8 @@ class NotionSaver:
         if not youtube_url:
             youtube_url = self.extract_youtube_url(content)
 
-        # Try to extract title from content first
-        title = self.extract_title_from_content(content)
+        # Title and blocks come from the same pass over the content
+        title, blocks = self._parse_content(content)
 
         # Fallback to filename if no title found in content
         if not title:
@@ -220,7 +331,42 @@ class NotionSaver:
             print(f"📝 Using title from content: {title}")
 
         # Create the page
-        return self.create_page(title, content, youtube_url)
+        return self._create_page_from_blocks(title, blocks, youtube_url)
+
+    def _rich_text(self, text):
+        """
+        Split text into rich_text items that respect Notion's length limit
+
+        Args:
+            text (str): Text content
+
+        Returns:
+            list: rich_text items of at most 2000 characters each
+        """
+        return [
+            {"type": "text", "text": {"content": text[i : i + MAX_RICH_TEXT_CHARS]}}
+            for i in range(0, len(text), MAX_RICH_TEXT_CHARS)
+        ]
+
+    def _paragraph_blocks(self, paragraph):
+        """
+        Build paragraph blocks, splitting text too long for a single block
+
+        Args:
+            paragraph (str): Paragraph text
+
+        Returns:
+            list: Notion paragraph blocks
+        """
+        rich_text = self._rich_text(paragraph)
+        return [
+            {
+                "object": "block",
+                "type": "paragraph",
+                "paragraph": {"rich_text": rich_text[i : i + MAX_RICH_TEXT_ITEMS]},
+            }
+            for i in range(0, len(rich_text), MAX_RICH_TEXT_ITEMS)
+        ]
 
     def _text_to_blocks(self, text_content):
         """
@@ -232,12 +378,29 @@ class NotionSaver:
         Returns:
             list: List of Notion blocks
         """
+        return self._parse_content(text_content)[1]
+
+    def _parse_content(self, text_content):
+        """
+        Convert plain text to Notion blocks, picking up the first # heading
+        as the title along the way (private method)
+
+        Args:
+            text_content (str): Text content
+
+        Returns:
+            tuple: (title or None, list of Notion blocks)
+        """
+        title = None
         blocks = []
         paragraphs = text_content.split("\n\n")
 
         for paragraph in paragraphs:
             paragraph = paragraph.strip()
             if paragraph:
+                if title is None and "# " in paragraph:
+                    title = self.extract_title_from_content(paragraph)
+
                 # Check if it's a heading
                 if paragraph.startswith("#"):
                     heading_text = paragraph.lstrip("#").strip()
@@ -248,24 +411,14 @@ class NotionSaver:
                             "object": "block",
                             "type": f"heading_{heading_level}",
                             f"heading_{heading_level}": {
-                                "rich_text": [
-                                    {"type": "text", "text": {"content": heading_text}}
+                                "rich_text": self._rich_text(heading_text)[
+                                    :MAX_RICH_TEXT_ITEMS
                                 ]
                             },
                         }
                     )
                 else:
                     # Regular paragraph
-                    blocks.append(
-                        {
-                            "object": "block",
-                            "type": "paragraph",
-                            "paragraph": {
-                                "rich_text": [
-                                    {"type": "text", "text": {"content": paragraph}}
-                                ]
-                            },
-                        }
-                    )
+                    blocks.extend(self._paragraph_blocks(paragraph))
 
-        return blocks
+        return title, blocks
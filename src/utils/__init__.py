@@ -1,13 +1,19 @@
 from .utils import (
     get_clean_subtitles,
+    get_extractor,
+    get_notion_saver,
     save_summary_to_file,
+    save_transcript_to_file,
     validate_youtube_url,
     save_summary_to_notion,
 )
 
 __all__ = [
     "get_clean_subtitles",
+    "get_extractor",
+    "get_notion_saver",
     "save_summary_to_file",
+    "save_transcript_to_file",
     "validate_youtube_url",
     "save_summary_to_notion",
 ]
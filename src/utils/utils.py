@@ -1,9 +1,42 @@
+import itertools
 import os
 import re
+import threading
 from datetime import datetime
-from typing import Optional
-from src.extractors import YouTubeSubtitleExtractor
-from src.notion_integration.noiton_saver import NotionSaver
+from typing import TYPE_CHECKING, List, Optional, Tuple
+
+if TYPE_CHECKING:
+    from src.extractors import YouTubeSubtitleExtractor
+    from src.notion_integration.noiton_saver import NotionSaver
+
+# The extractor and the Notion client are imported when first requested, so
+# importing these helpers stays cheap
+_extractor: Optional["YouTubeSubtitleExtractor"] = None
+_extractor_lock = threading.Lock()
+_notion_saver: Optional["NotionSaver"] = None
+_notion_lock = threading.Lock()
+
+
+def get_extractor() -> "YouTubeSubtitleExtractor":
+    """Return the process-wide extractor, backed by the transcript cache configured in the environment"""
+    from src.extractors import YouTubeSubtitleExtractor, TranscriptCache
+
+    global _extractor
+    with _extractor_lock:
+        if _extractor is None:
+            _extractor = YouTubeSubtitleExtractor(cache=TranscriptCache.from_env())
+        return _extractor
+
+
+def get_notion_saver() -> "NotionSaver":
+    """Return the process-wide Notion saver configured from the environment"""
+    from src.notion_integration.noiton_saver import NotionSaver
+
+    global _notion_saver
+    with _notion_lock:
+        if _notion_saver is None:
+            _notion_saver = NotionSaver.from_env()
+        return _notion_saver
 
 
 def get_clean_subtitles(
@@ -12,21 +45,47 @@ def get_clean_subtitles(
     enable_time_range: bool = False,
     start_time: int = 0,
     end_time: int = 0,
+    time_ranges: Optional[List[Tuple[int, int]]] = None,
 ) -> str:
-    extractor = YouTubeSubtitleExtractor()
-    return extractor.get_clean_subtitles(video_url, lang, enable_time_range, start_time, end_time)
+    extractor = get_extractor()
+    return extractor.get_clean_subtitles(
+        video_url, lang, enable_time_range, start_time, end_time, time_ranges
+    )
 
 
-def save_summary_to_file(summary: str, outputs_dir: str = "outputs") -> str:
+def save_transcript_to_file(
+    video_url: str,
+    time_ranges: Optional[List[Tuple[int, int]]] = None,
+    outputs_dir: str = "outputs",
+) -> str:
+    """Stream a video's transcript to disk one caption at a time"""
     os.makedirs(outputs_dir, exist_ok=True)
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-    filename = f"{outputs_dir}/summary_{timestamp}.txt"
+    filename = f"{outputs_dir}/transcript_{timestamp}.txt"
+    segments = get_extractor().iter_subtitle_segments(video_url, time_ranges=time_ranges)
     with open(filename, "w", encoding="utf-8") as f:
-        f.write(summary)
+        for segment in segments:
+            f.write(segment)
+            f.write("\n")
 
     return filename
 
 
+def save_summary_to_file(summary: str, outputs_dir: str = "outputs") -> str:
+    os.makedirs(outputs_dir, exist_ok=True)
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    # Batch runs and job workers can finish several summaries in one second
+    for attempt in itertools.count():
+        suffix = f"_{attempt}" if attempt else ""
+        filename = f"{outputs_dir}/summary_{timestamp}{suffix}.txt"
+        try:
+            with open(filename, "x", encoding="utf-8") as f:
+                f.write(summary)
+            return filename
+        except FileExistsError:
+            continue
+
+
 def validate_youtube_url(url: str) -> bool:
     """Validate if the URL is a valid YouTube URL"""
     youtube_pattern = r"https://www\.youtube\.com/watch\?v=[\w-]+"
@@ -34,20 +93,18 @@ def validate_youtube_url(url: str) -> bool:
 
 
 def save_summary_to_notion(
-    file_path: str,
+    summary: str,
     video_url: str,
 ) -> str:
     """
-    Save the summary to Notion using the NotionSaver class.
-    :param file_path: Path to the summary file.
+    Save the summary to Notion using the process-wide NotionSaver.
+    :param summary: Summary text.
     :param video_url: URL of the YouTube video.
     :return: str
     A message indicating the success of the operation.
     """
 
-    notion = NotionSaver.from_env()
-    if notion.process_file(file_path, video_url):
-        os.remove(file_path)  # Remove the file after processing
+    if get_notion_saver().save_summary(summary, video_url):
         return "Summary saved to Notion successfully."
 
     return "Failed to save summary to Notion."
@@ -55,23 +112,19 @@ def save_summary_to_notion(
 
 def parse_time_to_milliseconds(time_str):
     """
-    Parse time string to milliseconds.
+    Parse one or more comma-separated time ranges to milliseconds.
     Supports formats:
     - '30-90' (seconds)
     - '0:30-1:30' (minutes:seconds)
     - '0:00:30-0:01:30' (hours:minutes:seconds)
+    - '0:00-5:00,20:00-25:00' (several ranges)
     
     Args:
         time_str (str): Time range string
         
     Returns:
-        tuple: (start_time_ms, end_time_ms)
+        list: [(start_time_ms, end_time_ms), ...] in the order given
     """
-    if '-' not in time_str:
-        raise ValueError("Time range must contain '-' separator (e.g., '30-90' or '0:30-1:30')")
-    
-    start_str, end_str = time_str.split('-', 1)
-    
     def time_to_milliseconds(t):
         # Remove whitespace
         t = t.strip()
@@ -93,11 +146,19 @@ def parse_time_to_milliseconds(time_str):
             return (int(hours) * 3600 + int(minutes) * 60 + int(seconds)) * 1000
         else:
             raise ValueError(f"Invalid time format: {t}")
-    
-    start_ms = time_to_milliseconds(start_str)
-    end_ms = time_to_milliseconds(end_str)
-    
-    if start_ms >= end_ms:
-        raise ValueError("Start time must be less than end time")
-    
-    return start_ms, end_ms
\ No newline at end of file
+
+    time_ranges = []
+    for range_str in time_str.split(','):
+        if '-' not in range_str:
+            raise ValueError("Time range must contain '-' separator (e.g., '30-90' or '0:30-1:30')")
+
+        start_str, end_str = range_str.split('-', 1)
+        start_ms = time_to_milliseconds(start_str)
+        end_ms = time_to_milliseconds(end_str)
+
+        if start_ms >= end_ms:
+            raise ValueError("Start time must be less than end time")
+
+        time_ranges.append((start_ms, end_ms))
+
+    return time_ranges